@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+账号加载模块
+逐行读取 "账号,密码" 格式的账号文件并按需产出，支持按账号名的稳定哈希分片，
+让多个运行节点各自处理互不重叠的一部分账号
+"""
+
+import os
+import hashlib
+import argparse
+
+ANYROUTER_ACCOUNTS_FILE = 'anyrouter-accounts.txt'
+LEAFFLOW_ACCOUNTS_FILE = 'leaflow-account.txt'
+
+
+def parse_shard(text):
+    """
+    解析命令行参数 --shard 的值
+
+    Args:
+        text: "i/n" 格式，表示共 n 份中的第 i 份（从 1 开始）
+
+    Returns:
+        tuple: (i, n)
+    """
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"分片格式应为 i/n，例如 1/4: {text}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"分片序号应在 1 到 {max(count, 1)} 之间: {text}")
+    return index, count
+
+
+def shard_of(name, count):
+    """账号所属的分片（从 1 开始），与进程和 Python 版本无关"""
+    digest = hashlib.sha256(name.strip().lower().encode('utf-8')).hexdigest()
+    return int(digest[:16], 16) % count + 1
+
+
+def iter_accounts(filename, key='username', shard=None, warn=print):
+    """
+    逐行读取账号文件，按需产出账号
+
+    Args:
+        filename: 账号文件，每行 "账号,密码"，空行和 # 开头的行会被跳过
+        key: 账号名使用的字段名（AnyRouter 为 username，LeafFlow 为 email）
+        shard: (i, n) 时只产出属于第 i 份的账号，为 None 时产出全部账号
+        warn: 输出警告和错误的函数
+
+    Yields:
+        dict: {key: 账号名, 'password': 密码}
+    """
+    if not os.path.exists(filename):
+        warn(f"错误: 账号文件 {filename} 不存在！")
+        return
+
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            # 跳过空行和注释行
+            if not line or line.startswith('#'):
+                continue
+
+            if ',' not in line:
+                warn(f"警告: 第 {line_num} 行缺少逗号分隔符，已跳过")
+                continue
+
+            name, password = (part.strip() for part in line.split(',', 1))
+            if not name or not password:
+                warn(f"警告: 第 {line_num} 行格式不正确，已跳过")
+                continue
+
+            if shard and shard_of(name, shard[1]) != shard[0]:
+                continue
+
+            yield {key: name, 'password': password}
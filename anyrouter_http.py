@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AnyRouter HTTP 客户端
+不启动浏览器，直接通过 JSON 登录接口和 /api/user/self 完成登录（签到）并读取余额
+"""
+
+import os
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = os.environ.get('ANYROUTER_BASE_URL', 'https://anyrouter.top')
+
+# 500000 units = $1
+QUOTA_PER_DOLLAR = 500000
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+class AnyRouterHTTPError(Exception):
+    """HTTP 方式登录或读取余额失败，需要回退到浏览器流程"""
+
+
+def parse_quota(user_data):
+    """
+    解析 /api/user/self 返回的用户数据
+
+    Args:
+        user_data: API 返回的 data 字段
+
+    Returns:
+        dict: remaining/used 为美元金额，request_count 为请求次数
+    """
+    return {
+        'remaining': user_data.get('quota', 0) / QUOTA_PER_DOLLAR,
+        'used': user_data.get('used_quota', 0) / QUOTA_PER_DOLLAR,
+        'request_count': user_data.get('request_count', 0),
+        'username': user_data.get('display_name') or user_data.get('username', '')
+    }
+
+
+class AnyRouterHTTPClient:
+    def __init__(self, base_url=None, timeout=10, pool_size=10):
+        """
+        初始化 HTTP 客户端
+
+        Args:
+            base_url: 站点地址 (默认读取环境变量 ANYROUTER_BASE_URL)，可指向本地模拟服务
+            timeout: 单次请求超时（秒）
+            pool_size: 连接池大小，通常与并发数一致
+        """
+        self.base_url = (base_url or BASE_URL).rstrip('/')
+        self.timeout = timeout
+        # 所有账号共用一个连接池，Cookie 仍按账号隔离在各自的 Session 中
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+
+    def new_session(self):
+        """创建一个共享连接池的账号会话"""
+        session = requests.Session()
+        session.mount('http://', self.adapter)
+        session.mount('https://', self.adapter)
+        session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'application/json',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
+        })
+        return session
+
+    def _json(self, response):
+        """解析 JSON 响应，被 WAF 拦截或返回 HTML 时抛出异常"""
+        if response.status_code != 200:
+            raise AnyRouterHTTPError(f"HTTP {response.status_code}")
+        try:
+            return response.json()
+        except ValueError:
+            raise AnyRouterHTTPError("响应不是 JSON（可能被防护页面拦截）")
+
+    def login(self, session, username, password):
+        """
+        通过 JSON 登录接口登录
+
+        Returns:
+            int: 用户 ID（后续请求的 new-api-user header）
+        """
+        response = session.post(
+            f"{self.base_url}/api/user/login",
+            json={'username': username, 'password': password},
+            timeout=self.timeout
+        )
+        data = self._json(response)
+        if not data.get('success') or not data.get('data'):
+            raise AnyRouterHTTPError(f"登录失败: {data.get('message', '未知错误')}")
+
+        user_id = data['data'].get('id')
+        if not user_id:
+            raise AnyRouterHTTPError("登录响应中缺少用户 ID")
+        return user_id
+
+    def get_user_self(self, session, user_id):
+        """读取 /api/user/self"""
+        response = session.get(
+            f"{self.base_url}/api/user/self",
+            headers={'new-api-user': str(user_id)},
+            timeout=self.timeout
+        )
+        data = self._json(response)
+        if not data.get('success') or not data.get('data'):
+            raise AnyRouterHTTPError(f"获取用户信息失败: {data.get('message', '未知错误')}")
+        return data['data']
+
+    def sign_in(self, account):
+        """
+        登录（登录即完成签到）并读取余额
+
+        Args:
+            account: 包含 username 和 password 的账号信息
+
+        Returns:
+            dict: parse_quota 的结果
+
+        Raises:
+            AnyRouterHTTPError: HTTP 流程失败
+        """
+        with self.new_session() as session:
+            try:
+                user_id = self.login(session, account['username'], account['password'])
+                return parse_quota(self.get_user_self(session, user_id))
+            except requests.RequestException as e:
+                raise AnyRouterHTTPError(f"请求失败: {e}")
+
+    def close(self):
+        """关闭连接池"""
+        self.adapter.close()
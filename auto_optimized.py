@@ -1,483 +1,751 @@
 import time
-import random
-import os
-from playwright.sync_api import sync_playwright
+import asyncio
+import argparse
+from datetime import datetime
+from playwright.async_api import async_playwright
+from session_store import SessionStore
+from anyrouter_http import BASE_URL, QUOTA_PER_DOLLAR, AnyRouterHTTPClient, AnyRouterHTTPError, parse_quota
+from resource_filter import ResourceFilter, SITE_RULES
+from accounts import ANYROUTER_ACCOUNTS_FILE, iter_accounts, parse_shard
+from shard_results import write_result_file
+from run_history import RunHistory
+from checkpoint import Checkpoint
+from engine import SiteAdapter, SiteEngine
+from selector_cache import SelectorCache, probe_async
+from popup_guard import PopupGuard, SITE_RULES as POPUP_RULES
+from retry_policy import BAD_CREDENTIALS, CIRCUIT_OPEN, UNKNOWN, classify_error, describe
+import tracing
 
-def load_accounts(filename='anyrouter-accounts.txt'):
-    """从文件加载账号列表"""
-    accounts = []
-    if not os.path.exists(filename):
-        print(f"错误: 账号文件 {filename} 不存在！")
-        return accounts
+def load_accounts(filename=ANYROUTER_ACCOUNTS_FILE, shard=None):
+    """从文件加载账号列表
 
+    Args:
+        filename: 账号文件
+        shard: (i, n) 时只加载属于第 i 份的账号
+    """
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                # 跳过空行和注释行
-                if not line or line.startswith('#'):
-                    continue
-
-                # 解析账号密码
-                if ',' in line:
-                    parts = line.split(',', 1)
-                    if len(parts) == 2:
-                        username, password = parts[0].strip(), parts[1].strip()
-                        if username and password:
-                            accounts.append({'username': username, 'password': password})
-                        else:
-                            print(f"警告: 第 {line_num} 行格式不正确，已跳过")
-                    else:
-                        print(f"警告: 第 {line_num} 行格式不正确，已跳过")
-                else:
-                    print(f"警告: 第 {line_num} 行缺少逗号分隔符，已跳过")
-
-        print(f"成功加载 {len(accounts)} 个账号")
-        return accounts
-
+        accounts = list(iter_accounts(filename, 'username', shard))
     except Exception as e:
         print(f"读取账号文件失败: {e}")
-        return accounts
+        return []
 
-# 从文件加载账号列表
-accounts = load_accounts('anyrouter-accounts.txt')
+    shard_info = f"（分片 {shard[0]}/{shard[1]}）" if shard else ""
+    print(f"成功加载 {len(accounts)} 个账号{shard_info}")
+    return accounts
 
-login_url = 'https://anyrouter.top/login'
+login_url = f'{BASE_URL}/login'
+console_url = f'{BASE_URL}/console'
 
-def get_balance_info(page):
-    """获取账户余额信息 - 基于实际页面结构优化"""
-    try:
-        balance_info = {}
-        
+# 浏览器启动参数（所有账号共用一个浏览器）
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled',  # 避免被检测为自动化
+    '--disable-extensions',
+    '--no-first-run',
+    '--disable-default-apps',
+    '--disable-features=TranslateUI',
+    '--disable-ipc-flooding-protection'
+]
 
-        # 方法0: 直接调用 /api/user/self API 获取余额（新增 - 最可靠）
-        try:
-            print(f"[*] 方法0: 通过 API 调用获取余额...")
+# 设置更真实的请求头
+EXTRA_HTTP_HEADERS = {
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
 
-            # 先从 localStorage 获取 user_id（API 需要 new-api-user header）
-            user_id = page.evaluate("""() => {
-                try {
-                    const user = JSON.parse(localStorage.getItem('user') || '{}');
-                    return user.id || null;
-                } catch(e) {
-                    return null;
-                }
-            }""")
+# 控制台中的签到按钮或链接（上次生效的选择器优先）
+SIGN_IN_SELECTORS = [
+    'button:has-text("签到")',
+    'button:has-text("打卡")',
+    'a:has-text("签到")',
+    '[data-testid="sign-in"]',
+    '.sign-in-button'
+]
+# 同时等待所有签到按钮选择器的时间（毫秒）
+SIGN_IN_PROBE_TIMEOUT = 1000
 
-            if not user_id:
-                print(f"[!] 方法0失败: 无法从 localStorage 获取 user_id")
-            else:
-                # 使用 fetch 调用 API（带上必需的 header）
-                api_response = page.evaluate("""
-                    async (userId) => {
-                        try {
-                            const response = await fetch('/api/user/self', {
-                                method: 'GET',
-                                headers: {
-                                    'Accept': 'application/json',
-                                    'new-api-user': userId.toString()
-                                }
-                            });
-                            const data = await response.json();
-                            return data;
-                        } catch(e) {
-                            return null;
-                        }
-                    }
-                """, user_id)
+async def launch_browser(p):
+    """启动无头 Chromium（自动选择 Chromium，兼容 GitHub Actions）"""
+    return await p.chromium.launch(headless=True, args=BROWSER_ARGS)
 
-                if api_response and api_response.get("success") and api_response.get("data"):
-                    user_data = api_response["data"]
+async def new_account_context(browser, resource_filter=None, popup_guard=None, **kwargs):
+    """创建账号的浏览器上下文，并注册请求拦截器和弹窗拦截"""
+    context = await browser.new_context(extra_http_headers=EXTRA_HTTP_HEADERS, **kwargs)
+    if popup_guard:
+        await popup_guard.install(context)
+    if resource_filter:
+        await resource_filter.install(context)
+    return context
 
-                    # quota 就是当前余额，used_quota 是历史消耗
-                    remaining = user_data["quota"] / 500000
-                    used_quota = user_data["used_quota"] / 500000
+async def new_account_page(context, popup_guard=None):
+    """打开页面，启用弹窗拦截时在第一次导航前注册 locator handler"""
+    if popup_guard:
+        return await popup_guard.new_page(context)
+    return await context.new_page()
 
-                    balance_info["api_remaining"] = f"${remaining:.2f}"
-                    balance_info["api_used"] = f"${used_quota:.2f}"
-                    balance_info["api_requests"] = str(user_data["request_count"])
-                    balance_info["username"] = user_data.get("display_name") or user_data.get("username", "")
-
-                    print(f"[+] 方法0成功: 余额=${remaining:.2f}, 已用=${used_quota:.2f}, 请求={user_data['request_count']}")
-                else:
-                    print(f"[!] 方法0失败: API返回无效数据")
-
-        except Exception as e:
-            print(f"[!] 方法0异常: {e}")
-
-        # 方法1: 直接通过文本内容和上下文获取余额信息
-        try:
-            # 获取所有包含美元符号的元素
-            balance_data = page.evaluate('''
-                () => {
-                    const result = {};
-                    
-                    // 查找所有包含美元符号的元素
-                    const dollarElements = Array.from(document.querySelectorAll('*')).filter(el => 
-                        el.textContent && 
-                        el.textContent.match(/\\$[0-9,]+\\.?[0-9]*/) && 
-                        el.children.length === 0  // 只要叶子节点
-                    );
-                    
-                    dollarElements.forEach(el => {
-                        const text = el.textContent.trim();
-                        const parent = el.parentElement;
-                        const grandParent = parent ? parent.parentElement : null;
-                        
-                        // 构建上下文
-                        let context = '';
-                        if (parent) context += parent.textContent;
-                        if (grandParent) context += ' | ' + grandParent.textContent;
-                        
-                        // 根据上下文分类
-                        if (context.includes('当前余额')) {
-                            result.currentBalance = text;
-                        } else if (context.includes('历史消耗')) {
-                            result.historicalUsage = text;
-                        } else if (context.includes('统计额度')) {
-                            result.statisticsQuota = text;
-                        }
-                    });
-                    
-                    // 查找请求次数等数字信息
-                    const numberElements = Array.from(document.querySelectorAll('*')).filter(el => 
-                        el.textContent && 
-                        el.textContent.match(/^"?[0-9,]+"?$/) && 
-                        el.children.length === 0
-                    );
-                    
-                    numberElements.forEach(el => {
-                        const text = el.textContent.trim().replace(/"/g, '');
-                        const parent = el.parentElement;
-                        const grandParent = parent ? parent.parentElement : null;
-                        
-                        let context = '';
-                        if (parent) context += parent.textContent;
-                        if (grandParent) context += ' | ' + grandParent.textContent;
-                        
-                        if (context.includes('请求次数')) {
-                            result.requestCount = text;
-                        } else if (context.includes('统计次数')) {
-                            result.statisticsCount = text;
-                        } else if (context.includes('统计Tokens')) {
-                            result.statisticsTokens = text;
-                        }
-                    });
-                    
-                    return result;
+# 方法0: 读取 localStorage 中的 user，并用它的 id 调用 /api/user/self（一次 evaluate 完成）
+API_BALANCE_JS = """
+    async () => {
+        let user;
+        try {
+            user = JSON.parse(localStorage.getItem('user') || '{}');
+        } catch(e) {
+            return {error: 'localStorage 解析失败'};
+        }
+        if (!user.id) {
+            return {error: '无法从 localStorage 获取 user_id', user};
+        }
+        try {
+            const response = await fetch('/api/user/self', {
+                method: 'GET',
+                headers: {
+                    'Accept': 'application/json',
+                    'new-api-user': user.id.toString()
                 }
-            ''')
-            
-            if balance_data:
-                balance_info.update(balance_data)
-                
-        except Exception as e:
-            print(f"[*] 方法1获取余额失败: {e}")
+            });
+            return {data: await response.json(), user};
+        } catch(e) {
+            return {error: 'API 请求失败', user};
+        }
+    }
+"""
+
+# 方法1: 用 TreeWalker 单次遍历文本节点，根据上下文分类金额和次数
+DOM_BALANCE_JS = """
+    () => {
+        const result = {};
+        if (!document.body) return result;
         
-        # 方法2: 通过localStorage获取用户数据
-        try:
-            user_data = page.evaluate('''
-                () => {
-                    try {
-                        const userStr = localStorage.getItem('user');
-                        if (userStr) {
-                            const user = JSON.parse(userStr);
-                            return {
-                                quota: user.quota || 0,
-                                used_quota: user.used_quota || 0,
-                                request_count: user.request_count || 0,
-                                username: user.username || '',
-                                display_name: user.display_name || ''
-                            };
-                        }
-                    } catch(e) {
-                        console.log('localStorage解析失败:', e);
-                    }
-                    return null;
-                }
-            ''')
-            
-            if user_data:
-                # 计算剩余额度 (根据网站的计费规则)
-                total_quota = user_data.get('quota', 0) / 500000  # 500000 units = $1
-                used_quota = user_data.get('used_quota', 0) / 500000
-                remaining = total_quota - used_quota
-                
-                balance_info['localStorage_remaining'] = f"${remaining:.2f}"
-                balance_info['localStorage_total'] = f"${total_quota:.2f}"
-                balance_info['localStorage_used'] = f"${used_quota:.2f}"
-                balance_info['localStorage_requests'] = str(user_data.get('request_count', 0))
-                balance_info['username'] = user_data.get('display_name') or user_data.get('username', '')
-                
-        except Exception as e:
-            print(f"[*] 方法2获取用户数据失败: {e}")
+        const moneyPattern = /\\$[0-9,]+\\.?[0-9]*/;
+        const countPattern = /^"?[0-9,]+"?$/;
+        const seen = new Set();
         
-        # 格式化输出
-        if balance_info:
-            result_parts = []
-            
-            # 优先显示API方法获取的余额信息
-            if 'api_remaining' in balance_info:
-                result_parts.append(f"💰 当前余额: {balance_info['api_remaining']}")
-            elif 'currentBalance' in balance_info:
-                result_parts.append(f"💰 当前余额: {balance_info['currentBalance']}")
-            elif 'localStorage_remaining' in balance_info:
-                result_parts.append(f"💰 剩余额度: {balance_info['localStorage_remaining']}")
-                
-            if 'api_used' in balance_info:
-                result_parts.append(f"📊 历史消耗: {balance_info['api_used']}")
-            elif 'historicalUsage' in balance_info:
-                result_parts.append(f"📊 历史消耗: {balance_info['historicalUsage']}")
-            elif 'localStorage_used' in balance_info:
-                result_parts.append(f"📊 已用额度: {balance_info['localStorage_used']}")
-                
-            if 'api_requests' in balance_info:
-                result_parts.append(f"🔢 请求次数: {balance_info['api_requests']}")
-            elif 'requestCount' in balance_info:
-                result_parts.append(f"🔢 请求次数: {balance_info['requestCount']}")
-            elif 'localStorage_requests' in balance_info:
-                result_parts.append(f"🔢 请求次数: {balance_info['localStorage_requests']}")
-                
-            if 'statisticsQuota' in balance_info and balance_info['statisticsQuota'] != '$0.00':
-                result_parts.append(f"📈 统计额度: {balance_info['statisticsQuota']}")
-                
-            if 'username' in balance_info:
-                result_parts.append(f"👤 用户: {balance_info['username']}")
+        // 构建上下文（父元素和祖父元素的文本）
+        const contextOf = (el) => {
+            const parent = el.parentElement;
+            const grandParent = parent ? parent.parentElement : null;
+            let context = '';
+            if (parent) context += parent.textContent;
+            if (grandParent) context += ' | ' + grandParent.textContent;
+            return context;
+        };
+        
+        const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+        for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+            const el = node.parentElement;
+            // 只要叶子节点，每个元素只处理一次
+            if (!el || el.children.length !== 0 || seen.has(el)) continue;
+            seen.add(el);
             
-            return " | ".join(result_parts) if result_parts else None
+            const text = el.textContent.trim();
+            if (moneyPattern.test(text)) {
+                const context = contextOf(el);
+                if (context.includes('当前余额')) {
+                    result.currentBalance = text;
+                } else if (context.includes('历史消耗')) {
+                    result.historicalUsage = text;
+                } else if (context.includes('统计额度')) {
+                    result.statisticsQuota = text;
+                }
+            } else if (countPattern.test(text)) {
+                const context = contextOf(el);
+                const value = text.replace(/"/g, '');
+                if (context.includes('请求次数')) {
+                    result.requestCount = value;
+                } else if (context.includes('统计次数')) {
+                    result.statisticsCount = value;
+                } else if (context.includes('统计Tokens')) {
+                    result.statisticsTokens = value;
+                }
+            }
+        }
         
+        return result;
+    }
+"""
+
+# 读取 localStorage 中的 user（仅在方法0的 evaluate 失败时使用）
+LOCAL_STORAGE_USER_JS = """
+    () => {
+        try {
+            return JSON.parse(localStorage.getItem('user') || 'null');
+        } catch(e) {
+            return null;
+        }
+    }
+"""
+
+def parse_number(text):
+    """把 "$1,234.56" 或 "1,234" 之类的文本转换为数字，失败时返回 None"""
+    if not text:
+        return None
+    try:
+        return float(str(text).replace('$', '').replace(',', '').strip())
+    except ValueError:
         return None
+
+def user_display_name(user):
+    """localStorage / API 用户数据中的显示名称"""
+    if not user:
+        return ''
+    return user.get('display_name') or user.get('username', '')
+
+async def extract_balance(page):
+    """获取账户余额 - 按可信度依次尝试 API、页面文本、localStorage，拿到结果立即返回
+    
+    Returns:
+        dict: 结构化余额（source 表示数据来源，金额单位为美元），全部失败时返回 None
+    """
+    user = None
+    
+    # 方法0: 直接调用 /api/user/self API 获取余额（最可靠）
+    try:
+        print(f"[*] 方法0: 通过 API 调用获取余额...")
+        with tracing.span('balance_api'):
+            api_result = await page.evaluate(API_BALANCE_JS)
+        user = api_result.get('user')
+        api_response = api_result.get('data')
+        
+        if api_response and api_response.get("success") and api_response.get("data"):
+            # quota 就是当前余额，used_quota 是历史消耗
+            balance = dict(parse_quota(api_response["data"]), source='api')
+            print(f"[+] 方法0成功: 余额=${balance['remaining']:.2f}, 已用=${balance['used']:.2f}, 请求={balance['request_count']}")
+            return balance
         
+        print(f"[!] 方法0失败: {api_result.get('error', 'API返回无效数据')}")
     except Exception as e:
-        print(f"[*] 获取余额信息时出错: {e}")
-        return None
+        print(f"[!] 方法0异常: {e}")
+    
+    # 方法1: 通过页面文本和上下文获取余额信息
+    try:
+        with tracing.span('balance_dom'):
+            balance_data = await page.evaluate(DOM_BALANCE_JS)
+        remaining = parse_number(balance_data.get('currentBalance'))
+        if remaining is not None:
+            balance = {
+                'source': 'dom',
+                'remaining': remaining,
+                'used': parse_number(balance_data.get('historicalUsage')),
+                'request_count': parse_number(balance_data.get('requestCount')),
+                'statistics_quota': parse_number(balance_data.get('statisticsQuota')),
+                'username': user_display_name(user)
+            }
+            if balance['request_count'] is not None:
+                balance['request_count'] = int(balance['request_count'])
+            print(f"[+] 方法1成功: 余额=${remaining:.2f}")
+            return balance
+    except Exception as e:
+        print(f"[*] 方法1获取余额失败: {e}")
+    
+    # 方法2: 使用 localStorage 中缓存的用户数据（复用方法0读取的结果）
+    try:
+        if user is None:
+            with tracing.span('balance_localStorage'):
+                user = await page.evaluate(LOCAL_STORAGE_USER_JS)
+        if user:
+            # 计算剩余额度 (根据网站的计费规则)
+            total_quota = (user.get('quota') or 0) / QUOTA_PER_DOLLAR
+            used_quota = (user.get('used_quota') or 0) / QUOTA_PER_DOLLAR
+            return {
+                'source': 'localStorage',
+                'total': total_quota,
+                'remaining': total_quota - used_quota,
+                'used': used_quota,
+                'request_count': user.get('request_count') or 0,
+                'username': user_display_name(user)
+            }
+    except Exception as e:
+        print(f"[*] 方法2获取用户数据失败: {e}")
+    
+    return None
 
-def optimized_login_and_sign(account):
-    """优化版浏览器自动登录和签到"""
-    print(f"[*] 正在处理账号: {account['username']}")
+def format_balance(balance):
+    """格式化结构化余额信息"""
+    result_parts = []
     
-    balance_info = None  # 存储余额信息
+    if balance['source'] == 'localStorage':
+        result_parts.append(f"💰 剩余额度: ${balance['remaining']:.2f}")
+        result_parts.append(f"📊 已用额度: ${balance['used']:.2f}")
+    else:
+        result_parts.append(f"💰 当前余额: ${balance['remaining']:.2f}")
+        if balance.get('used') is not None:
+            result_parts.append(f"📊 历史消耗: ${balance['used']:.2f}")
+    
+    if balance.get('request_count') is not None:
+        result_parts.append(f"🔢 请求次数: {balance['request_count']}")
+    
+    if balance.get('statistics_quota'):
+        result_parts.append(f"📈 统计额度: ${balance['statistics_quota']:.2f}")
     
+    if balance.get('username'):
+        result_parts.append(f"👤 用户: {balance['username']}")
+    
+    return " | ".join(result_parts)
+
+async def get_balance_info(page):
+    """获取账户余额信息（格式化字符串）"""
     try:
-        with sync_playwright() as p:
-            # 使用无头浏览器，提高速度
-            browser = p.chromium.launch(
-                headless=True,  # 无头模式，不显示窗口
-                # 自动选择 Chromium (兼容 GitHub Actions)
-                args=[
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-blink-features=AutomationControlled',  # 避免被检测为自动化
-                    '--disable-extensions',
-                    '--no-first-run',
-                    '--disable-default-apps',
-                    '--disable-features=TranslateUI',
-                    '--disable-ipc-flooding-protection'
-                ]
-            )
-            
-            # 创建页面并设置更快的超时
-            page = browser.new_page()
-            page.set_default_timeout(10000)  # 10秒超时
-            
-            # 设置更真实的用户代理
-            page.set_extra_http_headers({
-                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            })
-            
-            print(f"[*] 访问登录页面...")
-            page.goto(login_url, wait_until='domcontentloaded')  # 只等待DOM加载，不等待所有资源
+        balance = await extract_balance(page)
+        return format_balance(balance) if balance else None
+    except Exception as e:
+        print(f"[*] 获取余额信息时出错: {e}")
+        return None
+
+async def login(page, account, popup_guard=None):
+    """填写登录表单并提交
 
-            # 增强弹窗处理
+    Args:
+        popup_guard: 上下文中已注册的弹窗拦截，为 None 时在页面上逐步关闭弹窗
+
+    Returns:
+        bool: 账号或密码错误时返回 False，否则返回 True
+    """
+    print(f"[*] 访问登录页面...")
+    with tracing.span('goto_login'):
+        await page.goto(login_url, wait_until='domcontentloaded')  # 只等待DOM加载，不等待所有资源
+
+    # 增强弹窗处理（注册了弹窗拦截时公告弹窗已由初始化脚本移除）
+    with tracing.span('popup'):
+        if popup_guard is None:
             try:
                 # 方法1: 按 ESC 键关闭弹窗
-                page.keyboard.press('Escape')
-                time.sleep(0.5)
+                await page.keyboard.press('Escape')
+                await asyncio.sleep(0.5)
 
                 # 方法2: 点击关闭按钮
                 close_button = page.locator('button:has-text("关闭公告"), button:has-text("关闭"), .semi-modal-close').first
-                if close_button.is_visible(timeout=1000):
-                    close_button.click()
+                if await close_button.is_visible(timeout=1000):
+                    await close_button.click()
                     print(f"[*] 关闭了弹窗")
-                    time.sleep(0.5)
+                    await asyncio.sleep(0.5)
 
                 # 方法3: 使用 JavaScript 强制移除所有弹窗
-                page.evaluate("""() => {
+                await page.evaluate("""() => {
                     const portals = document.querySelectorAll('.semi-portal, .semi-modal, .semi-dialog');
                     portals.forEach(el => el.remove());
                 }""")
             except:
                 pass
 
-            # 检查是否需要点击邮箱登录选项
-            try:
-                email_login_button = page.locator('button:has-text("使用 邮箱或用户名 登录")')
-                if email_login_button.is_visible(timeout=2000):
-                    email_login_button.click()
-                    print(f"[*] 点击了邮箱登录选项")
-                    time.sleep(1)  # 短暂等待表单出现
-            except:
-                pass
+        # 检查是否需要点击邮箱登录选项
+        try:
+            email_login_button = page.locator('button:has-text("使用 邮箱或用户名 登录")')
+            if await email_login_button.is_visible(timeout=2000):
+                await email_login_button.click()
+                print(f"[*] 点击了邮箱登录选项")
+                await asyncio.sleep(1)  # 短暂等待表单出现
+        except:
+            pass
 
-            # 快速填写登录信息
-            print(f"[*] 填写登录信息...")
+    # 快速填写登录信息
+    print(f"[*] 填写登录信息...")
 
-            # 填写用户名
-            username_input = page.locator('#username, input[placeholder*="用户名"], input[placeholder*="邮箱"]').first
-            username_input.fill(account['username'])
+    with tracing.span('fill'):
+        # 填写用户名
+        username_input = page.locator('#username, input[placeholder*="用户名"], input[placeholder*="邮箱"]').first
+        await username_input.fill(account['username'])
 
-            # 填写密码
-            password_input = page.locator('#password, input[type="password"]').first
-            password_input.fill(account['password'])
+        # 填写密码
+        password_input = page.locator('#password, input[type="password"]').first
+        await password_input.fill(account['password'])
 
-            print(f"[*] 提交登录...")
+    print(f"[*] 提交登录...")
 
-            # 登录前再次确保没有弹窗遮挡
+    with tracing.span('submit'):
+        # 登录前再次确保没有弹窗遮挡
+        if popup_guard is None:
             try:
-                page.keyboard.press('Escape')
-                page.evaluate("""() => {
+                await page.keyboard.press('Escape')
+                await page.evaluate("""() => {
                     const portals = document.querySelectorAll('.semi-portal, .semi-modal');
                     portals.forEach(el => el.remove());
                 }""")
             except:
                 pass
 
-            # 点击登录按钮（使用强制点击）
-            login_button = page.locator('button:has-text("继续"), button[type="submit"], button:has-text("登录")').first
-            login_button.click(force=True)  # 强制点击，忽略遮挡
-            
-            # 等待登录结果 - 检查URL变化或成功提示
+        # 点击登录按钮（使用强制点击）
+        login_button = page.locator('button:has-text("继续"), button[type="submit"], button:has-text("登录")').first
+        await login_button.click(force=True)  # 强制点击，忽略遮挡
+
+    # 等待登录结果 - 检查URL变化或成功提示
+    with tracing.span('login_wait'):
+        try:
+            # 方法1: 等待URL跳转到控制台
+            await page.wait_for_url('**/console**', timeout=8000)
+            print(f"[+] 账号 {account['username']} 登录成功！")
+
+        except:
             try:
-                # 方法1: 等待URL跳转到控制台
-                page.wait_for_url('**/console**', timeout=8000)
+                # 方法2: 等待成功提示出现
+                await page.wait_for_selector('text=登录成功', timeout=3000)
                 print(f"[+] 账号 {account['username']} 登录成功！")
-                
             except:
-                try:
-                    # 方法2: 等待成功提示出现
-                    page.wait_for_selector('text=登录成功', timeout=3000)
-                    print(f"[+] 账号 {account['username']} 登录成功！")
-                except:
-                    # 方法3: 检查是否有错误信息
-                    if page.locator('text=密码错误, text=账号不存在, text=验证失败').first.is_visible(timeout=1000):
-                        print(f"[!] 账号 {account['username']} 登录失败 - 账号或密码错误")
-                        return False
-                    else:
-                        print(f"[+] 账号 {account['username']} 可能登录成功（未检测到错误）")
+                # 方法3: 检查是否有错误信息
+                if await page.locator('text=密码错误, text=账号不存在, text=验证失败').first.is_visible(timeout=1000):
+                    print(f"[!] 账号 {account['username']} 登录失败 - 账号或密码错误")
+                    return False
+                else:
+                    print(f"[+] 账号 {account['username']} 可能登录成功（未检测到错误）")
+
+    return True
+
+async def is_session_valid(page):
+    """使用缓存的会话访问控制台，并通过 /api/user/self 确认会话未过期"""
+    try:
+        await page.goto(console_url, wait_until='domcontentloaded')
+        if '/login' in page.url:
+            return False
+        return await page.evaluate("""
+            async () => {
+                try {
+                    const user = JSON.parse(localStorage.getItem('user') || '{}');
+                    if (!user.id) return false;
+                    const response = await fetch('/api/user/self', {
+                        headers: {
+                            'Accept': 'application/json',
+                            'new-api-user': user.id.toString()
+                        }
+                    });
+                    if (!response.ok) return false;
+                    const data = await response.json();
+                    return !!data.success;
+                } catch(e) {
+                    return false;
+                }
+            }
+        """)
+    except Exception as e:
+        print(f"[*] 校验缓存会话失败: {e}")
+        return False
+
+async def login_and_sign(browser, account, session_store=None, filter_rules=None, context_pool=None,
+                         selector_cache=None, popup_guard=None):
+    """在共享浏览器中为单个账号创建独立上下文，完成登录和签到
+    
+    Args:
+        browser: 共享的浏览器实例
+        account: 账号信息
+        session_store: 会话缓存，命中时跳过登录表单
+        filter_rules: 请求拦截规则，为 None 时不拦截
+        context_pool: 预热的上下文池，需要登录时直接取用已打开页面的上下文
+        selector_cache: 选择器缓存，优先使用上次生效的签到按钮选择器
+        popup_guard: 弹窗拦截，为 None 时在页面上逐步关闭弹窗（上下文池中的上下文由池注册）
+    """
+    print(f"[*] 正在处理账号: {account['username']}")
+    
+    balance_info = None  # 存储余额信息
+    balance = None  # 结构化余额
+    context = None
+    restored = False  # 是否复用了缓存会话
+    resource_filter = ResourceFilter(filter_rules) if filter_rules else None
+    
+    try:
+        # 优先恢复缓存的会话，直接进入控制台
+        state = session_store.load(account['username']) if session_store else None
+        if state:
+            context = await new_account_context(browser, resource_filter, popup_guard, storage_state=state)
+            page = await new_account_page(context, popup_guard)
+            page.set_default_timeout(10000)
+            with tracing.span('session_restore'):
+                restored = await is_session_valid(page)
+            if restored:
+                print(f"[+] 账号 {account['username']} 使用缓存会话，跳过登录")
+            else:
+                print(f"[*] 账号 {account['username']} 缓存会话已过期，重新登录")
+                session_store.invalidate(account['username'])
+                await context.close()
+                context = None
+        if session_store:
+            session_store.record(restored)
+        
+        if context is None:
+            # 每个账号使用独立的 BrowserContext，Cookie 和 localStorage 互不影响
+            if context_pool:
+                context, page = await context_pool.acquire()
+                if resource_filter:
+                    await resource_filter.install(context)
+            else:
+                context = await new_account_context(browser, resource_filter, popup_guard)
+                # 创建页面
+                page = await new_account_page(context, popup_guard)
+            page.set_default_timeout(10000)  # 10秒超时
+            
+            if not await login(page, account, popup_guard):
+                return {'success': False, 'failure': BAD_CREDENTIALS, 'balance_info': None, 'balance': None}
+        
+        # 额外等待，确保页面完全加载（缓存会话已通过 API 校验，无需等待）
+        if not restored:
+            await asyncio.sleep(2)
+        
+        # 检查当前URL，确认是否在控制台页面
+        current_url = page.url
+        if 'console' in current_url or 'dashboard' in current_url:
+            print(f"[+] 确认已进入控制台页面")
             
-            # 额外等待，确保页面完全加载
-            time.sleep(2)
+            # 保存会话（包括 localStorage 中的 user），下次运行直接复用
+            if session_store:
+                with tracing.span('session_save'):
+                    session_store.save(account['username'], await context.storage_state())
             
-            # 检查当前URL，确认是否在控制台页面
-            current_url = page.url
-            if 'console' in current_url or 'dashboard' in current_url:
-                print(f"[+] 确认已进入控制台页面")
+            # 等待页面完全加载
+            await asyncio.sleep(2)
+            
+            
+            # 尝试自动签到（如果页面有签到功能）
+            try:
+                # 查找签到按钮或链接：上次生效的选择器优先，所有候选同时等待
+                sign_in_selectors = (selector_cache.ordered('checkin_button', SIGN_IN_SELECTORS)
+                                     if selector_cache else SIGN_IN_SELECTORS)
                 
-                # 等待页面完全加载
-                time.sleep(2)
+                signed_in = False
+                with tracing.span('checkin_click'):
+                    timeout = (selector_cache.probe_timeout('checkin_button', SIGN_IN_PROBE_TIMEOUT)
+                               if selector_cache else SIGN_IN_PROBE_TIMEOUT)
+                    selector = await probe_async(page, sign_in_selectors, timeout)
+                    if selector:
+                        try:
+                            await page.locator(selector).first.click()
+                            print(f"[+] 执行了签到操作")
+                            signed_in = True
+                        except Exception as e:
+                            print(f"[*] 点击签到按钮失败: {e}")
+                    if selector_cache:
+                        selector_cache.record('checkin_button', selector if signed_in else None)
                 
+                if not signed_in:
+                    print(f"[*] 未找到明显的签到按钮，可能已自动签到或无需手动签到")
                 
-                # 尝试自动签到（如果页面有签到功能）
-                try:
-                    # 查找签到按钮或链接
-                    sign_in_selectors = [
-                        'button:has-text("签到")',
-                        'button:has-text("打卡")', 
-                        'a:has-text("签到")',
-                        '[data-testid="sign-in"]',
-                        '.sign-in-button'
-                    ]
-                    
-                    signed_in = False
-                    for selector in sign_in_selectors:
-                        try:
-                            sign_button = page.locator(selector).first
-                            if sign_button.is_visible(timeout=1000):
-                                sign_button.click()
-                                print(f"[+] 执行了签到操作")
-                                signed_in = True
-                                break
-                        except:
-                            continue
+                # 签到后获取余额信息
+                await asyncio.sleep(1)
+                balance = await extract_balance(page)
+                if balance:
+                    balance_info = format_balance(balance)
+                    print(f"💰 余额信息: {balance_info}")
                     
-                    if not signed_in:
-                        print(f"[*] 未找到明显的签到按钮，可能已自动签到或无需手动签到")
-                    
-                    # 签到后获取余额信息
-                    time.sleep(1)
-                    balance_info = get_balance_info(page)
-                    if balance_info:
-                        print(f"💰 余额信息: {balance_info}")
-                        
-                except Exception as e:
-                    print(f"[*] 签到检测过程中出现异常: {e}")
-                
-            else:
-                print(f"[!] 未能确认登录状态，当前URL: {current_url}")
+            except Exception as e:
+                print(f"[*] 签到检测过程中出现异常: {e}")
             
-            browser.close()
-            print(f"[✓] 账号 {account['username']} 处理完成")
-            return {'success': True, 'balance_info': balance_info}
+        else:
+            # 没有进入控制台不能算签到成功，否则运行历史会把账号记为今日已签到，之后的运行都会跳过它
+            print(f"[!] 未能确认登录状态，当前URL: {current_url}")
+            return {'success': False, 'failure': UNKNOWN, 'balance_info': None, 'balance': None}
+        
+        print(f"[✓] 账号 {account['username']} 处理完成")
+        return {'success': True, 'balance_info': balance_info, 'balance': balance}
             
     except Exception as e:
         print(f"[!] 账号 {account['username']} 处理失败: {e}")
+        return {'success': False, 'failure': classify_error(e), 'balance_info': None, 'balance': None}
+    finally:
         try:
-            if 'browser' in locals():
-                browser.close()
+            if context:
+                await context.close()
         except:
             pass
-        return {'success': False, 'balance_info': None}
+        if resource_filter:
+            print(f"[*] 账号 {account['username']} {resource_filter.summary()}")
 
-def main(send_notification=True):
-    """主程序
+async def _login_and_sign_standalone(account):
+    """单独启动一个浏览器处理单个账号"""
+    try:
+        async with async_playwright() as p:
+            with tracing.span('browser_launch'):
+                browser = await launch_browser(p)
+            try:
+                with tracing.account_scope(account['username']):
+                    return await login_and_sign(browser, account, popup_guard=PopupGuard(POPUP_RULES['anyrouter']))
+            finally:
+                await browser.close()
+    except Exception as e:
+        print(f"[!] 账号 {account['username']} 处理失败: {e}")
+        return {'success': False, 'failure': classify_error(e), 'balance_info': None, 'balance': None}
+
+def optimized_login_and_sign(account):
+    """优化版浏览器自动登录和签到（单账号，独立启动浏览器）"""
+    return asyncio.run(_login_and_sign_standalone(account))
+
+async def http_login_and_sign(http_client, account):
+    """不启动浏览器，通过 HTTP 接口登录并获取余额
+
+    Returns:
+        dict: 成功时返回结果，失败时返回 None（需要回退到浏览器流程）
+    """
+    try:
+        with tracing.span('http_sign_in'):
+            quota = await asyncio.to_thread(http_client.sign_in, account)
+    except AnyRouterHTTPError as e:
+        print(f"[*] 账号 {account['username']} HTTP 方式失败（{e}），回退到浏览器流程")
+        return None
+    
+    balance = dict(quota, source='http')
+    balance_info = format_balance(balance)
+    print(f"[+] 账号 {account['username']} HTTP 登录成功")
+    print(f"💰 余额信息: {balance_info}")
+    return {'success': True, 'balance_info': balance_info, 'balance': balance}
+
+class AnyRouterAdapter(SiteAdapter):
+    """AnyRouter 适配器：优先 HTTP 接口登录，失败时回退到浏览器登录、签到并读取余额"""
+
+    site = 'anyrouter'
+    name = 'AnyRouter'
+    key = 'username'
+    context_options = {'extra_http_headers': EXTRA_HTTP_HEADERS}
+
+    def __init__(self, session_store=None, http_client=None, filter_rules=None, popup_rules=None):
+        """
+        初始化
+
+        Args:
+            session_store: 会话缓存，为 None 时每次都重新登录
+            http_client: HTTP 客户端，优先使用 HTTP 接口，失败时才启动浏览器
+            filter_rules: 浏览器请求拦截规则，为 None 时不拦截
+            popup_rules: 弹窗拦截规则，为 None 时在页面上逐步关闭弹窗
+        """
+        self.session_store = session_store
+        self.http_client = http_client
+        self.filter_rules = filter_rules
+        self.selector_cache = SelectorCache('anyrouter')
+        # 每个上下文注册一次弹窗拦截，登录时不再逐步关闭公告
+        self.popup_guard = PopupGuard(popup_rules) if popup_rules else None
+        # 不使用 HTTP 接口时每个账号都需要浏览器，立即在后台预热
+        self.eager_browser = http_client is None
+        self.used_browser = False
+
+    def load_accounts(self, shard=None):
+        return load_accounts(ANYROUTER_ACCOUNTS_FILE, shard)
+
+    async def launch_browser(self, p):
+        return await launch_browser(p)
+
+    def on_context(self, context):
+        return self.popup_guard.install(context) if self.popup_guard else None
+
+    def on_page(self, page):
+        return self.popup_guard.watch(page) if self.popup_guard else None
+
+    async def process(self, engine, account):
+        result = None
+        if self.http_client:
+            with tracing.account_scope(account['username']):
+                result = await http_login_and_sign(self.http_client, account)
+        if result is None:
+            # HTTP 方式失败时才开始预热，浏览器启动记在全局行，不算到某个账号上
+            self.used_browser = True
+            browser = await engine.browser()
+            with tracing.account_scope(account['username']):
+                result = await login_and_sign(browser, account, self.session_store, self.filter_rules,
+                                              engine.context_pool, self.selector_cache, self.popup_guard)
+        return result
+
+    def error_result(self, account, error):
+        return {'success': False, 'failure': classify_error(error), 'balance_info': None, 'balance': None}
+
+    def circuit_open_result(self, account):
+        return {'success': False, 'failure': CIRCUIT_OPEN, 'balance_info': None, 'balance': None}
+
+    def skipped_result(self, account, record):
+        """当天已签到、本次跳过的账号结果（余额使用历史记录中的最后一次）"""
+        balance = record.get('balance')
+        return {
+            'username': account['username'],
+            'success': True,
+            'skipped': True,
+            'duration': 0.0,
+            'balance_info': format_balance(balance) if balance else None,
+            'balance': balance
+        }
+
+    def finish(self, account, result, duration):
+        return {
+            'username': account['username'],
+            'success': result['success'],
+            'duration': duration,
+            'balance_info': result.get('balance_info'),
+            'balance': result.get('balance'),
+            'failure': None if result['success'] else result.get('failure')
+        }
+
+    def history_entry(self, result):
+        return {
+            'success': result['success'],
+            'status': '登录成功' if result['success'] else '登录失败',
+            'balance': result['balance'],
+            'message': describe(result['failure']) if result['failure'] else ''
+        }
+
+    def summaries(self):
+        summaries = []
+        if self.selector_cache.counts:
+            summaries.append(self.selector_cache.summary())
+        if self.popup_guard and self.used_browser:
+            summaries.append(self.popup_guard.summary())
+        return summaries
+
+    def close(self):
+        if self.http_client:
+            self.http_client.close()
+
+async def run_accounts(account_list, concurrency=1, session_store=None, http_client=None, filter_rules=None,
+                       warm_browser=None, history=None, checkpoint=None, popup_rules=None):
+    """共享一个浏览器并发处理所有账号
     
     Args:
-        send_notification: 是否发送Telegram通知
+        account_list: 账号列表
+        concurrency: 同时处理的账号数，1 表示顺序处理（保留账号间随机延迟）
+        session_store: 会话缓存，为 None 时每次都重新登录
+        http_client: HTTP 客户端，优先使用 HTTP 接口，失败时才启动浏览器（由调用方关闭）
+        filter_rules: 浏览器请求拦截规则，为 None 时不拦截
+        warm_browser: 外部传入的 WarmBrowser（例如与其他网站共用），为 None 时自行启动，用完关闭
+        history: 运行历史，每个账号处理完立即记录结果
+        checkpoint: 检查点日志，每个账号处理完立即追加结果
+        popup_rules: 弹窗拦截规则，为 None 时在页面上逐步关闭弹窗
+    
+    Returns:
+        list: 每个账号的结果，顺序与 account_list 一致
     """
-    print("=" * 70)
-    print("Optimized Auto Login Script (with balance display)")
-    print("=" * 70)
+    adapter = AnyRouterAdapter(session_store, http_client, filter_rules, popup_rules)
+    engine = SiteEngine(adapter, concurrency, warm_browser, history, checkpoint)
+    try:
+        return await engine.process_accounts(account_list)
+    finally:
+        await engine.close()
+
+async def run_all_accounts(concurrency=1, use_session_cache=True, use_http=True, block_resources=True,
+                           warm_browser=None, shard=None, history=None, skip_done=True, checkpoint=None,
+                           block_popups=True):
+    """处理账号文件中的所有账号并打印统计
     
-    success_count = 0
-    total_count = len(accounts)
-    account_results = []  # 存储每个账号的结果
+    Args:
+        concurrency: 同时处理的账号数（共享一个浏览器）
+        use_session_cache: 是否复用缓存的登录会话
+        use_http: 是否优先使用 HTTP 接口（失败时回退到浏览器）
+        block_resources: 是否拦截图片、字体、媒体和第三方统计请求
+        warm_browser: 外部传入的共享浏览器（WarmBrowser），为 None 时按需启动
+        shard: (i, n) 时只处理属于第 i 份的账号
+        history: 运行历史，为 None 时不记录也不跳过
+        skip_done: 是否跳过当天已签到成功的账号
+        checkpoint: 检查点日志，--resume 时跳过上次已处理完的账号并还原它们的结果
+        block_popups: 是否在浏览器上下文中注册弹窗拦截（否则登录时按 ESC、等待并探测关闭按钮）
     
-    start_time = time.time()
+    Returns:
+        list: 每个账号的结果
+    """
+    adapter = AnyRouterAdapter(
+        SessionStore('anyrouter') if use_session_cache else None,
+        AnyRouterHTTPClient(pool_size=max(1, concurrency)) if use_http else None,
+        SITE_RULES['anyrouter'] if block_resources else None,
+        POPUP_RULES['anyrouter'] if block_popups else None
+    )
+    engine = SiteEngine(adapter, concurrency, warm_browser, history, checkpoint, skip_done, shard)
     
-    for i, account in enumerate(accounts):
-        print(f"\n📋 处理账号 {i+1}/{total_count}: {account['username']}")
-        
-        account_start_time = time.time()
-        result = optimized_login_and_sign(account)
-        account_end_time = time.time()
-        
-        # 处理新的返回格式
-        success = result['success'] if isinstance(result, dict) else result
-        balance_info = result.get('balance_info') if isinstance(result, dict) else None
-        
-        account_result = {
-            'username': account['username'],
-            'success': success,
-            'duration': account_end_time - account_start_time,
-            'balance_info': balance_info
-        }
-        account_results.append(account_result)
-        
-        if success:
-            success_count += 1
-            print(f"✅ 成功 (耗时: {account_end_time - account_start_time:.1f}秒)")
-        else:
-            print(f"❌ 失败 (耗时: {account_end_time - account_start_time:.1f}秒)")
-        
-        # 账号间随机延迟，避免被检测
-        if i < total_count - 1:
-            delay = random.randint(1, 3)
-            print(f"⏰ 等待 {delay} 秒后处理下一个账号...")
-            time.sleep(delay)
+    start_time = time.time()
+    account_results = await engine.run()  # 存储每个账号的结果
+    total_count = len(account_results)
+    success_count = sum(1 for r in account_results if r['success'])
     
     end_time = time.time()
     total_time = end_time - start_time
@@ -485,17 +753,24 @@ def main(send_notification=True):
     print("\n" + "=" * 70)
     print("📊 处理结果统计")
     print("=" * 70)
-    print(f"✅ 成功: {success_count}/{total_count} ({success_count/total_count*100:.1f}%)")
-    print(f"❌ 失败: {total_count - success_count}/{total_count}")
+    if total_count:
+        print(f"✅ 成功: {success_count}/{total_count} ({success_count/total_count*100:.1f}%)")
+        print(f"❌ 失败: {total_count - success_count}/{total_count}")
     print(f"⏱️  总耗时: {total_time:.1f} 秒")
-    print(f"📈 平均每账号: {total_time/total_count:.1f} 秒")
+    if total_count:
+        print(f"📈 平均每账号: {total_time/total_count:.1f} 秒")
+    if adapter.session_store:
+        print(adapter.session_store.summary())
     
     # 显示账号详细信息
     print(f"\n💰 账号余额概览:")
     print("-" * 70)
     for result in account_results:
         username_short = result['username'].split('@')[0]  # 只显示用户名部分
-        status = "✅ 登录成功" if result['success'] else "❌ 登录失败"
+        if result.get('skipped'):
+            status = "⏭️ 今日已签到"
+        else:
+            status = "✅ 登录成功" if result['success'] else "❌ 登录失败"
         duration = f"⏱️ {result['duration']:.1f}s"
         
         if result['success'] and result['balance_info']:
@@ -506,31 +781,115 @@ def main(send_notification=True):
             # 只显示基本信息
             print(f"📧 {username_short:20} | {status} | {duration}")
             if not result['success']:
-                print(f"   ❌ 无法获取余额信息")
+                reason = f"（{describe(result['failure'])}）" if result.get('failure') else ""
+                print(f"   ❌ 无法获取余额信息{reason}")
     
     print("=" * 70)
     
-    # 发送Telegram通知
-    if send_notification:
-        try:
-            from telegram_notify import TelegramNotifier
-            notifier = TelegramNotifier()
-            if notifier.is_configured():
-                # 准备通知数据
-                notification_results = []
-                for result in account_results:
-                    notification_results.append({
-                        'account': result['username'],
-                        'success': result['success'],
-                        'status': '登录成功' if result['success'] else '登录失败',
-                        'balance_info': result.get('balance_info', ''),
-                        'message': ''
-                    })
-                notifier.send_anyrouter_result(notification_results)
-        except Exception as e:
-            print(f"发送Telegram通知失败: {e}")
+    return account_results
+
+def notification_results(account_results):
+    """把账号结果转换为 Telegram 通知使用的格式"""
+    return [{
+        'account': result['username'],
+        'success': result['success'],
+        'status': '今日已签到（跳过）' if result.get('skipped') else '登录成功' if result['success'] else '登录失败',
+        'balance_info': result.get('balance_info', ''),
+        'message': describe(result['failure']) if result.get('failure') else ''
+    } for result in account_results]
+
+def notify_results(account_results):
+    """发送 AnyRouter 签到结果的 Telegram 通知"""
+    try:
+        from telegram_notify import TelegramNotifier
+        notifier = TelegramNotifier(background=True)  # 后台发送，退出前自动等待发送完成
+        if notifier.is_configured():
+            with tracing.span('notification'):
+                notifier.send_anyrouter_result(notification_results(account_results))
+    except Exception as e:
+        print(f"发送Telegram通知失败: {e}")
+
+def main(send_notification=True, concurrency=1, use_session_cache=True, use_http=True, block_resources=True,
+         trace_file=None, shard=None, results_dir=None, use_history=True, force=False, resume=False,
+         block_popups=True):
+    """主程序
+    
+    Args:
+        send_notification: 是否发送Telegram通知
+        concurrency: 同时处理的账号数（共享一个浏览器）
+        use_session_cache: 是否复用缓存的登录会话
+        use_http: 是否优先使用 HTTP 接口（失败时回退到浏览器）
+        block_resources: 是否拦截图片、字体、媒体和第三方统计请求
+        trace_file: 各阶段耗时的输出文件（Chrome trace-event 格式），为 None 时不记录
+        shard: (i, n) 时只处理属于第 i 份的账号
+        results_dir: 分片结果目录，设置时把结果写入文件，由 shard_results.py 合并后统一发送通知
+        use_history: 是否记录运行历史
+        force: 为 True 时不跳过当天已签到的账号
+        resume: 为 True 时从检查点日志继续上次中断的运行
+        block_popups: 是否在浏览器上下文中注册弹窗拦截
+    """
+    if trace_file:
+        tracing.set_tracer(tracing.Tracer())
+    
+    print("=" * 70)
+    print("Optimized Auto Login Script (with balance display)")
+    print("=" * 70)
+    
+    started = datetime.now()
+    history = RunHistory() if use_history else None
+    checkpoint = Checkpoint('anyrouter', shard, resume)
+    try:
+        account_results = asyncio.run(run_all_accounts(concurrency, use_session_cache, use_http, block_resources,
+                                                       shard=shard, history=history, skip_done=not force,
+                                                       checkpoint=checkpoint, block_popups=block_popups))
+    finally:
+        checkpoint.close()
+        if history:
+            history.close()
+    
+    if results_dir:
+        write_result_file(results_dir, 'anyrouter', notification_results(account_results), shard, started)
+    elif send_notification:
+        # 发送Telegram通知
+        notify_results(account_results)
+    
+    if trace_file:
+        tracing.get_tracer().save(trace_file)
+        print(tracing.get_tracer().summary())
+        print(f"📝 耗时追踪已保存到 {trace_file}（可在 chrome://tracing 中打开）")
     
     return account_results  # 返回结果供其他脚本使用
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='AnyRouter 自动登录签到')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='同时处理的账号数（共享一个浏览器，默认 1 即顺序处理）')
+    parser.add_argument('--no-session-cache', action='store_true',
+                        help='不读取也不保存登录会话，每次都重新登录（会话缓存只在本地重复运行时有效，CI 中使用此选项）')
+    parser.add_argument('--no-http', action='store_true',
+                        help='不使用 HTTP 接口，直接使用浏览器登录')
+    parser.add_argument('--no-resource-filter', action='store_true',
+                        help='不拦截图片、字体、媒体和第三方统计请求')
+    parser.add_argument('--no-popup-guard', action='store_true',
+                        help='不在浏览器上下文中注册弹窗拦截，改为登录时逐步关闭公告')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='把各阶段耗时写入 FILE（Chrome trace-event JSON）')
+    parser.add_argument('--shard', type=parse_shard, metavar='I/N',
+                        help='只处理按账号名哈希分到第 I 份（共 N 份）的账号，用于多节点并行')
+    parser.add_argument('--results-dir', metavar='DIR',
+                        help='把结果写入 DIR 中的分片结果文件（不发送通知，由 shard_results.py 合并后发送）')
+    parser.add_argument('--no-history', action='store_true',
+                        help='不记录运行历史，也不跳过今日已签到的账号')
+    parser.add_argument('--force', action='store_true',
+                        help='重新处理今日已签到成功的账号')
+    parser.add_argument('--resume', action='store_true',
+                        help='从检查点日志继续上次中断的运行，只处理尚未完成的账号')
+    return parser.parse_args()
+
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    main(concurrency=args.concurrency, use_session_cache=not args.no_session_cache, use_http=not args.no_http,
+         block_resources=not args.no_resource_filter, trace_file=args.trace, shard=args.shard,
+         results_dir=args.results_dir, use_history=not args.no_history, force=args.force,
+         resume=args.resume, block_popups=not args.no_popup_guard)
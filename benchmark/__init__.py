@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+本地基准测试
+使用模拟站点测量 AnyRouter 和 LeafFlow 签到流程的耗时，不访问真实网站
+
+用法: python -m benchmark --accounts 5 --output bench_results.json
+"""
+
+from benchmark.mock_site import MockSite
+from benchmark.runner import run_benchmark, compare, save_report
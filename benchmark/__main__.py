@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试命令行入口
+"""
+
+import json
+import argparse
+
+from benchmark.runner import run_benchmark, compare, save_report
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='使用本地模拟站点测量签到流程耗时')
+    parser.add_argument('--accounts', type=int, default=3, help='模拟账号数')
+    parser.add_argument('--latency', type=float, default=0.05, help='页面响应延迟（秒）')
+    parser.add_argument('--api-latency', type=float, default=0.05, help='接口响应延迟（秒）')
+    parser.add_argument('--no-popups', action='store_true', help='不显示公告弹窗')
+    parser.add_argument('--concurrency', type=int, default=4, help='共享浏览器模式的并发数')
+    parser.add_argument('--launch-samples', type=int, default=3, help='浏览器启动耗时的采样次数')
+    parser.add_argument('--sites', default='anyrouter,leaflow', help='要测试的网站，逗号分隔')
+    parser.add_argument('--leaflow-api', action='store_true',
+                        help='另外测量 LeafFlow 登录后直接调用签到和余额接口的流程（默认只测量页面流程）')
+    parser.add_argument('--output', default='bench_results.json', help='JSON 结果文件')
+    parser.add_argument('--compare', metavar='OLD_JSON', help='与之前的结果文件对比')
+    parser.add_argument('--trace-dir', metavar='DIR', help='保存每个测试阶段的 trace 文件（chrome://tracing）')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    report = run_benchmark(
+        accounts=args.accounts,
+        latency=args.latency,
+        api_latency=args.api_latency,
+        popups=not args.no_popups,
+        concurrency=args.concurrency,
+        launch_samples=args.launch_samples,
+        sites=tuple(s.strip() for s in args.sites.split(',') if s.strip()),
+        trace_dir=args.trace_dir,
+        leaflow_api=args.leaflow_api
+    )
+    save_report(report, args.output)
+
+    print("\n" + "=" * 70)
+    print(f"📊 基准测试结果 (commit: {report['commit']})")
+    print("=" * 70)
+    print(f"🚀 浏览器启动: {report['browser_launch']['mean']:.2f}s")
+    if 'anyrouter' in report:
+        anyrouter = report['anyrouter']
+        print(f"🅰️ AnyRouter 单独启动: 平均 {anyrouter['standalone']['summary'].get('mean', 0):.2f}s/账号")
+        print(f"🅰️ AnyRouter 共享浏览器: 总耗时 {anyrouter['shared']['makespan']:.2f}s")
+        print(f"🅰️ AnyRouter HTTP: 总耗时 {anyrouter['http']['makespan']:.2f}s")
+        for r in anyrouter['shared']['accounts']:
+            spans = ' | '.join(f"{k} {v:.2f}s" for k, v in r['spans'].items())
+            print(f"   {r['account']}: {r['wall_time']:.2f}s {spans}")
+    for key, label in (('leaflow', '页面流程'), ('leaflow_api', '接口流程')):
+        if key not in report:
+            continue
+        print(f"🍃 LeafFlow {label}: 平均 {report[key]['summary'].get('mean', 0):.2f}s/账号")
+        for r in report[key]['accounts']:
+            steps = ' | '.join(f"{k} {v:.2f}s" for k, v in r['steps'].items())
+            print(f"   {r['account']}: {r['wall_time']:.2f}s ({r['status']}) {steps}")
+    print(f"📁 结果已保存: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        print(f"\n📈 与 {args.compare} (commit: {old.get('commit')}) 对比:")
+        for key, old_value, new_value, change in compare(old, report):
+            print(f"   {key:30} {old_value:8.2f}s → {new_value:8.2f}s ({change:+.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
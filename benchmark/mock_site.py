@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟站点
+在一个 HTTP 服务中模拟 AnyRouter（/login、/console、/api/user/*）和
+LeafFlow（/leaflow/login、/leaflow/dashboard、/leaflow/checkin、/leaflow/workspaces、/leaflow/api/*）
+支持配置页面/接口延迟和公告弹窗
+"""
+
+import json
+import time
+import threading
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+PASSWORD = 'password'
+
+ANYROUTER_POPUP = """
+<div class="semi-portal" style="position:fixed;inset:0;z-index:1000;background:rgba(0,0,0,.5)">
+  <div class="semi-modal" style="background:#fff;margin:100px auto;width:300px;padding:20px">
+    <p>系统公告</p>
+    <button onclick="this.closest('.semi-portal').remove()">关闭公告</button>
+  </div>
+</div>
+"""
+
+ANYROUTER_LOGIN = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>AnyRouter 登录</title></head>
+<body>
+{popup}
+<button id="email-login">使用 邮箱或用户名 登录</button>
+<form id="form" style="display:none">
+  <input id="username" placeholder="用户名或邮箱">
+  <input id="password" type="password" placeholder="密码">
+  <button type="submit">继续</button>
+</form>
+<div id="msg"></div>
+<script>
+document.getElementById('email-login').onclick = (e) => {{
+  e.target.style.display = 'none';
+  document.getElementById('form').style.display = 'block';
+}};
+document.getElementById('form').onsubmit = async (e) => {{
+  e.preventDefault();
+  const response = await fetch('/api/user/login', {{
+    method: 'POST',
+    headers: {{'Content-Type': 'application/json'}},
+    body: JSON.stringify({{
+      username: document.getElementById('username').value,
+      password: document.getElementById('password').value
+    }})
+  }});
+  const data = await response.json();
+  if (data.success) {{
+    localStorage.setItem('user', JSON.stringify(data.data));
+    document.getElementById('msg').textContent = '登录成功';
+    location.href = '/console';
+  }} else {{
+    document.getElementById('msg').textContent = '密码错误';
+  }}
+}};
+</script>
+</body></html>
+"""
+
+ANYROUTER_CONSOLE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>AnyRouter 控制台</title></head>
+<body>
+{popup}
+<div class="card"><div class="label">当前余额</div><div class="value">${remaining:.2f}</div></div>
+<div class="card"><div class="label">历史消耗</div><div class="value">${used:.2f}</div></div>
+<div class="card"><div class="label">请求次数</div><div class="value">{request_count}</div></div>
+</body></html>
+"""
+
+LEAFFLOW_POPUP = """
+<div id="popup" style="position:fixed;inset:0;z-index:1000;background:rgba(0,0,0,.5)">
+  <div style="background:#fff;margin:100px auto;width:300px;padding:20px">
+    <p>新功能上线</p>
+    <button onclick="document.getElementById('popup').remove()">稍后再说</button>
+  </div>
+</div>
+"""
+
+LEAFFLOW_LOGIN = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>LeafFlow 登录</title></head>
+<body>
+{popup}
+<form id="form">
+  <input type="email" id="email" placeholder="邮箱">
+  <div id="pw" style="display:none"><input type="password" id="password"></div>
+  <button type="submit">下一步</button>
+</form>
+<div id="msg"></div>
+<script>
+const pw = document.getElementById('pw');
+document.getElementById('form').onsubmit = async (e) => {{
+  e.preventDefault();
+  if (pw.style.display === 'none') {{
+    setTimeout(() => {{ pw.style.display = 'block'; }}, {step_delay_ms});
+    return;
+  }}
+  const response = await fetch('/leaflow/api/login', {{
+    method: 'POST',
+    headers: {{'Content-Type': 'application/json'}},
+    body: JSON.stringify({{
+      email: document.getElementById('email').value,
+      password: document.getElementById('password').value
+    }})
+  }});
+  const data = await response.json();
+  if (data.success) {{
+    location.href = '/leaflow/dashboard';
+  }} else {{
+    document.getElementById('msg').textContent = '账号或密码错误';
+  }}
+}};
+</script>
+</body></html>
+"""
+
+LEAFFLOW_DASHBOARD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>LeafFlow</title></head>
+<body>{popup}<h1>控制台</h1></body></html>
+"""
+
+LEAFFLOW_CHECKIN = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>LeafFlow 签到</title></head>
+<body>
+<div id="status">{status}</div>
+<button id="checkin" {disabled}>{button}</button>
+<script>
+document.getElementById('checkin').onclick = async (e) => {{
+  const response = await fetch('/leaflow/api/checkin', {{method: 'POST'}});
+  const data = await response.json();
+  document.getElementById('status').textContent = data.message;
+  e.target.textContent = data.button;
+  e.target.disabled = true;
+}};
+</script>
+</body></html>
+"""
+
+LEAFFLOW_WORKSPACES = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>LeafFlow 工作区</title></head>
+<body><button>余额 ¥{balance:.2f}</button></body></html>
+"""
+
+
+class MockSite:
+    def __init__(self, accounts, latency=0.0, api_latency=0.0, popups=True, step_delay=0.2,
+                 checkin_amount=0.5, host='127.0.0.1', port=0):
+        """
+        初始化模拟站点
+
+        Args:
+            accounts: 用户名/邮箱列表，密码统一为 PASSWORD
+            latency: 页面响应延迟（秒）
+            api_latency: 接口响应延迟（秒）
+            popups: 是否显示公告弹窗
+            step_delay: LeafFlow 点击下一步后密码框出现的延迟（秒）
+            checkin_amount: LeafFlow 签到奖励金额
+            host, port: 监听地址，端口为 0 时自动分配
+        """
+        self.latency = latency
+        self.api_latency = api_latency
+        self.popups = popups
+        self.step_delay = step_delay
+        self.checkin_amount = checkin_amount
+        self.users = {name: i for i, name in enumerate(accounts, 1)}
+        self.signed = set()
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程中启动服务"""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def user_data(self, name):
+        """/api/user/self 返回的用户数据"""
+        user_id = self.users[name]
+        return {
+            'id': user_id,
+            'username': name.split('@')[0],
+            'display_name': name.split('@')[0],
+            'quota': 500000 * (10 + user_id),
+            'used_quota': 500000 * user_id,
+            'request_count': 100 * user_id,
+        }
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def session_user(self, cookie_name):
+                cookie = SimpleCookie(self.headers.get('Cookie', ''))
+                morsel = cookie.get(cookie_name)
+                if morsel and morsel.value in site.users:
+                    return morsel.value
+                return None
+
+            def send_body(self, body, content_type='text/html; charset=utf-8', status=200, headers=None):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def send_json(self, obj, headers=None):
+                self.send_body(json.dumps(obj), 'application/json', headers=headers)
+
+            def redirect(self, location):
+                self.send_response(302)
+                self.send_header('Location', location)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def read_json(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    return json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return {}
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                time.sleep(site.api_latency if '/api/' in path else site.latency)
+
+                if path == '/login':
+                    self.send_body(ANYROUTER_LOGIN.format(popup=ANYROUTER_POPUP if site.popups else ''))
+                elif path == '/console':
+                    user = self.session_user('session')
+                    if not user:
+                        return self.redirect('/login')
+                    data = site.user_data(user)
+                    self.send_body(ANYROUTER_CONSOLE.format(
+                        popup=ANYROUTER_POPUP if site.popups else '',
+                        remaining=data['quota'] / 500000,
+                        used=data['used_quota'] / 500000,
+                        request_count=data['request_count']
+                    ))
+                elif path == '/api/user/self':
+                    user = self.session_user('session')
+                    if not user or self.headers.get('new-api-user') != str(site.users[user]):
+                        return self.send_json({'success': False, 'message': '未登录'})
+                    self.send_json({'success': True, 'data': site.user_data(user)})
+                elif path == '/leaflow/api/balance':
+                    user = self.session_user('leaflow_session')
+                    if not user:
+                        return self.send_body('{"success": false}', 'application/json', status=401)
+                    self.send_json({'success': True, 'data': {'balance': 10 + site.users[user]}})
+                elif path == '/leaflow/login':
+                    self.send_body(LEAFFLOW_LOGIN.format(
+                        popup=LEAFFLOW_POPUP if site.popups else '',
+                        step_delay_ms=int(site.step_delay * 1000)
+                    ))
+                elif path in ('/leaflow/dashboard', '/leaflow/checkin', '/leaflow/workspaces'):
+                    user = self.session_user('leaflow_session')
+                    if not user:
+                        return self.redirect('/leaflow/login')
+                    if path == '/leaflow/dashboard':
+                        self.send_body(LEAFFLOW_DASHBOARD.format(popup=LEAFFLOW_POPUP if site.popups else ''))
+                    elif path == '/leaflow/checkin':
+                        if user in site.signed:
+                            self.send_body(LEAFFLOW_CHECKIN.format(
+                                status=f'今日已签到，获得 {site.checkin_amount:.2f} 元',
+                                button='已签到', disabled='disabled'
+                            ))
+                        else:
+                            self.send_body(LEAFFLOW_CHECKIN.format(status='', button='立即签到', disabled=''))
+                    else:
+                        self.send_body(LEAFFLOW_WORKSPACES.format(balance=10 + site.users[user]))
+                else:
+                    self.send_body('Not Found', status=404)
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                time.sleep(site.api_latency)
+                body = self.read_json()
+
+                if path == '/api/user/login':
+                    name = body.get('username')
+                    if name in site.users and body.get('password') == PASSWORD:
+                        self.send_json({'success': True, 'data': site.user_data(name)},
+                                       headers={'Set-Cookie': f'session={name}; Path=/'})
+                    else:
+                        self.send_json({'success': False, 'message': '用户名或密码错误'})
+                elif path == '/leaflow/api/login':
+                    name = body.get('email')
+                    if name in site.users and body.get('password') == PASSWORD:
+                        self.send_json({'success': True},
+                                       headers={'Set-Cookie': f'leaflow_session={name}; Path=/'})
+                    else:
+                        self.send_json({'success': False})
+                elif path == '/leaflow/api/checkin':
+                    user = self.session_user('leaflow_session')
+                    if not user:
+                        return self.send_json({'success': False})
+                    with site.lock:
+                        signed_before = user in site.signed
+                        site.signed.add(user)
+                    if signed_before:
+                        return self.send_json({
+                            'success': False,
+                            'message': f'今日已签到，获得 {site.checkin_amount:.2f} 元',
+                            'button': '已签到'
+                        })
+                    self.send_json({
+                        'success': True,
+                        'message': f'签到成功，获得 {site.checkin_amount:.2f} 元',
+                        'button': '已签到'
+                    })
+                else:
+                    self.send_body('Not Found', status=404)
+
+        return Handler
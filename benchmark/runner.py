@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试执行器
+启动本地模拟站点，分别运行 AnyRouter 和 LeafFlow 的签到流程，
+记录浏览器启动耗时、每个账号的耗时、每步等待耗时和各阶段 span 耗时，输出 JSON 结果
+"""
+
+import os
+import json
+import time
+import asyncio
+import tempfile
+import subprocess
+from datetime import datetime
+
+import tracing
+from benchmark.mock_site import MockSite, PASSWORD
+
+
+def git_commit():
+    """当前代码的 commit（用于对比不同版本的结果）"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def point_sites_at(site):
+    """
+    让两个脚本的站点地址指向模拟站点（必须在导入脚本模块之前调用），
+    选择器缓存写入临时目录，不读取也不改写真实运行学到的选择器。
+    LeafFlow 接口地址在导入时读取，因此总是设置；是否走接口由每个测试场景的 use_api 决定
+    """
+    os.environ['ANYROUTER_BASE_URL'] = site.url
+    os.environ['LEAFFLOW_BASE_URL'] = f"{site.url}/leaflow"
+    os.environ['LEAFFLOW_CHECKIN_URL'] = f"{site.url}/leaflow/checkin"
+    os.environ['LEAFFLOW_CHECKIN_API_URL'] = f"{site.url}/leaflow/api/checkin"
+    os.environ['LEAFFLOW_BALANCE_API_URL'] = f"{site.url}/leaflow/api/balance"
+    os.environ['SELECTOR_CACHE_DIR'] = tempfile.mkdtemp(prefix='checkin-bench-selectors-')
+
+
+def attach_spans(results, tracer):
+    """把追踪器中每个账号的各阶段耗时附加到结果中"""
+    breakdown = tracer.breakdown()
+    for r in results:
+        r['spans'] = breakdown.get(r['account'], {})
+    return results
+
+
+def traced(phase, func, trace_dir=None):
+    """
+    用独立的追踪器运行一个测试阶段
+
+    Args:
+        phase: 阶段名称，也是 trace 文件名
+        func: 返回结果的无参函数
+        trace_dir: 保存 trace 文件的目录，为 None 时不保存
+    """
+    tracer = tracing.set_tracer(tracing.Tracer())
+    try:
+        result = func()
+    finally:
+        tracing.set_tracer(tracing.Tracer(enabled=False))
+    attach_spans(result['accounts'] if isinstance(result, dict) else result, tracer)
+    if trace_dir:
+        os.makedirs(trace_dir, exist_ok=True)
+        tracer.save(os.path.join(trace_dir, f'{phase}.json'))
+    return result
+
+
+def measure_browser_launch(samples):
+    """测量 Chromium 冷启动耗时（启动到可用）"""
+    from playwright.sync_api import sync_playwright
+    from auto_optimized import BROWSER_ARGS
+
+    durations = []
+    with sync_playwright() as p:
+        for _ in range(samples):
+            start = time.perf_counter()
+            browser = p.chromium.launch(headless=True, args=BROWSER_ARGS)
+            durations.append(time.perf_counter() - start)
+            browser.close()
+    return {
+        'samples': durations,
+        'mean': sum(durations) / len(durations) if durations else 0.0
+    }
+
+
+def bench_anyrouter_standalone(accounts):
+    """每个账号单独启动浏览器（optimized_login_and_sign）"""
+    from auto_optimized import optimized_login_and_sign
+
+    results = []
+    for account in accounts:
+        start = time.perf_counter()
+        with tracing.account_scope(account['username']):
+            result = optimized_login_and_sign(account)
+        results.append({
+            'account': account['username'],
+            'success': bool(result and result['success']),
+            'wall_time': time.perf_counter() - start
+        })
+    return results
+
+
+def bench_anyrouter_shared(accounts, concurrency, use_http):
+    """共享一个浏览器处理所有账号（run_accounts）"""
+    from auto_optimized import run_accounts
+    from anyrouter_http import AnyRouterHTTPClient
+
+    http_client = AnyRouterHTTPClient(pool_size=concurrency) if use_http else None
+    start = time.perf_counter()
+    account_results = asyncio.run(run_accounts(accounts, concurrency, http_client=http_client))
+    makespan = time.perf_counter() - start
+    if http_client:
+        http_client.close()
+    return {
+        'concurrency': concurrency,
+        'http': use_http,
+        'makespan': makespan,
+        'accounts': [{
+            'account': r['username'],
+            'success': r['success'],
+            'wall_time': r['duration']
+        } for r in account_results]
+    }
+
+
+async def run_leaflow_accounts(accounts, use_api=False):
+    """在一个浏览器中逐个运行 LeafFlowAutoCheckin.process_account"""
+    from playwright.async_api import async_playwright
+    from leaflow_playwright import LeafFlowAutoCheckin, BROWSER_ARGS
+
+    checkin = LeafFlowAutoCheckin(use_session_cache=False, use_api=use_api)
+    results = []
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=BROWSER_ARGS)
+        try:
+            for account in accounts:
+                start = time.perf_counter()
+                with tracing.account_scope(account['email']):
+                    result = await checkin.process_account(browser, account)
+                results.append({
+                    'account': account['email'],
+                    'success': result['success'],
+                    'status': result['status'],
+                    'wall_time': time.perf_counter() - start,
+                    'steps': result.get('step_waits', {})
+                })
+        finally:
+            await browser.close()
+    return results
+
+
+def bench_leaflow(accounts, use_api=False):
+    """
+    LeafFlow 账号耗时（async_playwright，与 leaflow_playwright.py 的流程一致）
+
+    Args:
+        use_api: False 时测量默认的页面流程（签到页面、状态检测、余额标签页），
+                 True 时测量登录后直接调用签到和余额接口的流程
+    """
+    return asyncio.run(run_leaflow_accounts(accounts, use_api))
+
+
+def summarize(results):
+    """计算账号耗时统计"""
+    times = [r['wall_time'] for r in results]
+    if not times:
+        return {}
+    return {
+        'accounts': len(times),
+        'success': sum(1 for r in results if r['success']),
+        'total': sum(times),
+        'mean': sum(times) / len(times),
+        'max': max(times)
+    }
+
+
+def run_benchmark(accounts=3, latency=0.05, api_latency=0.05, popups=True,
+                  concurrency=4, launch_samples=3, sites=('anyrouter', 'leaflow'), trace_dir=None,
+                  leaflow_api=False):
+    """
+    运行基准测试
+
+    Args:
+        accounts: 模拟账号数
+        latency: 页面响应延迟（秒）
+        api_latency: 接口响应延迟（秒）
+        popups: 是否显示公告弹窗
+        concurrency: 共享浏览器模式的并发数
+        launch_samples: 浏览器启动耗时的采样次数
+        sites: 要测试的网站
+        trace_dir: 每个测试阶段的 trace 文件（Chrome trace-event 格式）保存目录
+        leaflow_api: 是否另外测量 LeafFlow 的接口流程（结果在 leaflow_api 中，默认只测量页面流程）
+
+    Returns:
+        dict: 可序列化为 JSON 的结果
+    """
+    names = [f"bench{i}@example.com" for i in range(1, accounts + 1)]
+    report = {
+        'commit': git_commit(),
+        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'config': {
+            'accounts': accounts,
+            'latency': latency,
+            'api_latency': api_latency,
+            'popups': popups,
+            'concurrency': concurrency
+        }
+    }
+
+    with MockSite(names, latency=latency, api_latency=api_latency, popups=popups) as site:
+        point_sites_at(site)
+        report['browser_launch'] = measure_browser_launch(launch_samples)
+
+        if 'anyrouter' in sites:
+            anyrouter_accounts = [{'username': n, 'password': PASSWORD} for n in names]
+            standalone = traced('anyrouter_standalone',
+                                lambda: bench_anyrouter_standalone(anyrouter_accounts), trace_dir)
+            report['anyrouter'] = {
+                'standalone': {'accounts': standalone, 'summary': summarize(standalone)},
+                'shared': traced('anyrouter_shared',
+                                 lambda: bench_anyrouter_shared(anyrouter_accounts, concurrency, use_http=False),
+                                 trace_dir),
+                'http': traced('anyrouter_http',
+                               lambda: bench_anyrouter_shared(anyrouter_accounts, concurrency, use_http=True),
+                               trace_dir)
+            }
+
+        if 'leaflow' in sites:
+            leaflow_accounts = [{'email': n, 'password': PASSWORD} for n in names]
+            leaflow = traced('leaflow', lambda: bench_leaflow(leaflow_accounts), trace_dir)
+            report['leaflow'] = {'accounts': leaflow, 'summary': summarize(leaflow)}
+            if leaflow_api:
+                # 重置签到状态，接口流程同样测量一次真正的签到
+                site.signed.clear()
+                leaflow_api_results = traced('leaflow_api',
+                                             lambda: bench_leaflow(leaflow_accounts, use_api=True), trace_dir)
+                report['leaflow_api'] = {'accounts': leaflow_api_results,
+                                         'summary': summarize(leaflow_api_results)}
+
+    return report
+
+
+def compare(old, new):
+    """
+    对比两次结果的关键耗时
+
+    Returns:
+        list: (指标, 旧值, 新值, 变化百分比)
+    """
+    def metrics(report):
+        values = {'browser_launch.mean': report.get('browser_launch', {}).get('mean')}
+        anyrouter = report.get('anyrouter', {})
+        values['anyrouter.standalone.mean'] = anyrouter.get('standalone', {}).get('summary', {}).get('mean')
+        values['anyrouter.shared.makespan'] = anyrouter.get('shared', {}).get('makespan')
+        values['anyrouter.http.makespan'] = anyrouter.get('http', {}).get('makespan')
+        values['leaflow.mean'] = report.get('leaflow', {}).get('summary', {}).get('mean')
+        values['leaflow_api.mean'] = report.get('leaflow_api', {}).get('summary', {}).get('mean')
+        return values
+
+    old_values, new_values = metrics(old), metrics(new)
+    rows = []
+    for key, new_value in new_values.items():
+        old_value = old_values.get(key)
+        if old_value is None or new_value is None:
+            continue
+        change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+        rows.append((key, old_value, new_value, change))
+    return rows
+
+
+def save_report(report, path):
+    """保存 JSON 结果"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器预热池
+在后台启动 Playwright 和浏览器（与读取账号等准备工作同时进行），
+并预先创建若干个已打开页面的浏览器上下文，账号到来时直接取用，用掉一个补充一个（不超过剩余账号数）
+"""
+
+import asyncio
+from playwright.async_api import async_playwright
+
+import tracing
+
+
+class WarmBrowser:
+    def __init__(self, launch, browser=None):
+        """
+        后台启动的共享浏览器
+
+        Args:
+            launch: 启动浏览器的协程函数，参数为 Playwright 实例
+            browser: 已启动的浏览器，传入时直接使用且不负责关闭
+        """
+        self.launch = launch
+        self.browser = browser
+        self.owns_browser = browser is None
+        self.playwright = None
+        self.task = None
+
+    def start(self):
+        """开始在后台启动浏览器（重复调用无副作用），必须在事件循环中调用"""
+        if self.browser is None and self.task is None:
+            self.task = asyncio.ensure_future(self._launch())
+        return self
+
+    async def _launch(self):
+        with tracing.span('browser_launch'):
+            self.playwright = await async_playwright().start()
+            self.browser = await self.launch(self.playwright)
+        return self.browser
+
+    async def get(self):
+        """等待浏览器启动完成并返回"""
+        if self.browser is not None:
+            return self.browser
+        await self.start().task
+        return self.browser
+
+    @property
+    def started(self):
+        return self.browser is not None or self.task is not None
+
+    async def close(self):
+        """关闭自行启动的浏览器和 Playwright"""
+        if self.task and not self.task.done():
+            self.task.cancel()
+        try:
+            if self.owns_browser and self.browser:
+                await self.browser.close()
+        finally:
+            if self.playwright:
+                await self.playwright.stop()
+
+
+class ContextPool:
+    def __init__(self, warm_browser, size=2, on_context=None, on_page=None, accounts=None, **context_options):
+        """
+        预先创建的浏览器上下文池
+
+        Args:
+            warm_browser: WarmBrowser 实例
+            size: 保持空闲的上下文数
+            on_context: 上下文创建后、打开页面前调用的协程函数（例如注册弹窗拦截脚本）
+            on_page: 页面打开后、放入池中前调用的协程函数（例如注册弹窗的 locator handler）
+            accounts: 待处理的账号数，空闲上下文不超过尚未开始处理的账号数；为 None 时不限制
+            context_options: 创建上下文的参数（视口、UA、请求头等）
+        """
+        self.warm_browser = warm_browser
+        self.size = max(1, size)
+        self.on_context = on_context
+        self.on_page = on_page
+        self.context_options = context_options
+        self.waiting = accounts
+        self.idle = None
+        self.pending = 0
+        self.tasks = set()
+        self.hits = 0
+        self.misses = 0
+        self.closed = False
+
+    def start(self):
+        """开始在后台预热上下文（重复调用无副作用），必须在事件循环中调用"""
+        if self.idle is None:
+            self.idle = asyncio.Queue()
+            self.warm_browser.start()
+            self._refill()
+        return self
+
+    def account_started(self):
+        """一个账号开始处理（它之后取用的上下文不再需要预热）"""
+        if self.waiting is not None:
+            self.waiting -= 1
+
+    def _wanted(self):
+        """需要保持的空闲上下文数，剩余账号用不完的上下文不再创建"""
+        if self.waiting is None:
+            return self.size
+        return min(self.size, max(self.waiting, 0))
+
+    def _refill(self):
+        while not self.closed and self.idle.qsize() + self.pending < self._wanted():
+            self.pending += 1
+            task = asyncio.ensure_future(self._add())
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _create(self, **kwargs):
+        browser = await self.warm_browser.get()
+        context = await browser.new_context(**self.context_options, **kwargs)
+        try:
+            if self.on_context:
+                await self.on_context(context)
+            page = await context.new_page()
+            if self.on_page:
+                await self.on_page(page)
+        except Exception:
+            await context.close()
+            raise
+        return context, page
+
+    async def _add(self):
+        item = None
+        try:
+            item = await self._create()
+        except Exception as e:
+            # 放入 None，让等待中的 acquire 改为直接创建
+            print(f"[*] 预热浏览器上下文失败: {e}")
+        finally:
+            self.pending -= 1
+        self.idle.put_nowait(item)
+
+    async def acquire(self):
+        """
+        取出一个预热好的上下文，并在后台补充一个新的
+
+        Returns:
+            tuple: (context, page)，页面尚未导航
+        """
+        self.start()
+        with tracing.span('context_acquire'):
+            item = None
+            if not self.idle.empty() or self.pending:
+                item = await self.idle.get()
+            self._refill()
+            if item is not None:
+                self.hits += 1
+                return item
+            self.misses += 1
+            return await self._create()
+
+    async def close(self):
+        """关闭空闲的上下文（取出的上下文由使用者关闭）"""
+        self.closed = True
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        while self.idle is not None and not self.idle.empty():
+            item = self.idle.get_nowait()
+            if item:
+                try:
+                    await item[0].close()
+                except Exception:
+                    pass
+
+    def summary(self):
+        """预热命中统计"""
+        total = self.hits + self.misses
+        return f"🔥 预热上下文: 命中 {self.hits}/{total}"
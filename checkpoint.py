@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+断点续跑模块
+每个账号处理完立即把结果追加写入检查点日志（每行一个 JSON），
+进程中途退出后使用 --resume 重新运行时只处理日志中没有的账号，
+并用日志中的结果还原完整的签到报告
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+
+DEFAULT_CHECKPOINT_DIR = '.checkpoints'
+
+
+def checkpoint_path(site, shard=None, directory=None):
+    """检查点日志路径（每个网站、每个分片一个文件）"""
+    directory = directory or os.environ.get('CHECKPOINT_DIR', DEFAULT_CHECKPOINT_DIR)
+    name = f"{site}-shard{shard[0]}of{shard[1]}.jsonl" if shard else f"{site}.jsonl"
+    return os.path.join(directory, name)
+
+
+def read_journal(path):
+    """
+    读取检查点日志
+
+    Returns:
+        dict: {账号: 结果}，同一账号出现多次时保留最后一次；
+              最后一行可能在进程退出时只写了一半，解析失败的行会被跳过
+    """
+    finished = {}
+    if not os.path.exists(path):
+        return finished
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and 'account' in entry and 'result' in entry:
+                finished[entry['account']] = entry['result']
+    return finished
+
+
+class Checkpoint:
+    def __init__(self, site, shard=None, resume=False, directory=None):
+        """
+        打开检查点日志
+
+        Args:
+            site: 网站（anyrouter / leaflow）
+            shard: (i, n) 时使用该分片自己的日志
+            resume: True 时读取上次的日志并继续追加，False 时清空日志重新开始
+            directory: 日志目录 (可从环境变量 CHECKPOINT_DIR 读取)
+        """
+        self.site = site
+        self.path = checkpoint_path(site, shard, directory)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.finished = read_journal(self.path) if resume else {}
+        self.lock = threading.Lock()
+        self.file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        self._append({'started': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'resume': resume})
+
+    def _append(self, entry):
+        """追加一行并立即落盘，进程随时退出都不会丢失已写入的结果"""
+        with self.lock:
+            self.file.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def record(self, account, result):
+        """记录一个已处理完的账号"""
+        self._append({'account': account, 'result': result})
+
+    def split(self, accounts, key):
+        """
+        把账号分为需要处理的和上次已处理完的
+
+        Args:
+            accounts: 账号列表
+            key: 账号名字段（username / email）
+
+        Returns:
+            tuple: (需要处理的账号列表, 上次已处理完的账号结果列表)
+        """
+        pending, results = [], []
+        for account in accounts:
+            if account[key] in self.finished:
+                results.append(self.finished[account[key]])
+            else:
+                pending.append(account)
+        return pending, results
+
+    def close(self):
+        with self.lock:
+            self.file.close()
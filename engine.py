@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+签到引擎模块
+所有网站共用的账号处理流程：读取账号、跳过检查点中已处理完和当天已签到的账号、按历史耗时调度、
+共享浏览器和预热上下文池、账号超时、重试与熔断、记录运行历史和检查点、按账号文件顺序汇总结果。
+每个网站只需实现一个 SiteAdapter（登录、签到和读取余额），并发和缓存方面的改进对所有网站同时生效
+"""
+
+import os
+import time
+import random
+import asyncio
+
+from browser_pool import WarmBrowser, ContextPool
+from retry_policy import RetryPolicy
+from scheduler import Schedule
+
+# 单个账号（一次尝试）的最长处理时间（秒），超时按 TIMEOUT 失败处理并参与重试
+ACCOUNT_TIMEOUT = float(os.environ.get('CHECKIN_ACCOUNT_TIMEOUT', '180'))
+
+
+class SiteAdapter:
+    """
+    单个签到网站的适配器
+
+    子类需要设置 site、name、key，实现 load_accounts、launch_browser 和 process，
+    并按网站的结果格式实现各个 *_result 方法
+    """
+
+    site = None  # 网站标识（运行历史、检查点、缓存文件使用）
+    name = None  # 网站名称（日志使用）
+    key = None  # 账号名字段（username / email）
+    context_options = {}  # 创建浏览器上下文的参数
+    eager_browser = True  # 是否在开始处理前预热浏览器（优先走 HTTP 接口的网站按需启动）
+
+    def log(self, message):
+        """输出日志"""
+        print(message)
+
+    def load_accounts(self, shard=None):
+        """读取账号列表，shard 为 (i, n) 时只返回属于第 i 份的账号"""
+        raise NotImplementedError
+
+    async def launch_browser(self, p):
+        """用 async_playwright 实例启动浏览器"""
+        raise NotImplementedError
+
+    def on_context(self, context):
+        """
+        上下文创建后、打开页面前调用（例如注册弹窗拦截脚本）
+
+        Returns:
+            异步 API 的返回值（协程）或 None
+        """
+        return None
+
+    def on_page(self, page):
+        """
+        上下文池中的页面打开后、第一次导航前调用（例如注册弹窗的 locator handler）
+
+        Returns:
+            协程或 None
+        """
+        return None
+
+    async def process(self, engine, account):
+        """
+        登录、签到并读取余额（一次尝试）
+
+        Args:
+            engine: SiteEngine，通过 engine.browser() 和 engine.context_pool 使用共享浏览器
+            account: 账号信息
+
+        Returns:
+            dict: 带 success（失败时还有 failure）的结果
+        """
+        raise NotImplementedError
+
+    def error_result(self, account, error):
+        """处理账号时抛出异常（包括超时）的结果"""
+        raise NotImplementedError
+
+    def circuit_open_result(self, account):
+        """网站熔断后直接失败的账号结果"""
+        raise NotImplementedError
+
+    def skipped_result(self, account, record):
+        """当天已签到、本次跳过的账号结果，record 为运行历史中的记录"""
+        raise NotImplementedError
+
+    def finish(self, account, result, duration):
+        """处理完成后的最终结果（写入检查点并返回给调用方），默认不做修改"""
+        return result
+
+    def history_entry(self, result):
+        """写入运行历史的内容，默认为结果本身"""
+        return result
+
+    def summaries(self):
+        """本次运行的各项统计（选择器缓存、弹窗拦截等）"""
+        return []
+
+    def close(self):
+        """释放网站自己的资源（例如 HTTP 客户端）"""
+
+
+class SiteEngine:
+    def __init__(self, adapter, concurrency=1, warm_browser=None, history=None, checkpoint=None, skip_done=True,
+                 shard=None, account_timeout=ACCOUNT_TIMEOUT):
+        """
+        初始化
+
+        Args:
+            adapter: SiteAdapter 实例
+            concurrency: 同时处理的账号数，1 表示顺序处理（保留账号间随机延迟）
+            warm_browser: 外部传入的 WarmBrowser（例如与其他网站共用），为 None 时自行启动，用完关闭
+            history: 运行历史，为 None 时不记录也不跳过
+            checkpoint: 检查点日志，每个账号处理完立即追加结果
+            skip_done: 是否跳过当天已签到成功的账号
+            shard: (i, n) 时只处理属于第 i 份的账号
+            account_timeout: 单个账号一次尝试的最长时间（秒），为 None 时不限制
+                             (可从环境变量 CHECKIN_ACCOUNT_TIMEOUT 读取)
+        """
+        self.adapter = adapter
+        self.concurrency = max(1, concurrency)
+        self.history = history
+        self.checkpoint = checkpoint
+        self.skip_done = skip_done
+        self.shard = shard
+        self.account_timeout = account_timeout
+        self.owns_browser = warm_browser is None
+        self.warm_browser = warm_browser or WarmBrowser(adapter.launch_browser)
+        self.context_pool = None
+        # 超时和网站无法访问时退避重试，连续多次失败后熔断，剩余账号直接失败
+        self.retry_policy = RetryPolicy(adapter.name, log=adapter.log)
+        self.schedule = None
+        self.run_time = 0.0
+
+    async def browser(self):
+        """共享的浏览器实例，第一次调用时才开始预热（浏览器启动不计入某个账号）"""
+        self.context_pool.start()
+        return await self.warm_browser.get()
+
+    async def _on_context(self, context):
+        result = self.adapter.on_context(context)
+        if result is not None:
+            await result
+
+    async def _on_page(self, page):
+        result = self.adapter.on_page(page)
+        if result is not None:
+            await result
+
+    def split(self, accounts):
+        """
+        跳过检查点中已处理完的账号（--resume）和当天已签到成功的账号
+
+        Returns:
+            tuple: (需要处理的账号, 跳过账号的结果)
+        """
+        adapter = self.adapter
+        skipped = []
+        if self.checkpoint:
+            accounts, skipped = self.checkpoint.split(accounts, adapter.key)
+            if skipped:
+                adapter.log(f"⏩ {len(skipped)} 个账号上次运行已处理完，从检查点恢复结果")
+        if self.history and self.skip_done:
+            accounts, done = self.history.split_done(adapter.site, accounts, adapter.key)
+            skipped += [adapter.skipped_result(account, record) for account, record in done]
+            if done:
+                adapter.log(f"⏭️ {len(done)} 个账号今日已签到，跳过（--force 可强制重新处理）")
+        return accounts, skipped
+
+    def in_file_order(self, accounts, results):
+        """
+        按账号文件中的顺序排列结果（跳过、从检查点恢复和本次处理的账号混在一起）
+
+        Args:
+            accounts: load_accounts 返回的账号列表
+            results: 所有账号的结果，每个结果都带账号名字段
+        """
+        key = self.adapter.key
+        position = {account[key]: i for i, account in enumerate(accounts)}
+        return sorted(results, key=lambda r: position.get(r[key], len(position)))
+
+    async def attempt(self, account):
+        """处理一次账号，异常和超时转换为失败结果"""
+        try:
+            return await asyncio.wait_for(self.adapter.process(self, account), self.account_timeout)
+        except asyncio.TimeoutError:
+            error = asyncio.TimeoutError(f"Timeout {self.account_timeout:g}s exceeded")
+        except Exception as e:
+            error = e
+        self.adapter.log(f"❌ {account[self.adapter.key]} 处理时发生异常: {error}")
+        return self.adapter.error_result(account, error)
+
+    async def process_accounts(self, accounts):
+        """
+        共享一个浏览器并发处理账号
+
+        Returns:
+            list: 每个账号的结果，顺序与 accounts 一致
+        """
+        adapter = self.adapter
+        total_count = len(accounts)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # 预热与并发数相同的上下文，账号需要浏览器时直接取用
+        self.context_pool = ContextPool(self.warm_browser, self.concurrency, self._on_context, self._on_page,
+                                        total_count, **adapter.context_options)
+        if adapter.eager_browser:
+            self.context_pool.start()
+
+        async def worker(i, account):
+            name = account[adapter.key]
+            async with semaphore:
+                self.context_pool.account_started()
+                adapter.log(f"\n📋 处理账号 {i+1}/{total_count}: {name}")
+                start = time.time()
+                result = await self.retry_policy.run_async(
+                    name, lambda: self.attempt(account), lambda: adapter.circuit_open_result(account)
+                )
+                duration = time.time() - start
+                result = adapter.finish(account, result, duration)
+                status = "✅" if result['success'] else "❌"
+                adapter.log(f"{status} {name} {'成功' if result['success'] else '失败'} (耗时: {duration:.1f}秒)")
+
+                if self.history:
+                    self.history.record(adapter.site, name, adapter.history_entry(result), duration)
+                if self.checkpoint:
+                    self.checkpoint.record(name, result)
+
+                # 顺序模式下账号间随机延迟，避免被检测（熔断后剩余账号不再访问网站，无需延迟）
+                if self.concurrency == 1 and i < total_count - 1 and not self.retry_policy.breaker.is_open:
+                    delay = random.randint(1, 3)
+                    adapter.log(f"⏰ 等待 {delay} 秒后处理下一个账号...")
+                    await asyncio.sleep(delay)
+                return result
+
+        try:
+            # gather 按传入顺序返回结果
+            return list(await asyncio.gather(*(worker(i, account) for i, account in enumerate(accounts))))
+        finally:
+            await self.context_pool.close()
+            if self.context_pool.hits or self.context_pool.misses:
+                adapter.log(self.context_pool.summary())
+            if self.retry_policy.retries or self.retry_policy.fail_fast:
+                adapter.log(self.retry_policy.summary())
+            for summary in adapter.summaries():
+                adapter.log(summary)
+
+    async def close(self):
+        """关闭自行启动的浏览器"""
+        if self.owns_browser and self.warm_browser.started:
+            await self.warm_browser.close()
+
+    async def run(self):
+        """
+        读取账号并处理，结果按账号文件中的顺序
+
+        Returns:
+            list: 每个账号的结果
+        """
+        adapter = self.adapter
+        if adapter.eager_browser:
+            # 读取账号的同时在后台启动浏览器
+            self.warm_browser.start()
+        try:
+            # 运行时才读取账号文件（导入模块不会读取）
+            loaded = adapter.load_accounts(self.shard)
+            accounts, skipped = self.split(loaded)
+            # 并发处理时按历史耗时从长到短安排账号，慢账号不会排在最后
+            self.schedule = Schedule(self.history, adapter.site, accounts, adapter.key, self.concurrency)
+            processed = []
+            if accounts:
+                run_start = time.time()
+                processed = await self.process_accounts(self.schedule.accounts)
+                self.run_time = time.time() - run_start
+                if self.concurrency > 1:
+                    adapter.log(self.schedule.summary(self.run_time))
+            return self.in_file_order(loaded, skipped + processed)
+        finally:
+            await self.close()
+            adapter.close()
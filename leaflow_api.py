@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LeafFlow 接口客户端
+登录后通过浏览器上下文的 context.request（APIRequestContext，与页面共用 Cookie）
+直接调用签到和余额接口，不再打开签到页面和工作区页面并解析 DOM。
+接口失败（非 JSON、未登录、格式不符）时抛出 LeafFlowAPIError，由调用方回退到页面流程
+"""
+
+import json
+
+
+class LeafFlowAPIError(Exception):
+    """接口调用失败，需要回退到页面流程"""
+
+
+def parse_json(status, text):
+    """解析接口响应，返回 HTML（登录页、防护页面）或非 2xx 时抛出异常"""
+    if not 200 <= status < 300:
+        raise LeafFlowAPIError(f"HTTP {status}")
+    try:
+        data = json.loads(text)
+    except ValueError:
+        raise LeafFlowAPIError("响应不是 JSON（可能未登录或被防护页面拦截）")
+    if not isinstance(data, dict):
+        raise LeafFlowAPIError("响应格式不正确")
+    return data
+
+
+def parse_checkin(data):
+    """
+    解析签到接口的响应
+
+    Returns:
+        dict: signed_before 为 True 表示今日已签到过，message 为接口返回的提示，
+              amount 为接口返回的金额（没有时为 None，由调用方从提示中提取）
+    """
+    message = str(data.get('message') or data.get('msg') or '')
+    amount = data.get('amount')
+    if isinstance(data.get('data'), dict):
+        amount = data['data'].get('amount', amount)
+    if data.get('success'):
+        signed_before = False
+    elif '已签到' in message:
+        signed_before = True
+    else:
+        raise LeafFlowAPIError(f"签到失败: {message or '未知错误'}")
+    return {
+        'signed_before': signed_before,
+        'message': message,
+        'amount': float(amount) if amount is not None else None
+    }
+
+
+def parse_balance(data):
+    """解析余额接口的响应，返回总余额"""
+    payload = data.get('data') if isinstance(data.get('data'), dict) else data
+    if data.get('success') is False or 'balance' not in payload:
+        raise LeafFlowAPIError(f"获取余额失败: {data.get('message', '响应中缺少余额')}")
+    try:
+        return float(payload['balance'])
+    except (TypeError, ValueError):
+        raise LeafFlowAPIError(f"余额格式不正确: {payload['balance']}")
+
+
+class LeafFlowAPI:
+    def __init__(self, request, checkin_url, balance_url, timeout=10000):
+        """
+        初始化
+
+        Args:
+            request: 已登录上下文的 context.request（async_playwright，方法为协程）
+            checkin_url: 签到接口（POST）
+            balance_url: 余额接口（GET）
+            timeout: 请求超时（毫秒）
+        """
+        self.request = request
+        self.checkin_url = checkin_url
+        self.balance_url = balance_url
+        self.timeout = timeout
+
+    async def _call(self, method, url):
+        try:
+            response = await self.request.fetch(url, method=method, timeout=self.timeout, max_redirects=0,
+                                                headers={'Accept': 'application/json'})
+            return parse_json(response.status, await response.text())
+        except LeafFlowAPIError:
+            raise
+        except Exception as e:
+            raise LeafFlowAPIError(f"请求失败: {e}")
+
+    async def checkin(self):
+        """调用签到接口，返回 parse_checkin 的结果"""
+        return parse_checkin(await self._call('POST', self.checkin_url))
+
+    async def balance(self):
+        """调用余额接口，返回总余额"""
+        return parse_balance(await self._call('GET', self.balance_url))
@@ -5,19 +5,174 @@ LeafFlow 自动签到脚本 - Playwright版本
 从Selenium迁移到Playwright，提供更好的性能和稳定性
 """
 
-import time
-import random
+import os
 import re
+import json
+import asyncio
+import argparse
 import logging
 from datetime import datetime
-from playwright.sync_api import sync_playwright
+from session_store import SessionStore
+from resource_filter import ResourceFilter, SITE_RULES
+from readiness import ReadinessTracker, ResponseWatcher, is_checkin_response
+from accounts import LEAFFLOW_ACCOUNTS_FILE, iter_accounts, parse_shard
+from shard_results import write_result_file
+from run_history import RunHistory
+from checkpoint import Checkpoint
+from engine import SiteAdapter, SiteEngine
+from leaflow_api import LeafFlowAPI, LeafFlowAPIError
+from selector_cache import SelectorCache, probe_async
+from popup_guard import PopupGuard, SITE_RULES as POPUP_RULES
+from retry_policy import BAD_CREDENTIALS, SELECTOR_NOT_FOUND, CIRCUIT_OPEN, classify_error, describe
+import tracing
 
-class LeafFlowAutoCheckin:
-    def __init__(self):
-        """初始化"""
+# 站点地址（可通过环境变量指向本地模拟站点）
+BASE_URL = os.environ.get('LEAFFLOW_BASE_URL', 'https://leaflow.net').rstrip('/')
+LOGIN_URL = f"{BASE_URL}/login"
+CHECKIN_URL = os.environ.get('LEAFFLOW_CHECKIN_URL', 'https://checkin.leaflow.net')
+WORKSPACES_URL = f"{BASE_URL}/workspaces"
+
+# 签到和余额接口（通过 context.request 直接调用，失败时回退到页面流程）
+# 没有公开的接口文档，只有两个地址都通过环境变量明确设置时才使用接口，否则始终走页面流程
+CHECKIN_API_URL = os.environ.get('LEAFFLOW_CHECKIN_API_URL')
+BALANCE_API_URL = os.environ.get('LEAFFLOW_BALANCE_API_URL')
+
+# 页面元素
+EMAIL_INPUT = "input[type='email'], input[placeholder*='邮箱']"
+PASSWORD_INPUT = "input[type='password']"
+BALANCE_BUTTON = "button:has-text('余额')"
+CHECKIN_RESULT_TEXT = "text=/签到成功|已签到|获得/"
+
+# 登录成功后跳转的页面
+LOGIN_REDIRECT_URL = re.compile(r'/(dashboard|home)')
+
+# 浏览器启动参数
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-extensions',
+    '--no-first-run',
+    '--disable-default-apps'
+]
+
+# 每个账号的浏览器上下文配置
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1280, 'height': 800},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+# 查找并点击可用的签到按钮
+CHECKIN_BUTTON_JS = """
+    () => {
+        const buttons = Array.from(document.querySelectorAll('button'));
+        for (let button of buttons) {
+            if (button.textContent.includes('签到') && 
+                !button.textContent.includes('已') &&
+                !button.disabled) {
+                button.click();
+                return true;
+            }
+        }
+        return false;
+    }
+"""
+
+# 签到按钮的备用选择器
+CHECKIN_SELECTORS = [
+    "button:not([disabled]):has-text('立即签到')",
+    "button:not([disabled]):has-text('签到')",
+    "[onclick*='checkin']",
+    "[onclick*='sign']",
+    ".checkin-button",
+    ".sign-button"
+]
+
+# 签到按钮的候选（文本匹配、备用选择器和 JavaScript 点击），上次生效的候选优先
+CHECKIN_JS_STRATEGY = 'javascript'
+CHECKIN_CANDIDATES = ["button:has-text('签到'):not(:has-text('已'))"] + CHECKIN_SELECTORS + [CHECKIN_JS_STRATEGY]
+# 同时等待所有候选选择器的时间（毫秒）
+CHECKIN_PROBE_TIMEOUT = 1000
+
+# 在页面中判断签到状态，只把结论返回给 Python（规则与原来对 page.content() 的文本判断一致）
+# phase 为 before（点击前：是否已签到）或 after（点击后：是否签到成功）
+CHECKIN_STATE_JS = """(phase) => {
+    const html = document.documentElement.outerHTML;
+    let amount = 0;
+    for (const match of html.matchAll(/(\\d+\\.?\\d*)\\s*元/g)) {
+        const value = parseFloat(match[1]);
+        if (value >= 0.01 && value <= 10) {  // 合理的奖励范围
+            amount = value;
+            break;
+        }
+    }
+    let state;
+    if (phase === 'before') {
+        const signed = html.includes('今日已签到') || (html.includes('已签到') && !html.includes('立即签到'));
+        state = signed ? 'already_signed' : 'not_signed';
+    } else if (html.includes('签到成功') || html.includes('获得') || amount > 0) {
+        state = 'signed_now';
+    } else {
+        state = html.includes('已签到') ? 'already_signed' : 'unknown';
+    }
+    // html_bytes 为 page.content() 需要传输的字节数，用于对比
+    return {state, amount, html_bytes: new TextEncoder().encode(html).length};
+}"""
+
+# 从余额按钮中提取总余额
+BALANCE_JS = """() => {
+    const buttons = Array.from(document.querySelectorAll('button'));
+    const balanceBtn = buttons.find(btn => btn.textContent.includes('¥') && btn.textContent.includes('余额'));
+    if (balanceBtn) {
+        const text = balanceBtn.textContent.trim();
+        const match = text.match(/¥([\\d.]+)/);
+        return match ? parseFloat(match[1]) : 0;
+    }
+    return 0;
+}"""
+
+class LeafFlowAutoCheckin(SiteAdapter):
+    """基于 async_playwright 的 LeafFlow 签到（SiteEngine 的适配器），在一个事件循环和一个浏览器中并发处理多个账号"""
+    
+    site = 'leaflow'
+    name = 'LeafFlow'
+    key = 'email'
+    context_options = CONTEXT_OPTIONS
+    
+    def __init__(self, concurrency=1, use_session_cache=True, block_resources=True, step_budgets=None, shard=None,
+                 history=None, skip_done=True, checkpoint=None, use_api=True, block_popups=True):
+        """
+        初始化
+        
+        Args:
+            concurrency: 同时处理的账号数，1 表示顺序处理（保留账号间随机延迟）
+            use_session_cache: 是否复用缓存的登录会话
+            block_resources: 是否拦截图片、字体、媒体和第三方统计请求
+            step_budgets: 覆盖默认值的每步等待预算（毫秒），见 readiness.DEFAULT_BUDGETS
+            shard: (i, n) 时只处理按邮箱哈希分到第 i 份的账号
+            history: 运行历史（RunHistory），为 None 时不记录也不跳过
+            skip_done: 是否跳过当天已签到成功的账号
+            checkpoint: 检查点日志（Checkpoint），每个账号处理完立即追加结果
+            use_api: 登录后是否直接调用签到和余额接口（失败时回退到页面流程），
+                     只有设置了 LEAFFLOW_CHECKIN_API_URL 和 LEAFFLOW_BALANCE_API_URL 时才生效
+            block_popups: 是否在浏览器上下文中注册弹窗拦截（否则每步按钮探测和 ESC 关闭弹窗）
+        """
         self.setup_logging()
         self.results = []
         self.start_time = datetime.now()
+        self.session_store = SessionStore('leaflow') if use_session_cache else None
+        self.filter_rules = SITE_RULES['leaflow'] if block_resources else None
+        self.step_budgets = step_budgets
+        self.shard = shard
+        self.history = history
+        self.skip_done = skip_done
+        self.checkpoint = checkpoint
+        self.use_api = bool(use_api and CHECKIN_API_URL and BALANCE_API_URL)
+        self.selector_cache = SelectorCache('leaflow')  # 记住上次生效的签到按钮选择器
+        self.popup_guard = PopupGuard(POPUP_RULES['leaflow']) if block_popups else None
+        self.state_bytes = {'html': 0, 'verdict': 0}  # 状态检测传输的字节数与 page.content() 的对比
+        self.concurrency = max(1, concurrency)
+        self.context_pool = None  # SiteEngine 创建的预热上下文池
         
     def setup_logging(self):
         """设置日志 - 仅控制台输出"""
@@ -30,27 +185,56 @@ class LeafFlowAutoCheckin:
         )
         self.logger = logging.getLogger(__name__)
         
-    def read_accounts(self):
-        """读取账号列表"""
+    def read_accounts(self, shard=None):
+        """读取账号列表，shard 为 (i, n) 时只返回属于第 i 份的账号"""
         try:
-            with open('leaflow-account.txt', 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            accounts = []
-            for line in lines:
-                line = line.strip()
-                if line and ',' in line:
-                    email, password = line.split(',', 1)
-                    accounts.append({
-                        'email': email.strip(),
-                        'password': password.strip()
-                    })
+            accounts = list(iter_accounts(LEAFFLOW_ACCOUNTS_FILE, 'email', shard, warn=self.logger.warning))
             
-            self.logger.info(f"成功读取 {len(accounts)} 个账号")
+            shard_info = f"（分片 {shard[0]}/{shard[1]}）" if shard else ""
+            self.logger.info(f"成功读取 {len(accounts)} 个账号{shard_info}")
             return accounts
         except Exception as e:
             self.logger.error(f"读取账号失败: {str(e)}")
             return []
+
+    def skipped_result(self, account, record):
+        """当天已签到、本次跳过的账号结果（金额和余额使用历史记录中的最后一次）"""
+        result = self.new_result(account['email'])
+        result['status'] = '今日已签到（跳过）'
+        result['amount'] = record['amount'] or 0.0
+        result['message'] = record['message'] or ''
+        result['success'] = True
+        result['skipped'] = True
+        if record['total_balance']:
+            result['total_balance'] = record['total_balance']
+        return result
+    
+    def new_result(self, email):
+        """创建单个账号的结果字典"""
+        return {
+            'email': email,
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'status': '',
+            'amount': 0.0,
+            'message': '',
+            'success': False
+        }
+    
+    def error_result(self, account, error):
+        """处理账号时发生异常的结果"""
+        result = self.new_result(account['email'])
+        result['status'] = '异常'
+        result['message'] = str(error)
+        result['failure'] = classify_error(error)
+        return result
+    
+    def circuit_open_result(self, account):
+        """网站熔断后直接失败的账号结果"""
+        result = self.new_result(account['email'])
+        result['status'] = '已跳过'
+        result['message'] = describe(CIRCUIT_OPEN)
+        result['failure'] = CIRCUIT_OPEN
+        return result
     
     def extract_amount(self, text):
         """从文本中提取金额"""
@@ -63,277 +247,472 @@ class LeafFlowAutoCheckin:
                 return amount
         return 0.0
     
-    def handle_popup(self, page):
+    def count_state_bytes(self, state):
+        """累计状态检测实际传输的字节数和 page.content() 需要传输的字节数"""
+        self.state_bytes['html'] += state['html_bytes']
+        self.state_bytes['verdict'] += len(json.dumps(state).encode('utf-8'))
+        return state
+    
+    def state_bytes_summary(self):
+        """状态检测传输量统计"""
+        html, verdict = self.state_bytes['html'], self.state_bytes['verdict']
+        return f"🔎 签到状态检测传输 {verdict:,} 字节（page.content() 需要 {html:,} 字节）"
+    
+    def apply_api_checkin(self, result, checkin):
+        """把签到接口的结果写入账号结果（状态与页面流程一致）"""
+        amount = checkin['amount'] if checkin['amount'] is not None else self.extract_amount(checkin['message'])
+        if checkin['signed_before']:
+            result['status'] = '今日已签到'
+            result['message'] = f'获得 {amount:.2f} 元' if amount > 0 else '已签到'
+        else:
+            result['status'] = '签到成功'
+            result['message'] = f'获得 {amount:.2f} 元'
+        result['amount'] = amount
+        result['success'] = True
+    
+    def new_resource_filter(self):
+        """为单个账号创建请求拦截器"""
+        return ResourceFilter(self.filter_rules) if self.filter_rules else None
+    
+    async def handle_popup(self, page):
         """处理弹窗"""
-        try:
-            # 方法1: 点击"稍后再说"按钮
-            later_btn = page.locator("button:has-text('稍后再说')")
-            if later_btn.is_visible(timeout=1000):
-                later_btn.click()
-                self.logger.debug("关闭弹窗：稍后再说")
+        if self.popup_guard:
+            # 弹窗已由上下文中的初始化脚本和 locator handler 处理
+            return False
+        with tracing.span('popup'):
+            try:
+                # 方法1: 点击"稍后再说"按钮
+                later_btn = page.locator("button:has-text('稍后再说')")
+                if await later_btn.is_visible(timeout=1000):
+                    await later_btn.click()
+                    self.logger.debug("关闭弹窗：稍后再说")
+                    return True
+            except:
+                pass
+        
+            try:
+                # 方法2: 按ESC键关闭弹窗
+                await page.keyboard.press('Escape')
+                self.logger.debug("关闭弹窗：ESC键")
                 return True
-        except:
-            pass
+            except:
+                pass
         
+            return False
+    
+    async def click_checkin_by_js(self, page):
+        """通过 JavaScript 查找并点击签到按钮"""
         try:
-            # 方法2: 按ESC键关闭弹窗
-            page.keyboard.press('Escape')
-            self.logger.debug("关闭弹窗：ESC键")
-            return True
-        except:
-            pass
-        
-        return False
+            return bool(await page.evaluate(CHECKIN_BUTTON_JS))
+        except Exception as e:
+            self.logger.debug(f"JavaScript点击失败: {str(e)}")
+            return False
     
-    def click_checkin_button(self, page):
-        """点击签到按钮的多种方法"""
+    async def click_checkin_button(self, page):
+        """点击签到按钮：上次生效的方式优先，所有候选选择器同时等待"""
         self.logger.info("尝试点击签到按钮...")
+        candidates = self.selector_cache.ordered('checkin_button', CHECKIN_CANDIDATES)
         
-        # 方法1: 通过文本查找签到按钮
-        try:
-            self.logger.info("方法1: 通过文本查找按钮")
-            # 查找包含"签到"但不包含"已"的按钮
-            sign_btn = page.locator("button:has-text('签到')").filter(has_not_text="已")
-            if sign_btn.count() > 0:
-                sign_btn.first.click()
-                self.logger.info("✅ 成功点击签到按钮（文本匹配）")
-                return True
-        except Exception as e:
-            self.logger.debug(f"方法1失败: {str(e)}")
+        # 上次通过 JavaScript 点击成功时先使用 JavaScript
+        use_js_first = candidates[0] == CHECKIN_JS_STRATEGY
+        if use_js_first and await self.click_checkin_by_js(page):
+            self.logger.info("✅ 成功点击签到按钮（JavaScript）")
+            self.selector_cache.record('checkin_button', CHECKIN_JS_STRATEGY)
+            return True
         
-        # 方法2: 通过JavaScript执行点击
-        try:
-            self.logger.info("方法2: JavaScript点击")
-            result = page.evaluate("""
-                () => {
-                    const buttons = Array.from(document.querySelectorAll('button'));
-                    for (let button of buttons) {
-                        if (button.textContent.includes('签到') && 
-                            !button.textContent.includes('已') &&
-                            !button.disabled) {
-                            button.click();
-                            return true;
-                        }
-                    }
-                    return false;
-                }
-            """)
-            if result:
-                self.logger.info("✅ 成功点击签到按钮（JavaScript）")
+        # 签到按钮是必需的，即使上次没有找到也完整等待
+        selector = await probe_async(page, [c for c in candidates if c != CHECKIN_JS_STRATEGY],
+                                     CHECKIN_PROBE_TIMEOUT)
+        if selector:
+            try:
+                await page.locator(selector).first.click()
+                self.logger.info(f"✅ 成功点击签到按钮（选择器: {selector}）")
+                self.selector_cache.record('checkin_button', selector)
                 return True
-        except Exception as e:
-            self.logger.debug(f"方法2失败: {str(e)}")
+            except Exception as e:
+                self.logger.debug(f"点击 {selector} 失败: {str(e)}")
         
-        # 方法3: 通过图标或特殊标记查找
-        try:
-            self.logger.info("方法3: 查找可点击的签到元素")
-            # 尝试多个可能的选择器
-            selectors = [
-                "button:not([disabled]):has-text('立即签到')",
-                "button:not([disabled]):has-text('签到')",
-                "[onclick*='checkin']",
-                "[onclick*='sign']",
-                ".checkin-button",
-                ".sign-button"
-            ]
-            
-            for selector in selectors:
-                try:
-                    element = page.locator(selector).first
-                    if element.is_visible(timeout=500):
-                        element.click()
-                        self.logger.info(f"✅ 成功点击签到按钮（选择器: {selector}）")
-                        return True
-                except:
-                    continue
-                    
-        except Exception as e:
-            self.logger.debug(f"方法3失败: {str(e)}")
+        if not use_js_first and await self.click_checkin_by_js(page):
+            self.logger.info("✅ 成功点击签到按钮（JavaScript）")
+            self.selector_cache.record('checkin_button', CHECKIN_JS_STRATEGY)
+            return True
         
+        self.selector_cache.record('checkin_button', None)
         self.logger.error("❌ 所有点击方法都失败了")
         return False
     
-    def get_account_balance(self, page):
+    async def get_account_balance(self, page, readiness=None):
         """获取账户总余额"""
+        readiness = readiness or ReadinessTracker()
         try:
             # 返回主页获取余额
-            page.goto("https://leaflow.net/workspaces", wait_until='domcontentloaded')
-            time.sleep(2)
-
-            # 从页面提取余额
-            total_balance = page.evaluate("""() => {
-                const buttons = Array.from(document.querySelectorAll('button'));
-                const balanceBtn = buttons.find(btn => btn.textContent.includes('¥') && btn.textContent.includes('余额'));
-                if (balanceBtn) {
-                    const text = balanceBtn.textContent.trim();
-                    const match = text.match(/¥([\\d.]+)/);
-                    return match ? parseFloat(match[1]) : 0;
-                }
-                return 0;
-            }""")
-
-            return total_balance
-
+            with tracing.span('goto_balance'):
+                await page.goto(WORKSPACES_URL, wait_until='domcontentloaded')
         except Exception as e:
             self.logger.warning(f"⚠️ 获取总余额失败: {str(e)}")
             return 0
+        return await self.read_balance(page, readiness)
+    
+    async def read_balance(self, page, readiness):
+        """等待工作区页面的余额按钮出现并读取总余额"""
+        try:
+            with readiness.step('balance_page', optional=True):
+                await page.locator(BALANCE_BUTTON).first.wait_for(timeout=readiness.timeout('balance_page'))
+            with tracing.span('balance_extract'):
+                return await page.evaluate(BALANCE_JS)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 获取总余额失败: {str(e)}")
+            return 0
+    
+    async def open_balance_tab(self, context):
+        """在第二个标签页中开始加载工作区页面（不等待加载完成），与签到页面同时加载"""
+        try:
+            with tracing.span('goto_balance'):
+                balance_page = await self.new_page(context)
+                balance_page.set_default_timeout(10000)  # 10秒超时
+                await balance_page.goto(WORKSPACES_URL, wait_until='commit')
+            return balance_page
+        except Exception as e:
+            self.logger.warning(f"⚠️ 打开余额标签页失败: {str(e)}")
+            return None
+    
+    async def open_checkin_and_balance(self, context, page, readiness):
+        """
+        同时开始加载签到页面和余额标签页，余额页面不再等签到页面加载完才开始
 
-    def process_account(self, browser, account):
-        """处理单个账号"""
-        email = account['email']
-        password = account['password']
+        Returns:
+            Page: 余额标签页，打开失败时返回 None
+        """
+        balance_page, _ = await asyncio.gather(self.open_balance_tab(context),
+                                               self.open_checkin_page(page, readiness))
+        return balance_page
+    
+    async def reload_balance_tab(self, balance_page):
+        """签到接口响应后重新开始加载余额标签页（不等待），读到的余额包含本次签到奖励"""
+        try:
+            await balance_page.goto(WORKSPACES_URL, wait_until='commit')
+        except Exception as e:
+            self.logger.warning(f"⚠️ 刷新余额标签页失败: {str(e)}")
+    
+    async def collect_balance(self, page, balance_page, readiness):
+        """汇合余额分支：从余额标签页读取，没有余额标签页时在当前页面打开工作区"""
+        if balance_page is None:
+            return await self.get_account_balance(page, readiness)
+        return await self.read_balance(balance_page, readiness)
+    
+    async def login(self, page, email, password, readiness):
+        """登录账号（步骤1-7）"""
+        self.logger.info(f"[{email}] 步骤1: 访问登录页面...")
+        with tracing.span('goto_login'):
+            await page.goto(LOGIN_URL, wait_until='domcontentloaded')
+        with readiness.step('login_page', optional=True):
+            await page.locator(EMAIL_INPUT).first.wait_for(timeout=readiness.timeout('login_page'))
+
+        self.logger.info(f"[{email}] 步骤2: 处理弹窗...")
+        await self.handle_popup(page)
+
+        self.logger.info(f"[{email}] 步骤3: 输入邮箱...")
+        email_input = page.locator(EMAIL_INPUT).first
+        with tracing.span('fill_email'):
+            await email_input.fill(email)
+
+        self.logger.info(f"[{email}] 步骤4: 触发密码框...")
+        password_input = page.locator(PASSWORD_INPUT).first
+        try:
+            submit_btn = page.locator("button[type='submit']").first
+            if await submit_btn.is_visible():
+                with tracing.span('password_step'):
+                    await submit_btn.click()
+                with readiness.step('password_input', optional=True):
+                    await password_input.wait_for(timeout=readiness.timeout('password_input'))
+        except:
+            pass
+
+        self.logger.info(f"[{email}] 步骤5: 输入密码...")
+        with tracing.span('fill_password'):
+            await password_input.fill(password)
+
+        self.logger.info(f"[{email}] 步骤6: 提交登录...")
+        with tracing.span('submit'):
+            await password_input.press('Enter')
+
+        # 等待页面跳转到 dashboard 或 home
+        with readiness.step('login_redirect', optional=True):
+            await page.wait_for_url(LOGIN_REDIRECT_URL, timeout=readiness.timeout('login_redirect'))
+            self.logger.info(f"[{email}] ✅ 登录成功")
         
-        result = {
-            'email': email,
-            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'status': '',
-            'amount': 0.0,
-            'message': '',
-            'success': False
-        }
+        # 检查是否仍在登录页
+        if 'login' in page.url:
+            self.logger.error(f"[{email}] ❌ 登录失败")
+            return False
+
+        self.logger.info(f"[{email}] 步骤7: 再次处理弹窗...")
+        await self.handle_popup(page)
         
-        # 创建新的浏览器上下文和页面
-        context = browser.new_context(
-            viewport={'width': 1280, 'height': 800},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
-        page = context.new_page()
-        page.set_default_timeout(10000)  # 10秒超时
+        return True
+    
+    async def new_context(self, browser, resource_filter=None, **kwargs):
+        """创建账号的浏览器上下文，并注册请求拦截器"""
+        context = await browser.new_context(**CONTEXT_OPTIONS, **kwargs)
+        if self.popup_guard:
+            await self.popup_guard.install(context)
+        if resource_filter:
+            await resource_filter.install(context)
+        return context
+    
+    async def new_page(self, context):
+        """打开页面，启用弹窗拦截时在第一次导航前注册 locator handler"""
+        if self.popup_guard:
+            return await self.popup_guard.new_page(context)
+        return await context.new_page()
+    
+    async def open_checkin_page(self, page, readiness):
+        """打开签到页面，等待签到内容（或会话过期时的登录表单）出现"""
+        with tracing.span('goto_checkin'):
+            await page.goto(CHECKIN_URL, wait_until='domcontentloaded')
+        with readiness.step('checkin_page', optional=True):
+            ready = page.get_by_text('签到').or_(page.locator(PASSWORD_INPUT)).first
+            await ready.wait_for(timeout=readiness.timeout('checkin_page'))
+    
+    async def wait_checkin_result(self, page, watcher, readiness, balance_page=None):
+        """点击签到后等待签到接口响应和结果文字，而不是固定等待"""
+        with readiness.step('checkin_response', optional=True):
+            if watcher.matched is None:
+                await page.wait_for_event('response', predicate=is_checkin_response,
+                                          timeout=readiness.timeout('checkin_response'))
+        if balance_page:
+            # 余额页面在等待结果文字的同时重新加载
+            await self.reload_balance_tab(balance_page)
+        with readiness.step('checkin_result', optional=True):
+            await page.locator(CHECKIN_RESULT_TEXT).first.wait_for(timeout=readiness.timeout('checkin_result'))
+    
+    def new_api(self, context):
+        """使用上下文 Cookie 的接口客户端"""
+        return LeafFlowAPI(context.request, CHECKIN_API_URL, BALANCE_API_URL)
+    
+    async def detect_checkin_state(self, page, phase):
+        """
+        在页面中判断签到状态
+
+        Args:
+            phase: before（点击前）或 after（点击后）
+
+        Returns:
+            dict: state 为 already_signed / not_signed / signed_now / unknown，amount 为奖励金额
+        """
+        return self.count_state_bytes(await page.evaluate(CHECKIN_STATE_JS, phase))
+    
+    async def api_session_valid(self, context):
+        """通过余额接口校验缓存会话，不打开签到页面"""
+        try:
+            with tracing.span('api_balance'):
+                await self.new_api(context).balance()
+            return True
+        except LeafFlowAPIError:
+            return False
+    
+    async def api_checkin(self, context, page, result, readiness):
+        """
+        通过接口签到并读取余额
+
+        Returns:
+            bool: 签到完成时返回 True，接口不可用时返回 False（回退到页面流程）
+        """
+        if not self.use_api:
+            return False
         
+        email = result['email']
+        api = self.new_api(context)
         try:
-            self.logger.info(f"\n{'='*60}")
-            self.logger.info(f"处理账号: {email}")
-            self.logger.info(f"{'='*60}")
-            
-            # 1. 访问登录页面
-            self.logger.info("步骤1: 访问登录页面...")
-            page.goto("https://leaflow.net/login", wait_until='domcontentloaded')
-            time.sleep(2)
-            
-            # 2. 处理弹窗
-            self.logger.info("步骤2: 处理弹窗...")
-            self.handle_popup(page)
-            
-            # 3. 输入邮箱
-            self.logger.info("步骤3: 输入邮箱...")
-            email_input = page.locator("input[type='email'], input[placeholder*='邮箱']").first
-            email_input.fill(email)
-            time.sleep(0.5)
-            
-            # 4. 触发密码框（如果需要）
-            self.logger.info("步骤4: 触发密码框...")
+            with tracing.span('api_checkin'):
+                checkin = await api.checkin()
+        except LeafFlowAPIError as e:
+            self.logger.info(f"[{email}] 签到接口不可用（{e}），回退到页面流程")
+            return False
+        
+        self.apply_api_checkin(result, checkin)
+        self.logger.info(f"[{email}] ✅ {result['status']}（接口），获得 {result['amount']:.2f} 元")
+        
+        try:
+            with tracing.span('api_balance'):
+                total_balance = await api.balance()
+        except LeafFlowAPIError as e:
+            self.logger.info(f"[{email}] 余额接口不可用（{e}），从工作区页面读取")
+            total_balance = await self.get_account_balance(page, readiness)
+        if total_balance > 0:
+            result['total_balance'] = total_balance
+            self.logger.info(f"[{email}] 💰 账户总余额: {total_balance:.2f} 元")
+        return True
+    
+    async def restore_session(self, browser, email, resource_filter=None, readiness=None):
+        """恢复缓存的会话并直接打开签到页面（同时开始加载余额标签页）
+
+        Returns:
+            tuple: (context, page, balance_page)，缓存未命中或会话已过期时返回 (None, None, None)；
+                   通过接口校验会话时没有打开页面，balance_page 为 None
+        """
+        if not self.session_store:
+            return None, None, None
+        
+        state = self.session_store.load(email)
+        context, page, balance_page = None, None, None
+        if state:
+            context = await self.new_context(browser, resource_filter, storage_state=state)
             try:
-                submit_btn = page.locator("button[type='submit']").first
-                if submit_btn.is_visible():
-                    submit_btn.click()
-                    time.sleep(1)
-            except:
-                pass
-            
-            # 5. 输入密码
-            self.logger.info("步骤5: 输入密码...")
-            password_input = page.locator("input[type='password']").first
-            password_input.fill(password)
-            time.sleep(0.5)
-            
-            # 6. 提交登录
-            self.logger.info("步骤6: 提交登录...")
-            password_input.press('Enter')
+                page = await self.new_page(context)
+                page.set_default_timeout(10000)  # 10秒超时
+                if self.use_api and await self.api_session_valid(context):
+                    valid = True
+                else:
+                    balance_page = await self.open_checkin_and_balance(context, page,
+                                                                       readiness or ReadinessTracker())
+                    valid = not await self.is_login_page(page)
+            except Exception as e:
+                self.logger.warning(f"[{email}] ⚠️ 恢复缓存会话失败: {str(e)}")
+                valid = False
             
-            # 等待页面跳转
-            try:
-                page.wait_for_url('**/dashboard**', timeout=5000)
-                self.logger.info("✅ 登录成功")
-            except:
-                try:
-                    page.wait_for_url('**/home**', timeout=3000)
-                    self.logger.info("✅ 登录成功")
-                except:
-                    # 检查是否仍在登录页
-                    if 'login' in page.url:
-                        result['status'] = '登录失败'
-                        result['message'] = '账号或密码错误'
-                        self.logger.error(f"❌ 登录失败")
-                        return result
+            if valid:
+                self.logger.info(f"[{email}] 🔑 使用缓存会话，跳过登录")
+            else:
+                self.logger.info(f"[{email}] 缓存会话已过期，重新登录")
+                self.session_store.invalidate(email)
+                await context.close()
+                context, page, balance_page = None, None, None
+        
+        self.session_store.record(context is not None)
+        return context, page, balance_page
+    
+    async def is_login_page(self, page):
+        """判断是否被重定向到了登录页（会话过期）"""
+        return 'login' in page.url or await page.locator(PASSWORD_INPUT).count() > 0
+    
+    async def process_account(self, browser, account):
+        """处理单个账号（一次尝试）"""
+        email = account['email']
+        password = account['password']
+        
+        result = self.new_result(email)
+        context = None
+        resource_filter = self.new_resource_filter()
+        readiness = ReadinessTracker(self.step_budgets)
+        
+        try:
+            # 优先使用缓存会话，直接进入签到页面
+            with tracing.span('session_restore'):
+                # balance_page 为与签到页面同时加载的余额标签页
+                context, page, balance_page = await self.restore_session(browser, email, resource_filter,
+                                                                         readiness)
             
-            # 7. 再次处理弹窗
-            self.logger.info("步骤7: 再次处理弹窗...")
-            self.handle_popup(page)
-            time.sleep(1)
+            if context is None:
+                # 每个账号使用独立的浏览器上下文，优先取用预热好的
+                if self.context_pool:
+                    context, page = await self.context_pool.acquire()
+                    if resource_filter:
+                        await resource_filter.install(context)
+                else:
+                    context = await self.new_context(browser, resource_filter)
+                    page = await self.new_page(context)
+                page.set_default_timeout(10000)  # 10秒超时
+                
+                if not await self.login(page, email, password, readiness):
+                    result['status'] = '登录失败'
+                    result['message'] = '账号或密码错误'
+                    result['failure'] = BAD_CREDENTIALS
+                    return result
+                
+                # 接口模式下先调用接口，失败时才打开签到页面
+                if not self.use_api:
+                    self.logger.info(f"[{email}] 步骤8: 访问签到页面...")
+                    balance_page = await self.open_checkin_and_balance(context, page, readiness)
+                
+                # 保存会话，下次运行直接复用
+                if self.session_store and not await self.is_login_page(page):
+                    with tracing.span('session_save'):
+                        self.session_store.save(email, await context.storage_state())
             
-            # 8. 访问签到页面
-            self.logger.info("步骤8: 访问签到页面...")
-            page.goto("https://checkin.leaflow.net", wait_until='domcontentloaded')
-            time.sleep(2)
+            # 直接调用签到和余额接口，不加载签到页面和工作区页面
+            if await self.api_checkin(context, page, result, readiness):
+                return result
+            if self.use_api and not page.url.startswith(CHECKIN_URL):
+                self.logger.info(f"[{email}] 步骤8: 访问签到页面...")
+                balance_page = await self.open_checkin_and_balance(context, page, readiness)
+            elif balance_page is None:
+                balance_page = await self.open_balance_tab(context)
             
-            # 9. 分析页面状态
-            self.logger.info("步骤9: 分析页面状态...")
-            page_content = page.content()
+            self.logger.info(f"[{email}] 步骤9: 分析页面状态...")
+            with tracing.span('analyze_page'):
+                state = await self.detect_checkin_state(page, 'before')
             
             # 检查是否已签到
-            if '今日已签到' in page_content or ('已签到' in page_content and '立即签到' not in page_content):
-                amount = self.extract_amount(page_content)
+            if state['state'] == 'already_signed':
+                amount = state['amount']
                 result['status'] = '今日已签到'
                 result['amount'] = amount
                 result['message'] = f'获得 {amount:.2f} 元' if amount > 0 else '已签到'
                 result['success'] = True
-                self.logger.info(f"✅ 今日已签到，获得 {amount:.2f} 元")
-
-                # 获取账户总余额
-                total_balance = self.get_account_balance(page)
+                self.logger.info(f"[{email}] ✅ 今日已签到，获得 {amount:.2f} 元")
+                
+                total_balance = await self.collect_balance(page, balance_page, readiness)
                 if total_balance > 0:
                     result['total_balance'] = total_balance
-                    self.logger.info(f"💰 账户总余额: {total_balance:.2f} 元")
-
+                    self.logger.info(f"[{email}] 💰 账户总余额: {total_balance:.2f} 元")
+                
                 return result
             
-            # 10. 执行签到
-            self.logger.info("步骤10: 执行签到...")
-            
-            # 尝试点击签到按钮
-            if self.click_checkin_button(page):
-                time.sleep(2)
+            self.logger.info(f"[{email}] 步骤10: 执行签到...")
+            # 点击前开始记录签到接口响应
+            watcher = ResponseWatcher(is_checkin_response)
+            page.on('response', watcher)
+            with tracing.span('checkin_click'):
+                clicked = await self.click_checkin_button(page)
+            if clicked:
+                await self.wait_checkin_result(page, watcher, readiness, balance_page)
                 
                 # 检查签到结果
-                page_content = page.content()
-                amount = self.extract_amount(page_content)
+                state = await self.detect_checkin_state(page, 'after')
+                amount = state['amount']
                 
-                if '签到成功' in page_content or '获得' in page_content or amount > 0:
+                if state['state'] == 'signed_now':
                     result['status'] = '签到成功'
                     result['amount'] = amount
                     result['message'] = f'获得 {amount:.2f} 元'
                     result['success'] = True
-                    self.logger.info(f"✅ 签到成功！获得 {amount:.2f} 元")
+                    self.logger.info(f"[{email}] ✅ 签到成功！获得 {amount:.2f} 元")
                     
-                    # 获取账户总余额
-                    total_balance = self.get_account_balance(page)
+                    total_balance = await self.collect_balance(page, balance_page, readiness)
                     if total_balance > 0:
                         result['total_balance'] = total_balance
-                        self.logger.info(f"💰 账户总余额: {total_balance:.2f} 元")
-                        
-                elif '今日已签到' in page_content or '已签到' in page_content:
+                        self.logger.info(f"[{email}] 💰 账户总余额: {total_balance:.2f} 元")
+                
+                elif state['state'] == 'already_signed':
                     result['status'] = '签到成功（已确认）'
                     result['amount'] = amount
                     result['message'] = f'获得 {amount:.2f} 元' if amount > 0 else '签到成功'
                     result['success'] = True
-                    self.logger.info(f"✅ 签到已完成")
+                    self.logger.info(f"[{email}] ✅ 签到已完成")
                 else:
                     result['status'] = '签到状态未知'
                     result['message'] = '未能确认签到结果'
-                    self.logger.warning("⚠️ 签到状态未知")
+                    self.logger.warning(f"[{email}] ⚠️ 签到状态未知")
             else:
                 result['status'] = '签到失败'
                 result['message'] = '无法点击签到按钮'
-                self.logger.error("❌ 无法点击签到按钮")
-
-                
+                result['failure'] = SELECTOR_NOT_FOUND
+                self.logger.error(f"[{email}] ❌ 无法点击签到按钮")
+        
         except Exception as e:
             result['status'] = '处理失败'
             result['message'] = str(e)
-            self.logger.error(f"❌ 处理失败: {str(e)}")
+            result['failure'] = classify_error(e)
+            self.logger.error(f"[{email}] ❌ 处理失败: {str(e)}")
         finally:
             # 关闭页面和上下文
-            context.close()
+            if context:
+                await context.close()
+            if resource_filter:
+                self.logger.info(f"[{email}] {resource_filter.summary()}")
+            result['step_waits'] = dict(readiness.waits)
+            self.logger.info(f"[{email}] {readiness.summary()}")
         
         return result
     
@@ -342,62 +721,67 @@ class LeafFlowAutoCheckin:
         # 不再保存文件，只在控制台输出
         pass
     
-    def run(self, send_notification=True):
-        """运行主流程"""
+    def log_header(self):
+        """打印脚本开始信息"""
         self.logger.info("=" * 80)
         self.logger.info("🚀 LeafLow 自动签到脚本 (Playwright版)")
         self.logger.info(f"⏰ 开始时间: {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
         self.logger.info("=" * 80)
+    
+    def log(self, message):
+        self.logger.info(message)
+    
+    def load_accounts(self, shard=None):
+        return self.read_accounts(shard)
+    
+    def on_context(self, context):
+        return self.popup_guard.install(context) if self.popup_guard else None
+    
+    def on_page(self, page):
+        return self.popup_guard.watch(page) if self.popup_guard else None
+    
+    async def process(self, engine, account):
+        browser = await engine.browser()
+        self.context_pool = engine.context_pool
+        with tracing.account_scope(account['email']):
+            return await self.process_account(browser, account)
+    
+    async def run_async(self, send_notification=True, warm_browser=None):
+        """
+        通过 SiteEngine 处理所有账号
+
+        Args:
+            send_notification: 是否发送Telegram通知
+            warm_browser: 外部传入的 WarmBrowser（例如与其他网站共用），为 None 时自行启动并在结束时关闭
+        """
+        self.log_header()
+        self.logger.info(f"并发数: {self.concurrency}")
         
-        # 读取账号
-        accounts = self.read_accounts()
-        if not accounts:
+        engine = SiteEngine(self, self.concurrency, warm_browser, self.history, self.checkpoint, self.skip_done,
+                            self.shard)
+        self.results = await engine.run()
+        if not self.results:
             self.logger.error("没有找到有效账号")
             return
         
-        # 启动Playwright
-        with sync_playwright() as p:
-            # 启动浏览器（无头模式）
-            browser = p.chromium.launch(
-                headless=True,  # 设置为False可以看到浏览器窗口
-                channel="chrome",  # 使用系统Chrome
-                args=[
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-extensions',
-                    '--no-first-run',
-                    '--disable-default-apps'
-                ]
-            )
-            
-            # 处理每个账号
-            for i, account in enumerate(accounts, 1):
-                self.logger.info(f"\n[{i}/{len(accounts)}] 开始处理第{i}个账号...")
-                
-                try:
-                    result = self.process_account(browser, account)
-                    self.results.append(result)
-                except Exception as e:
-                    self.logger.error(f"处理账号时发生异常: {str(e)}")
-                    self.results.append({
-                        'email': account['email'],
-                        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        'status': '异常',
-                        'amount': 0.0,
-                        'message': str(e),
-                        'success': False
-                    })
-                
-                # 账号间延迟
-                if i < len(accounts):
-                    delay = random.randint(1, 3)
-                    self.logger.info(f"等待 {delay} 秒后处理下一个账号...")
-                    time.sleep(delay)
-            
-            # 关闭浏览器
-            browser.close()
+        self.report(send_notification)
         
+        return self.results
+    
+    async def launch_browser(self, p):
+        """启动无头浏览器（使用系统Chrome）"""
+        return await p.chromium.launch(
+            headless=True,
+            channel="chrome",  # 使用系统Chrome
+            args=BROWSER_ARGS
+        )
+    
+    def run(self, send_notification=True):
+        """运行主流程"""
+        return asyncio.run(self.run_async(send_notification))
+    
+    def report(self, send_notification=True):
+        """打印总结并发送通知"""
         # 打印总结
         self.logger.info("\n" + "=" * 80)
         self.logger.info("📊 签到完成 - 最终结果")
@@ -411,6 +795,14 @@ class LeafFlowAutoCheckin:
         self.logger.info(f"失败数量: {len(self.results) - success_count}")
         if len(self.results) > 0:
             self.logger.info(f"成功率: {success_count/len(self.results)*100:.1f}%")
+        if self.session_store:
+            self.logger.info(self.session_store.summary())
+        if self.state_bytes['html']:
+            self.logger.info(self.state_bytes_summary())
+        if self.selector_cache.counts:
+            self.logger.info(self.selector_cache.summary())
+        if self.popup_guard:
+            self.logger.info(self.popup_guard.summary())
         self.logger.info(f"💰 总获得金额: {total_amount:.2f} 元")
         
         self.logger.info("\n📋 账号明细:")
@@ -432,29 +824,90 @@ class LeafFlowAutoCheckin:
         if send_notification:
             try:
                 from telegram_notify import TelegramNotifier
-                notifier = TelegramNotifier()
+                notifier = TelegramNotifier(background=True)  # 后台发送，退出前自动等待发送完成
                 if notifier.is_configured():
-                    notifier.send_leaflow_result(self.results)
+                    with tracing.span('notification'):
+                        notifier.send_leaflow_result(self.results)
             except Exception as e:
                 print(f"发送Telegram通知失败: {e}")
-        
-        return self.results  # 返回结果供其他脚本使用
 
-def main(send_notification=True):
+def main(send_notification=True, concurrency=1, use_session_cache=True, block_resources=True, trace_file=None,
+         shard=None, results_dir=None, use_history=True, force=False, resume=False, use_api=True,
+         block_popups=True):
     """主函数
     
     Args:
         send_notification: 是否发送Telegram通知
+        concurrency: 同时处理的账号数，1 表示顺序处理（保留账号间随机延迟）
+        use_session_cache: 是否复用缓存的登录会话
+        block_resources: 是否拦截图片、字体、媒体和第三方统计请求
+        trace_file: 各阶段耗时的输出文件（Chrome trace-event 格式），为 None 时不记录
+        shard: (i, n) 时只处理按邮箱哈希分到第 i 份的账号
+        results_dir: 分片结果目录，设置时把结果写入文件，由 shard_results.py 合并后统一发送通知
+        use_history: 是否记录运行历史
+        force: 为 True 时不跳过当天已签到的账号
+        resume: 为 True 时从检查点日志继续上次中断的运行
+        use_api: 登录后是否直接调用签到和余额接口（需要设置接口地址的环境变量）
+        block_popups: 是否在浏览器上下文中注册弹窗拦截
     """
+    if trace_file:
+        tracing.set_tracer(tracing.Tracer())
+    
+    history = RunHistory() if use_history else None
+    checkpoint = Checkpoint('leaflow', shard, resume)
     try:
-        checkin = LeafFlowAutoCheckin()
-        return checkin.run(send_notification)
+        checkin = LeafFlowAutoCheckin(concurrency, use_session_cache, block_resources, shard=shard,
+                                      history=history, skip_done=not force, checkpoint=checkpoint,
+                                      use_api=use_api, block_popups=block_popups)
+        results = checkin.run(send_notification and not results_dir)
+        if results_dir:
+            write_result_file(results_dir, 'leaflow', results or [], shard, checkin.start_time)
+        return results
     except KeyboardInterrupt:
         print("\n\n⏸️ 用户中断执行")
         return []
     except Exception as e:
         print(f"\n\n❌ 程序异常: {str(e)}")
         return []
+    finally:
+        checkpoint.close()
+        if history:
+            history.close()
+        if trace_file:
+            tracing.get_tracer().save(trace_file)
+            print(tracing.get_tracer().summary())
+            print(f"📝 耗时追踪已保存到 {trace_file}（可在 chrome://tracing 中打开）")
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='LeafFlow 自动签到')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='同时处理的账号数（共享一个浏览器，默认 1 即顺序处理）')
+    parser.add_argument('--no-session-cache', action='store_true',
+                        help='不读取也不保存登录会话，每次都重新登录（会话缓存只在本地重复运行时有效，CI 中使用此选项）')
+    parser.add_argument('--no-resource-filter', action='store_true',
+                        help='不拦截图片、字体、媒体和第三方统计请求')
+    parser.add_argument('--no-api', action='store_true',
+                        help='即使设置了 LEAFFLOW_CHECKIN_API_URL/LEAFFLOW_BALANCE_API_URL，也不调用接口，始终打开签到页面和工作区页面')
+    parser.add_argument('--no-popup-guard', action='store_true',
+                        help='不在浏览器上下文中注册弹窗拦截，改为每步探测并关闭弹窗')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='把各阶段耗时写入 FILE（Chrome trace-event JSON）')
+    parser.add_argument('--shard', type=parse_shard, metavar='I/N',
+                        help='只处理按邮箱哈希分到第 I 份（共 N 份）的账号，用于多节点并行')
+    parser.add_argument('--results-dir', metavar='DIR',
+                        help='把结果写入 DIR 中的分片结果文件（不发送通知，由 shard_results.py 合并后发送）')
+    parser.add_argument('--no-history', action='store_true',
+                        help='不记录运行历史，也不跳过今日已签到的账号')
+    parser.add_argument('--force', action='store_true',
+                        help='重新处理今日已签到成功的账号')
+    parser.add_argument('--resume', action='store_true',
+                        help='从检查点日志继续上次中断的运行，只处理尚未完成的账号')
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(concurrency=args.concurrency, use_session_cache=not args.no_session_cache,
+         block_resources=not args.no_resource_filter, trace_file=args.trace, shard=args.shard,
+         results_dir=args.results_dir, use_history=not args.no_history, force=args.force,
+         resume=args.resume, use_api=not args.no_api, block_popups=not args.no_popup_guard)
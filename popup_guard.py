@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+弹窗拦截模块
+在浏览器上下文上注册一次：初始化脚本中的 MutationObserver 在公告弹窗插入页面时立即移除
+（或点击"稍后再说"），漏掉的弹窗由 Playwright 的 locator handler 在操作前兜底处理，
+登录流程中不再需要按 ESC、等待和逐个探测关闭按钮。
+locator handler 注册在页面上，打开页面后、第一次导航前调用 watch（或直接使用 new_page）
+"""
+
+import json
+
+# 处理一个节点及其子节点中的弹窗，返回处理的弹窗数
+SWEEP_JS = """
+(root, rules) => {
+    let count = 0;
+    const collect = selector => {
+        const nodes = root.matches && root.matches(selector) ? [root] : [];
+        return nodes.concat(Array.from(root.querySelectorAll(selector)));
+    };
+    // 弹窗内容晚于弹窗插入时，新插入的节点在弹窗内部，需要向上查找
+    const enclosing = selector => {
+        const el = root.parentElement && root.parentElement.closest(selector);
+        return el ? [el] : [];
+    };
+    for (const selector of rules.remove) {
+        for (const el of collect(selector).concat(rules.match.length ? enclosing(selector) : [])) {
+            // 设置了 match 时只移除文字中包含其中之一的弹窗（例如公告），不影响其他对话框
+            if (rules.match.length && !rules.match.some(text => el.textContent.includes(text))) {
+                continue;
+            }
+            const target = (rules.container && el.closest(rules.container)) || el;
+            if (target.isConnected) {
+                target.remove();
+                count++;
+            }
+        }
+    }
+    if (rules.dismiss.length) {
+        for (const button of collect('button')) {
+            if (rules.dismiss.includes(button.textContent.trim())) {
+                button.click();
+                count++;
+            }
+        }
+    }
+    return count;
+}
+"""
+
+# 初始化脚本：页面任何脚本执行前注册，监听之后插入的所有节点
+INIT_SCRIPT = """
+(() => {
+    const sweep = %s;
+    const rules = %s;
+    new MutationObserver(mutations => {
+        for (const mutation of mutations) {
+            for (const node of mutation.addedNodes) {
+                if (node.nodeType === Node.ELEMENT_NODE) {
+                    sweep(node, rules);
+                } else if (mutation.target.tagName === 'BUTTON') {
+                    // 按钮文字晚于按钮插入
+                    sweep(mutation.target, rules);
+                }
+            }
+        }
+    }).observe(document, {childList: true, subtree: true});
+})();
+"""
+
+
+class PopupRules:
+    def __init__(self, remove_selectors=(), container=None, dismiss_texts=(), match_texts=()):
+        """
+        单个网站的弹窗规则
+
+        Args:
+            remove_selectors: 直接移除的弹窗选择器（CSS）
+            container: 移除时向上查找的外层容器（例如 Semi UI 的 .semi-portal），找不到时只移除弹窗本身
+            dismiss_texts: 点击关闭的按钮文字（完全匹配），用于需要由网站自己关闭的弹窗
+            match_texts: 只移除文字中包含其中之一的弹窗，为空时移除所有匹配选择器的弹窗
+        """
+        self.remove_selectors = tuple(remove_selectors)
+        self.container = container
+        self.dismiss_texts = tuple(dismiss_texts)
+        self.match_texts = tuple(match_texts)
+
+    def as_js(self):
+        """传给 SWEEP_JS 的规则"""
+        return {
+            'remove': list(self.remove_selectors),
+            'container': self.container,
+            'dismiss': list(self.dismiss_texts),
+            'match': list(self.match_texts)
+        }
+
+    def handler_selector(self):
+        """locator handler 监听的选择器（任意一个弹窗可见即触发）"""
+        if self.match_texts:
+            selectors = [f"{selector}:has-text({json.dumps(text, ensure_ascii=False)})"
+                         for selector in self.remove_selectors for text in self.match_texts]
+        else:
+            selectors = list(self.remove_selectors)
+        selectors += [f"button:text-is({json.dumps(text, ensure_ascii=False)})" for text in self.dismiss_texts]
+        return ', '.join(selectors)
+
+
+# 各网站的弹窗规则
+SITE_RULES = {
+    # 系统公告（Semi UI 模态框）；控制台中签到结果、确认框等其他对话框保留
+    'anyrouter': PopupRules(remove_selectors=('.semi-modal', '.semi-dialog'), container='.semi-portal',
+                            match_texts=('公告',)),
+    # 新功能提示
+    'leaflow': PopupRules(dismiss_texts=('稍后再说',)),
+}
+
+
+class PopupGuard:
+    def __init__(self, rules):
+        """
+        单个网站的弹窗拦截器，同一网站的所有上下文共用
+
+        Args:
+            rules: PopupRules 弹窗规则
+        """
+        self.rules = rules
+        self.script = INIT_SCRIPT % (SWEEP_JS.strip(), json.dumps(rules.as_js(), ensure_ascii=False))
+        self.handled = 0
+
+    def handle(self, locator):
+        """locator handler：初始化脚本漏掉的弹窗在操作前处理；返回值在异步 API 下是协程，由 Playwright 负责等待"""
+        self.handled += 1
+        return locator.evaluate_all(f"(els, rules) => els.forEach(el => ({SWEEP_JS.strip()})(el, rules))",
+                                    self.rules.as_js())
+
+    async def watch(self, page):
+        """在页面上注册 locator handler，必须在页面第一次导航和操作前完成"""
+        await page.add_locator_handler(page.locator(self.rules.handler_selector()), self.handle,
+                                       no_wait_after=True)
+
+    async def install(self, context):
+        """在浏览器上下文上注册初始化脚本（之后打开的页面都会执行）"""
+        await context.add_init_script(script=self.script)
+
+    async def new_page(self, context):
+        """打开页面并注册 locator handler"""
+        page = await context.new_page()
+        await self.watch(page)
+        return page
+
+    def summary(self):
+        """兜底处理统计"""
+        return f"🛡️ 弹窗拦截: 初始化脚本之外兜底处理 {self.handled} 次"
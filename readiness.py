@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面就绪等待模块
+用具体信号（元素可见、网络响应、加载状态）代替固定 sleep，
+为每个步骤设置等待预算，并统计每个步骤实际的等待耗时
+"""
+
+import time
+from contextlib import contextmanager
+
+import tracing
+
+# 每个步骤的等待预算（毫秒）
+DEFAULT_BUDGETS = {
+    'login_page': 10000,      # 登录页加载到邮箱输入框可见
+    'password_input': 5000,   # 点击下一步后密码框可见
+    'login_redirect': 8000,   # 提交登录后跳转到 dashboard/home
+    'checkin_page': 10000,    # 签到页加载到签到相关内容可见
+    'checkin_response': 5000, # 点击签到后等待签到接口响应
+    'checkin_result': 3000,   # 签到结果文字出现
+    'balance_page': 8000,     # 余额按钮可见
+}
+
+# 步骤名称（用于日志）
+STEP_LABELS = {
+    'login_page': '登录页',
+    'password_input': '密码框',
+    'login_redirect': '登录跳转',
+    'checkin_page': '签到页',
+    'checkin_response': '签到接口',
+    'checkin_result': '签到结果',
+    'balance_page': '余额页',
+}
+
+
+def is_checkin_response(response):
+    """判断是否为签到接口的 XHR/fetch 响应"""
+    request = response.request
+    if request.resource_type not in ('xhr', 'fetch') or request.method == 'GET':
+        return False
+    url = response.url.lower()
+    return 'checkin' in url or 'sign' in url
+
+
+class ResponseWatcher:
+    def __init__(self, predicate):
+        """
+        记录第一个满足条件的响应，避免响应在开始等待之前就已到达而被错过
+
+        Args:
+            predicate: 判断响应是否匹配的函数
+        """
+        self.predicate = predicate
+        self.matched = None
+
+    def __call__(self, response):
+        if self.matched is None and self.predicate(response):
+            self.matched = response
+
+
+class ReadinessTracker:
+    def __init__(self, budgets=None):
+        """
+        单个账号的就绪等待统计
+
+        Args:
+            budgets: 覆盖默认值的步骤预算（毫秒）
+        """
+        self.budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+        self.waits = {}
+        self.timeouts = []
+
+    def timeout(self, name):
+        """步骤的等待预算（毫秒），可直接传给 Playwright 的 timeout 参数"""
+        return self.budgets.get(name, 10000)
+
+    @contextmanager
+    def step(self, name, optional=False):
+        """
+        统计一个等待步骤的耗时
+
+        Args:
+            name: 步骤名称
+            optional: 为 True 时等待超时不抛出异常，只记录下来，流程继续
+        """
+        start = time.perf_counter()
+        with tracing.span(f"wait_{name}"):
+            try:
+                yield
+            except Exception:
+                self.timeouts.append(name)
+                if not optional:
+                    raise
+            finally:
+                self.waits[name] = self.waits.get(name, 0.0) + time.perf_counter() - start
+
+    def total(self):
+        """所有步骤的等待总耗时（秒）"""
+        return sum(self.waits.values())
+
+    def summary(self):
+        """格式化的每步等待耗时"""
+        parts = []
+        for name, seconds in self.waits.items():
+            label = STEP_LABELS.get(name, name)
+            mark = '(超时)' if name in self.timeouts else ''
+            parts.append(f"{label} {seconds:.2f}s{mark}")
+        return f"⏱️ 等待耗时 {self.total():.2f}s: " + " | ".join(parts)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求拦截模块
+在浏览器上下文中拦截图片、字体、媒体和第三方统计脚本，减少带宽和页面加载时间
+同时适用于 sync_playwright 和 async_playwright
+"""
+
+from urllib.parse import urlparse
+
+# 默认拦截的资源类型
+DEFAULT_BLOCK_TYPES = ('image', 'font', 'media')
+
+# 常见的统计/广告/埋点域名
+TRACKER_HOSTS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'googlesyndication.com',
+    'clarity.ms',
+    'hotjar.com',
+    'hm.baidu.com',
+    'cnzz.com',
+    'umeng.com',
+    'cloudflareinsights.com',
+    'connect.facebook.net',
+)
+
+# 人机验证相关域名，任何类型都不拦截
+CHALLENGE_HOSTS = (
+    'challenges.cloudflare.com',
+    'hcaptcha.com',
+    'recaptcha.net',
+)
+
+
+def host_matches(host, patterns):
+    """判断域名是否等于或属于列表中的某个域名"""
+    return any(host == p or host.endswith('.' + p) for p in patterns)
+
+
+class FilterRules:
+    def __init__(self, block_types=DEFAULT_BLOCK_TYPES, block_hosts=TRACKER_HOSTS,
+                 allow_types=(), allow_hosts=CHALLENGE_HOSTS):
+        """
+        单个网站的拦截规则，allow 优先于 block
+
+        Args:
+            block_types: 拦截的资源类型 (Playwright request.resource_type)
+            block_hosts: 拦截的域名（包括子域名）
+            allow_types: 始终放行的资源类型
+            allow_hosts: 始终放行的域名（包括子域名）
+        """
+        self.block_types = set(block_types)
+        self.block_hosts = tuple(block_hosts)
+        self.allow_types = set(allow_types)
+        self.allow_hosts = tuple(allow_hosts)
+
+    def should_block(self, resource_type, url):
+        """判断请求是否需要拦截"""
+        host = urlparse(url).hostname or ''
+        if resource_type in self.allow_types or host_matches(host, self.allow_hosts):
+            return False
+        return resource_type in self.block_types or host_matches(host, self.block_hosts)
+
+
+# 各网站的拦截规则
+SITE_RULES = {
+    'anyrouter': FilterRules(),
+    'leaflow': FilterRules(),
+}
+
+
+class ResourceFilter:
+    def __init__(self, rules):
+        """
+        单个账号的请求拦截器，统计拦截和放行的请求
+
+        Args:
+            rules: FilterRules 拦截规则
+        """
+        self.rules = rules
+        self.blocked_requests = 0
+        self.blocked_by_type = {}
+        self.allowed_requests = 0
+        self.loaded_bytes = 0
+
+    def handle(self, route, request=None):
+        """路由处理函数；返回值在异步 API 下是协程，由 Playwright 负责等待"""
+        request = route.request
+        if self.rules.should_block(request.resource_type, request.url):
+            self.blocked_requests += 1
+            self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+            return route.abort()
+
+        self.allowed_requests += 1
+        return route.continue_()
+
+    def on_response(self, response):
+        """累计放行请求的响应大小（来自 Content-Length）"""
+        try:
+            self.loaded_bytes += int(response.headers.get('content-length', 0))
+        except ValueError:
+            pass
+
+    def install(self, context):
+        """
+        在浏览器上下文上注册拦截器
+
+        Returns:
+            context.route 的返回值，异步 API 下需要 await
+        """
+        context.on('response', self.on_response)
+        return context.route('**/*', self.handle)
+
+    def summary(self):
+        """格式化的拦截统计"""
+        by_type = ', '.join(f"{t}: {n}" for t, n in sorted(self.blocked_by_type.items()))
+        message = f"🚫 已拦截 {self.blocked_requests} 个请求"
+        if by_type:
+            message += f" ({by_type})"
+        message += f"，放行 {self.allowed_requests} 个请求，共加载 {self.loaded_bytes / 1024:.1f} KB"
+        return message
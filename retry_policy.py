@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+失败分类与重试模块
+把账号处理失败分为超时、账号或密码错误、找不到页面元素、网站无法访问等类型，
+只对临时性失败（超时、网站无法访问）退避重试；
+每个网站一个熔断器，连续多个账号网站级失败后熔断，剩余账号立即失败，不再逐个等待超时
+"""
+
+import os
+import random
+import asyncio
+
+# 失败类型
+TIMEOUT = 'timeout'
+BAD_CREDENTIALS = 'bad_credentials'
+SELECTOR_NOT_FOUND = 'selector_not_found'
+SITE_UNREACHABLE = 'site_unreachable'
+UNKNOWN = 'unknown'
+CIRCUIT_OPEN = 'circuit_open'
+
+FAILURE_NAMES = {
+    TIMEOUT: '超时',
+    BAD_CREDENTIALS: '账号或密码错误',
+    SELECTOR_NOT_FOUND: '找不到页面元素',
+    SITE_UNREACHABLE: '网站无法访问',
+    UNKNOWN: '未知错误',
+    CIRCUIT_OPEN: '网站连续失败，已跳过',
+}
+
+# 重试可能成功的失败，同时也是计入熔断器的网站级失败
+TRANSIENT_FAILURES = {TIMEOUT, SITE_UNREACHABLE}
+
+# 网络错误（Chromium 的 net::ERR_* 和 requests 的连接错误）
+UNREACHABLE_MARKERS = (
+    'net::ERR_', 'NS_ERROR_', 'Connection refused', 'Connection reset', 'Connection aborted',
+    'Name or service not known', 'Max retries exceeded', 'HTTP 502', 'HTTP 503', 'HTTP 504',
+)
+
+# 每个账号的最大重试次数、第一次重试前的等待（秒，之后指数增加）、连续多少个账号失败后熔断
+MAX_RETRIES = int(os.environ.get('CHECKIN_MAX_RETRIES', '2'))
+RETRY_BASE_DELAY = float(os.environ.get('CHECKIN_RETRY_DELAY', '2'))
+BREAKER_THRESHOLD = int(os.environ.get('CHECKIN_BREAKER_THRESHOLD', '3'))
+
+
+def classify_error(error):
+    """
+    根据异常判断失败类型
+
+    Args:
+        error: 处理账号时抛出的异常（Playwright、requests 或其他）
+
+    Returns:
+        str: 失败类型
+    """
+    message = str(error)
+    if any(marker in message for marker in UNREACHABLE_MARKERS):
+        return SITE_UNREACHABLE
+    if type(error).__name__ in ('TimeoutError', 'Timeout', 'ReadTimeout', 'ConnectTimeout') or 'Timeout' in message:
+        # Playwright 等待元素超时的日志中带有 waiting for locator / selector
+        if 'waiting for locator' in message or 'waiting for selector' in message:
+            return SELECTOR_NOT_FOUND
+        return TIMEOUT
+    return UNKNOWN
+
+
+def failure_of(result):
+    """结果中的失败类型，成功时返回 None"""
+    if isinstance(result, dict):
+        return None if result.get('success') else result.get('failure', UNKNOWN)
+    return None if result else UNKNOWN
+
+
+def describe(failure):
+    """失败类型的中文说明"""
+    return FAILURE_NAMES.get(failure, failure)
+
+
+class CircuitBreaker:
+    def __init__(self, site, threshold=BREAKER_THRESHOLD):
+        """
+        网站熔断器
+
+        Args:
+            site: 网站名称（用于日志）
+            threshold: 连续多少个账号网站级失败后熔断
+        """
+        self.site = site
+        self.threshold = threshold
+        self.consecutive = 0
+        self.is_open = False
+
+    def record(self, failure):
+        """
+        记录一次处理结果
+
+        Returns:
+            bool: 本次记录使熔断器打开时返回 True
+        """
+        if failure not in TRANSIENT_FAILURES:
+            # 成功或账号本身的问题说明网站可以访问
+            self.consecutive = 0
+            return False
+        self.consecutive += 1
+        if not self.is_open and self.consecutive >= self.threshold:
+            self.is_open = True
+            return True
+        return False
+
+
+class RetryPolicy:
+    def __init__(self, site, max_retries=MAX_RETRIES, base_delay=RETRY_BASE_DELAY, threshold=BREAKER_THRESHOLD,
+                 log=print):
+        """
+        初始化重试策略（每个网站一个，同一网站的所有账号共用熔断器）
+
+        Args:
+            site: 网站名称
+            max_retries: 临时性失败的最大重试次数 (可从环境变量 CHECKIN_MAX_RETRIES 读取)
+            base_delay: 第一次重试前的等待秒数 (可从环境变量 CHECKIN_RETRY_DELAY 读取)
+            threshold: 熔断阈值 (可从环境变量 CHECKIN_BREAKER_THRESHOLD 读取)
+            log: 输出日志的函数
+        """
+        self.site = site
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.breaker = CircuitBreaker(site, threshold)
+        self.log = log
+        self.retries = 0
+        self.fail_fast = 0
+
+    def delay(self, attempt):
+        """第 attempt 次重试前的等待时间（带抖动的指数退避）"""
+        delay = self.base_delay * 2 ** (attempt - 1)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _after_attempt(self, name, result, attempt):
+        """
+        记录一次尝试的结果
+
+        Returns:
+            float: 需要重试时返回等待秒数，否则返回 None
+        """
+        failure = failure_of(result)
+        if failure in TRANSIENT_FAILURES and attempt <= self.max_retries and not self.breaker.is_open:
+            delay = self.delay(attempt)
+            self.retries += 1
+            self.log(f"🔁 {name} {describe(failure)}，{delay:.1f} 秒后第 {attempt} 次重试")
+            return delay
+        # 只有账号重试后的最终结果计入熔断器，一个账号反复超时不会让整个网站熔断
+        if self.breaker.record(failure):
+            self.log(f"🔌 {self.site} 连续 {self.breaker.consecutive} 个账号{describe(failure)}，熔断，剩余账号直接失败")
+        return None
+
+    def _open(self, name):
+        """熔断器打开时跳过账号"""
+        if not self.breaker.is_open:
+            return False
+        self.fail_fast += 1
+        self.log(f"⏭️ {name} 已跳过: {describe(CIRCUIT_OPEN)}")
+        return True
+
+    async def run_async(self, name, attempt_func, circuit_open_result):
+        """
+        处理一个账号，临时性失败时退避重试
+
+        Args:
+            name: 账号名（用于日志）
+            attempt_func: 处理一次账号的协程函数，返回带 success/failure 的结果
+            circuit_open_result: 熔断时返回结果的函数（只用于尚未开始处理的账号）
+
+        Returns:
+            最后一次尝试的结果
+        """
+        if self._open(name):
+            return circuit_open_result()
+        attempt = 1
+        while True:
+            result = await attempt_func()
+            delay = self._after_attempt(name, result, attempt)
+            if delay is None:
+                return result
+            await asyncio.sleep(delay)
+            if self.breaker.is_open:
+                # 等待重试期间其他账号使网站熔断：不再重试，返回本账号实际的失败
+                self.breaker.record(failure_of(result))
+                return result
+            attempt += 1
+
+    def summary(self):
+        """重试和熔断统计"""
+        state = "，已熔断" if self.breaker.is_open else ""
+        return f"🔁 重试 {self.retries} 次，熔断跳过 {self.fail_fast} 个账号{state}"
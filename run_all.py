@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统一签到入口
+在一个进程、一个 Playwright 和一个浏览器中运行 AnyRouter 和 LeafFlow 签到，
+两个网站可以并发或依次运行，结束后发送包含真实结果的签到总结
+"""
+
+import time
+import asyncio
+import argparse
+from datetime import datetime
+
+import tracing
+import auto_optimized
+from browser_pool import WarmBrowser
+from accounts import parse_shard
+from shard_results import write_result_file
+from run_history import RunHistory
+from checkpoint import Checkpoint
+from leaflow_playwright import LeafFlowAutoCheckin
+
+SITES = ('anyrouter', 'leaflow')
+
+# 签到总结中的网站名称
+SITE_NAMES = {
+    'anyrouter': 'AnyRouter',
+    'leaflow': 'LeafFlow',
+}
+
+
+async def run_anyrouter(warm_browser, concurrency, use_session_cache, use_http, block_resources, shard, history,
+                        skip_done, checkpoint, block_popups=True):
+    """在共享浏览器中运行 AnyRouter 签到，返回通知格式的结果"""
+    account_results = await auto_optimized.run_all_accounts(
+        concurrency, use_session_cache, use_http, block_resources, warm_browser=warm_browser, shard=shard,
+        history=history, skip_done=skip_done, checkpoint=checkpoint, block_popups=block_popups
+    )
+    return auto_optimized.notification_results(account_results)
+
+
+async def run_leaflow(warm_browser, concurrency, use_session_cache, use_api, block_resources, shard, history,
+                      skip_done, checkpoint, block_popups=True):
+    """在共享浏览器中运行 LeafFlow 签到"""
+    checkin = LeafFlowAutoCheckin(concurrency, use_session_cache, block_resources, shard=shard,
+                                  history=history, skip_done=skip_done, checkpoint=checkpoint,
+                                  use_api=use_api, block_popups=block_popups)
+    return await checkin.run_async(send_notification=False, warm_browser=warm_browser) or []
+
+
+async def run_sites(sites=SITES, parallel=True, concurrency=1, use_session_cache=True, use_http=True,
+                    block_resources=True, shard=None, history=None, skip_done=True, checkpoints=None,
+                    block_popups=True):
+    """
+    共用一个浏览器运行多个网站的签到
+
+    Args:
+        sites: 要运行的网站
+        parallel: True 时各网站并发运行，False 时依次运行
+        concurrency: 每个网站同时处理的账号数
+        use_session_cache: 是否复用缓存的登录会话
+        use_http: 是否优先使用 HTTP 接口（AnyRouter 登录接口，LeafFlow 登录后的签到和余额接口）
+        block_resources: 是否拦截图片、字体、媒体和第三方统计请求
+        shard: (i, n) 时每个网站只处理属于第 i 份的账号
+        history: 运行历史（两个网站共用），为 None 时不记录也不跳过
+        skip_done: 是否跳过当天已签到成功的账号
+        checkpoints: {网站: 检查点日志}，没有的网站不写检查点
+        block_popups: 是否在浏览器上下文中注册弹窗拦截
+
+    Returns:
+        tuple: ({网站: 结果列表}, {网站: 异常})，某个网站出错不影响其他网站
+    """
+    # 浏览器在后台启动，各网站读取账号、尝试 HTTP 接口时不必等待
+    checkpoints = checkpoints or {}
+    warm_browser = WarmBrowser(auto_optimized.launch_browser).start()
+    try:
+        jobs = {}
+        if 'anyrouter' in sites:
+            jobs['anyrouter'] = lambda: run_anyrouter(warm_browser, concurrency, use_session_cache, use_http,
+                                                      block_resources, shard, history, skip_done,
+                                                      checkpoints.get('anyrouter'), block_popups)
+        if 'leaflow' in sites:
+            jobs['leaflow'] = lambda: run_leaflow(warm_browser, concurrency, use_session_cache, use_http,
+                                                  block_resources, shard, history, skip_done,
+                                                  checkpoints.get('leaflow'), block_popups)
+
+        if parallel:
+            outcomes = await asyncio.gather(*(job() for job in jobs.values()), return_exceptions=True)
+        else:
+            outcomes = []
+            for job in jobs.values():
+                try:
+                    outcomes.append(await job())
+                except Exception as e:
+                    outcomes.append(e)
+    finally:
+        await warm_browser.close()
+
+    results, errors = {}, {}
+    for site, outcome in zip(jobs, outcomes):
+        if isinstance(outcome, BaseException):
+            print(f"❌ {SITE_NAMES[site]} 运行失败: {outcome}")
+            errors[site] = outcome
+            results[site] = []
+        else:
+            results[site] = outcome
+    return results, errors
+
+
+def notify(results, errors):
+    """发送每个网站的签到结果和一条签到总结"""
+    try:
+        from telegram_notify import TelegramNotifier
+        notifier = TelegramNotifier(background=True)  # 多条报告合并发送，退出前自动等待发送完成
+        if not notifier.is_configured():
+            return
+        with tracing.span('notification'):
+            if results.get('anyrouter'):
+                notifier.send_anyrouter_result(results['anyrouter'])
+            if results.get('leaflow'):
+                notifier.send_leaflow_result(results['leaflow'])
+            for site, error in errors.items():
+                notifier.send_error(f"{SITE_NAMES[site]}: {error}")
+            notifier.send_summary({SITE_NAMES[site]: site_results for site, site_results in results.items()})
+    except Exception as e:
+        print(f"发送Telegram通知失败: {e}")
+
+
+def main(sites=SITES, parallel=True, send_notification=True, concurrency=1, use_session_cache=True,
+         use_http=True, block_resources=True, trace_file=None, shard=None, results_dir=None, use_history=True,
+         force=False, resume=False, block_popups=True):
+    """
+    主函数
+
+    Args:
+        sites: 要运行的网站
+        parallel: 各网站是否并发运行
+        send_notification: 是否发送Telegram通知
+        concurrency: 每个网站同时处理的账号数
+        use_session_cache: 是否复用缓存的登录会话
+        use_http: 是否优先使用 HTTP 接口（AnyRouter 登录接口，LeafFlow 登录后的签到和余额接口）
+        block_resources: 是否拦截图片、字体、媒体和第三方统计请求
+        trace_file: 各阶段耗时的输出文件（Chrome trace-event 格式），为 None 时不记录
+        shard: (i, n) 时每个网站只处理属于第 i 份的账号
+        results_dir: 分片结果目录，设置时把结果写入文件，由 shard_results.py 合并后统一发送通知
+        use_history: 是否记录运行历史
+        force: 为 True 时不跳过当天已签到的账号
+        resume: 为 True 时从检查点日志继续上次中断的运行
+        block_popups: 是否在浏览器上下文中注册弹窗拦截
+    """
+    if trace_file:
+        tracing.set_tracer(tracing.Tracer())
+
+    print("=" * 70)
+    print(f"🚀 统一签到: {', '.join(SITE_NAMES[s] for s in sites)} ({'并发' if parallel else '依次'}运行)")
+    print("=" * 70)
+
+    started = datetime.now()
+    start_time = time.time()
+    history = RunHistory() if use_history else None
+    checkpoints = {site: Checkpoint(site, shard, resume) for site in sites}
+    try:
+        results, errors = asyncio.run(run_sites(sites, parallel, concurrency, use_session_cache, use_http,
+                                                block_resources, shard, history, not force, checkpoints,
+                                                block_popups))
+    finally:
+        for checkpoint in checkpoints.values():
+            checkpoint.close()
+        if history:
+            history.close()
+    total_time = time.time() - start_time
+
+    print("\n" + "=" * 70)
+    print("🎯 签到总结")
+    print("=" * 70)
+    for site, site_results in results.items():
+        success = sum(1 for r in site_results if r.get('success'))
+        print(f"{SITE_NAMES[site]}: {success}/{len(site_results)}")
+    print(f"⏱️  总耗时: {total_time:.1f} 秒")
+
+    if results_dir:
+        for site, site_results in results.items():
+            if site not in errors:
+                # 运行失败的网站不写结果文件，合并时会报告该分片缺失
+                write_result_file(results_dir, site, site_results, shard, started)
+    elif send_notification:
+        notify(results, errors)
+
+    if trace_file:
+        tracing.get_tracer().save(trace_file)
+        print(tracing.get_tracer().summary())
+        print(f"📝 耗时追踪已保存到 {trace_file}（可在 chrome://tracing 中打开）")
+
+    return results
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='AnyRouter + LeafFlow 统一签到')
+    parser.add_argument('--sites', default=','.join(SITES),
+                        help='要运行的网站，逗号分隔（默认 anyrouter,leaflow）')
+    parser.add_argument('--sequential', action='store_true',
+                        help='依次运行各网站（默认并发运行）')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='每个网站同时处理的账号数（默认 1 即顺序处理）')
+    parser.add_argument('--no-notification', action='store_true',
+                        help='不发送 Telegram 通知')
+    parser.add_argument('--no-session-cache', action='store_true',
+                        help='不读取也不保存登录会话，每次都重新登录（会话缓存只在本地重复运行时有效，CI 中使用此选项）')
+    parser.add_argument('--no-http', action='store_true',
+                        help='不使用 HTTP 接口（AnyRouter 登录、LeafFlow 签到和余额），直接使用浏览器页面')
+    parser.add_argument('--no-resource-filter', action='store_true',
+                        help='不拦截图片、字体、媒体和第三方统计请求')
+    parser.add_argument('--no-popup-guard', action='store_true',
+                        help='不在浏览器上下文中注册弹窗拦截，改为每步探测并关闭弹窗')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='把各阶段耗时写入 FILE（Chrome trace-event JSON）')
+    parser.add_argument('--shard', type=parse_shard, metavar='I/N',
+                        help='只处理按账号名哈希分到第 I 份（共 N 份）的账号，用于多节点并行')
+    parser.add_argument('--results-dir', metavar='DIR',
+                        help='把结果写入 DIR 中的分片结果文件（不发送通知，由 shard_results.py 合并后发送）')
+    parser.add_argument('--no-history', action='store_true',
+                        help='不记录运行历史，也不跳过今日已签到的账号')
+    parser.add_argument('--force', action='store_true',
+                        help='重新处理今日已签到成功的账号')
+    parser.add_argument('--resume', action='store_true',
+                        help='从检查点日志继续上次中断的运行，只处理尚未完成的账号')
+    args = parser.parse_args()
+    args.sites = tuple(s.strip() for s in args.sites.split(',') if s.strip())
+    unknown = [s for s in args.sites if s not in SITES]
+    if unknown:
+        parser.error(f"未知网站: {', '.join(unknown)}（可选: {', '.join(SITES)}）")
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(sites=args.sites, parallel=not args.sequential, send_notification=not args.no_notification,
+         concurrency=args.concurrency, use_session_cache=not args.no_session_cache, use_http=not args.no_http,
+         block_resources=not args.no_resource_filter, trace_file=args.trace, shard=args.shard,
+         results_dir=args.results_dir, use_history=not args.no_history, force=args.force,
+         resume=args.resume, block_popups=not args.no_popup_guard)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行历史模块
+把每个账号每次签到的结果保存到本地 SQLite 数据库，
+重复运行（例如手动重跑 workflow）时跳过当天已经签到成功的账号
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_DB_PATH = os.path.join('.history', 'runs.sqlite3')
+
+# 网站的签到日按当地时间计算（两个网站都是北京时间零点重置）
+SITE_UTC_OFFSETS = {
+    'anyrouter': 8,
+    'leaflow': 8,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site TEXT NOT NULL,
+    account TEXT NOT NULL,
+    site_day TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    duration REAL,
+    success INTEGER NOT NULL,
+    status TEXT,
+    amount REAL,
+    total_balance REAL,
+    balance TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_site_account_day ON runs (site, account, site_day);
+"""
+
+
+def account_key(account):
+    """账号在数据库中的键（使用哈希，避免暴露账号）"""
+    return hashlib.sha256(account.encode('utf-8')).hexdigest()[:32]
+
+
+class RunHistory:
+    def __init__(self, path=None):
+        """
+        初始化运行历史
+
+        Args:
+            path: 数据库文件 (可从环境变量 RUN_HISTORY_DB 读取)
+        """
+        self.path = path or os.environ.get('RUN_HISTORY_DB', DEFAULT_DB_PATH)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock, self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def site_day(self, site, when=None):
+        """网站当地时间的日期（签到按这个日期重置）"""
+        offset = timezone(timedelta(hours=SITE_UTC_OFFSETS.get(site, 8)))
+        when = when or datetime.now(timezone.utc)
+        return when.astimezone(offset).strftime('%Y-%m-%d')
+
+    def record(self, site, account, result, duration=None):
+        """
+        记录一个账号的签到结果
+
+        Args:
+            site: 网站
+            account: 账号名
+            result: 结果字典，读取 success/status/amount/total_balance/balance/message
+            duration: 处理耗时（秒）
+        """
+        balance = result.get('balance')
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO runs (site, account, site_day, finished_at, duration, success, status, amount,"
+                " total_balance, balance, message) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    site, account_key(account), self.site_day(site),
+                    datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    duration,
+                    1 if result.get('success') else 0,
+                    result.get('status'),
+                    result.get('amount'),
+                    result.get('total_balance'),
+                    json.dumps(balance, ensure_ascii=False) if balance else None,
+                    result.get('message')
+                )
+            )
+
+    def done_today(self, site, account):
+        """
+        当天已签到成功的记录
+
+        Returns:
+            dict: 最近一次成功记录（balance 已解析），没有时返回 None
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM runs WHERE site = ? AND account = ? AND site_day = ? AND success = 1"
+                " ORDER BY id DESC LIMIT 1",
+                (site, account_key(account), self.site_day(site))
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record['balance'] = json.loads(record['balance']) if record['balance'] else None
+        return record
+
+    def durations(self, site, account, limit=5):
+        """
+        账号最近几次的处理耗时
+
+        Returns:
+            list: 耗时（秒），最近的在前，没有记录时为空列表
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT duration FROM runs WHERE site = ? AND account = ? AND duration IS NOT NULL"
+                " ORDER BY id DESC LIMIT ?",
+                (site, account_key(account), limit)
+            ).fetchall()
+        return [row['duration'] for row in rows]
+
+    def split_done(self, site, accounts, key):
+        """
+        把账号分为需要处理的和当天已完成的
+
+        Args:
+            site: 网站
+            accounts: 账号列表
+            key: 账号名字段（username / email）
+
+        Returns:
+            tuple: (需要处理的账号列表, [(账号, 当天成功记录)])
+        """
+        pending, done = [], []
+        for account in accounts:
+            record = self.done_today(site, account[key])
+            if record:
+                done.append((account, record))
+            else:
+                pending.append(account)
+        return pending, done
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
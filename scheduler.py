@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+账号调度模块
+根据运行历史中每个账号最近几次的耗时估计本次耗时，并发处理时按耗时从长到短安排账号，
+避免慢账号（反复超时、回退到浏览器的账号）排在最后拖长总耗时。
+并发处理时账号按列表顺序取得空闲的并发名额，因此列表顺序就是调度顺序
+"""
+
+import heapq
+from statistics import median
+
+
+def estimate_durations(history, site, accounts, key):
+    """
+    估计每个账号的耗时
+
+    Args:
+        history: 运行历史（RunHistory）
+        site: 网站
+        accounts: 账号列表
+        key: 账号名字段（username / email）
+
+    Returns:
+        dict: {账号名: 估计耗时（秒）}，取最近几次耗时的中位数；
+              没有记录的账号使用其他账号估计值的中位数，全部没有记录时返回空字典
+    """
+    estimates = {}
+    for account in accounts:
+        durations = history.durations(site, account[key])
+        if durations:
+            estimates[account[key]] = median(durations)
+    if not estimates:
+        return {}
+    default = median(estimates.values())
+    return {account[key]: estimates.get(account[key], default) for account in accounts}
+
+
+def makespan(durations, workers):
+    """
+    按列表顺序把任务依次交给最先空闲的并发名额，计算全部完成的时间
+
+    Args:
+        durations: 按调度顺序排列的任务耗时
+        workers: 并发数
+
+    Returns:
+        float: 预计总耗时（秒）
+    """
+    finish = [0.0] * max(1, workers)
+    for duration in durations:
+        heapq.heapreplace(finish, finish[0] + duration)
+    return max(finish)
+
+
+class Schedule:
+    def __init__(self, history, site, accounts, key, workers):
+        """
+        按估计耗时从长到短排列账号（LPT 调度）
+
+        Args:
+            history: 运行历史，为 None 时保持原顺序
+            site: 网站
+            accounts: 账号列表
+            key: 账号名字段（username / email）
+            workers: 并发数
+        """
+        self.key = key
+        self.workers = max(1, workers)
+        self.original = list(accounts)
+        self.estimates = estimate_durations(history, site, accounts, key) if history and workers > 1 else {}
+        if self.estimates:
+            self.accounts = sorted(accounts, key=lambda a: self.estimates[a[key]], reverse=True)
+        else:
+            self.accounts = self.original
+
+    def predicted(self, accounts=None):
+        """按给定顺序（默认为调度后的顺序）预计的总耗时，没有历史记录时为 None"""
+        if not self.estimates:
+            return None
+        return makespan([self.estimates[a[self.key]] for a in accounts or self.accounts], self.workers)
+
+    def summary(self, actual):
+        """预计与实际总耗时"""
+        if not self.estimates:
+            return f"⏱️ 实际总耗时: {actual:.1f}s（没有历史耗时，按原顺序处理）"
+        return (f"📐 最长优先调度 ({self.workers} 并发): 预计总耗时 {self.predicted():.1f}s"
+                f"（原顺序预计 {self.predicted(self.original):.1f}s），实际 {actual:.1f}s")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+选择器缓存模块
+记录每个网站上次实际生效的按钮选择器（或点击方式），下次优先使用；
+所有候选选择器合并为一个 locator 同时等待，不再逐个等待超时。
+每次运行的命中/未命中次数写入缓存文件，命中率突然下降说明网站改版
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+
+DEFAULT_CACHE_DIR = '.history'
+
+
+def combined_locator(page, selectors):
+    """把多个选择器合并为一个 locator（任意一个出现即匹配）"""
+    locator = page.locator(selectors[0])
+    for selector in selectors[1:]:
+        locator = locator.or_(page.locator(selector))
+    return locator.first
+
+
+async def probe_async(page, selectors, timeout=1000):
+    """
+    同时等待所有候选选择器，返回第一个可见的（按列表顺序判断）
+
+    Args:
+        timeout: 等待时间（毫秒），为 0 时只检查一次当前页面，不等待
+
+    Returns:
+        str: 可见的选择器，超时仍没有可见元素时返回 None
+    """
+    try:
+        combined = combined_locator(page, selectors)
+        if timeout:
+            await combined.wait_for(state='visible', timeout=timeout)
+        elif not await combined.is_visible():
+            return None
+    except Exception:
+        return None
+    for selector in selectors:
+        try:
+            if await page.locator(selector).first.is_visible():
+                return selector
+        except Exception:
+            continue
+    return None
+
+
+class SelectorCache:
+    def __init__(self, site, cache_dir=None):
+        """
+        初始化选择器缓存
+
+        Args:
+            site: 网站名称，每个网站一个缓存文件
+            cache_dir: 缓存目录 (可从环境变量 SELECTOR_CACHE_DIR 读取)
+        """
+        self.site = site
+        self.path = os.path.join(
+            cache_dir or os.environ.get('SELECTOR_CACHE_DIR', DEFAULT_CACHE_DIR),
+            f"selectors-{site}.json"
+        )
+        self.lock = threading.Lock()
+        self.learned = self._load()
+        self.counts = {}
+
+    def _load(self):
+        """读取上次生效的选择器，文件不存在或损坏时返回空字典"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data.get('selectors'), dict):
+                return data['selectors']
+        except (OSError, ValueError, AttributeError):
+            pass
+        return {}
+
+    def ordered(self, name, candidates):
+        """把上次生效的候选排在最前面"""
+        winner = self.learned.get(name)
+        if winner in candidates:
+            return [winner] + [c for c in candidates if c != winner]
+        return list(candidates)
+
+    def probe_timeout(self, name, timeout):
+        """
+        可选按钮（例如 AnyRouter 的签到按钮，网站可能不需要手动签到）的等待时间：
+        从未找到过按钮时只检查一次，不再等待；必需的按钮不要使用，始终按 timeout 等待
+        """
+        if name in self.learned and self.learned[name] is None:
+            return 0
+        return timeout
+
+    def record(self, name, winner):
+        """
+        记录本次生效的候选并写入缓存文件
+
+        Args:
+            name: 按钮名称（例如 checkin_button）
+            winner: 本次生效的选择器或点击方式，全部失败时为 None
+                    （只计数，不覆盖已知生效的选择器，一次页面加载失败不会影响之后的运行）
+        """
+        with self.lock:
+            counts = self.counts.setdefault(name, {'hits': 0, 'misses': 0, 'not_found': 0})
+            if winner is None:
+                counts['not_found'] += 1
+                self.learned.setdefault(name, None)
+            elif winner == self.learned.get(name):
+                counts['hits'] += 1
+            else:
+                counts['misses'] += 1
+                self.learned[name] = winner
+            self._save()
+
+    def _save(self):
+        """原子写入缓存文件（调用方持有锁）"""
+        data = {
+            'selectors': self.learned,
+            'last_run': {
+                'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'counts': self.counts
+            }
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ 保存选择器缓存失败: {e}")
+
+    def summary(self):
+        """本次运行的命中统计"""
+        parts = [f"{name} 命中 {c['hits']}，未命中 {c['misses']}，未找到 {c['not_found']}"
+                 for name, c in self.counts.items()]
+        return f"🎯 选择器缓存: {'; '.join(parts)}" if parts else "🎯 选择器缓存: 本次未使用"
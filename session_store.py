@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话缓存模块
+把每个账号的 Playwright storage_state（Cookie + localStorage）保存到本地，
+下次运行时直接恢复登录状态，跳过登录表单
+"""
+
+import os
+import json
+import hashlib
+
+DEFAULT_CACHE_DIR = '.sessions'
+
+
+class SessionStore:
+    def __init__(self, site, cache_dir=None):
+        """
+        初始化会话缓存
+
+        Args:
+            site: 网站名称，用于区分不同网站的缓存目录
+            cache_dir: 缓存根目录 (可从环境变量 SESSION_CACHE_DIR 读取)
+        """
+        self.site = site
+        self.cache_dir = os.path.join(
+            cache_dir or os.environ.get('SESSION_CACHE_DIR', DEFAULT_CACHE_DIR),
+            site
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, account_key):
+        """账号对应的缓存文件路径（文件名使用哈希，避免暴露账号）"""
+        digest = hashlib.sha256(account_key.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def load(self, account_key):
+        """
+        读取账号的 storage_state
+
+        Returns:
+            dict: storage_state，不存在或损坏时返回 None
+        """
+        path = self.path_for(account_key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if isinstance(state, dict) and 'cookies' in state:
+                return state
+        except Exception as e:
+            print(f"⚠️ 读取会话缓存失败: {e}")
+
+        self.invalidate(account_key)
+        return None
+
+    def save(self, account_key, state):
+        """保存账号的 storage_state（仅当前用户可读写）"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.path_for(account_key)
+            tmp_path = f"{path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            print(f"⚠️ 保存会话缓存失败: {e}")
+            return False
+
+    def invalidate(self, account_key):
+        """删除已过期的会话缓存"""
+        try:
+            os.remove(self.path_for(account_key))
+        except OSError:
+            pass
+
+    def record(self, hit):
+        """记录一次缓存命中或未命中"""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def hit_rate(self):
+        """本次运行的缓存命中率 (0-1)"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self):
+        """格式化的命中率统计"""
+        total = self.hits + self.misses
+        return f"🔑 会话缓存命中: {self.hits}/{total} ({self.hit_rate()*100:.1f}%)"
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片结果文件与合并
+每个分片把自己的签到结果写到结果目录中的一个 JSON 文件（<site>-shard<i>of<n>.json），
+合并步骤读取目录中的所有结果文件，按网站合并后只发送一次 Telegram 报告。
+只依赖文件，不需要共享服务，结果目录可以是 CI 的 artifact 或共享磁盘
+
+本地测试（3 个分片并行运行后合并）:
+    for i in 1 2 3; do python auto_optimized.py --shard $i/3 --results-dir results & done; wait
+    python shard_results.py results --expect 3
+"""
+
+import os
+import sys
+import json
+import glob
+import socket
+import argparse
+from datetime import datetime
+
+# 合并报告中的网站名称
+SITE_NAMES = {
+    'anyrouter': 'AnyRouter',
+    'leaflow': 'LeafFlow',
+}
+
+
+def result_path(directory, site, shard=None):
+    """分片结果文件路径"""
+    index, count = shard or (1, 1)
+    return os.path.join(directory, f"{site}-shard{index}of{count}.json")
+
+
+def write_result_file(directory, site, results, shard=None, started=None):
+    """
+    写入一个分片的结果文件（先写临时文件再重命名，合并步骤不会读到写了一半的文件）
+
+    Args:
+        directory: 结果目录
+        site: 网站（anyrouter / leaflow）
+        results: 通知格式的结果列表
+        shard: (i, n)，为 None 时视为 1/1
+        started: 开始时间
+
+    Returns:
+        str: 结果文件路径
+    """
+    index, count = shard or (1, 1)
+    os.makedirs(directory, exist_ok=True)
+    path = result_path(directory, site, shard)
+    data = {
+        'site': site,
+        'shard': [index, count],
+        'host': socket.gethostname(),
+        'started': started.strftime('%Y-%m-%d %H:%M:%S') if started else None,
+        'finished': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'results': results
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+    print(f"📁 分片 {index}/{count} 的 {len(results)} 条结果已写入 {path}")
+    return path
+
+
+def read_result_files(directory):
+    """
+    读取目录中的所有结果文件
+
+    Returns:
+        list: 结果文件内容，损坏的文件会被跳过
+    """
+    files = []
+    for path in sorted(glob.glob(os.path.join(directory, '*-shard*of*.json'))):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and 'site' in data and 'results' in data:
+                files.append(data)
+                continue
+        except Exception as e:
+            print(f"⚠️ 读取结果文件 {path} 失败: {e}")
+            continue
+        print(f"⚠️ 结果文件格式不正确，已跳过: {path}")
+    return files
+
+
+def account_name(result):
+    """结果中的账号名"""
+    return result.get('account') or result.get('email') or result.get('username')
+
+
+def merge(files, expect=None):
+    """
+    按网站合并分片结果
+
+    Args:
+        files: read_result_files 的返回值
+        expect: 每个网站应有的分片数，为 None 时使用结果文件中记录的分片数
+
+    Returns:
+        tuple: ({网站: 合并后的结果列表}, {网站: 缺失的分片序号列表})
+    """
+    by_site = {}
+    for data in files:
+        by_site.setdefault(data['site'], []).append(data)
+
+    merged, missing = {}, {}
+    for site, site_files in by_site.items():
+        site_files.sort(key=lambda d: (d['shard'][0], d.get('finished') or ''))
+        count = expect or max(d['shard'][1] for d in site_files)
+        present = {d['shard'][0] for d in site_files}
+        missing[site] = [i for i in range(1, count + 1) if i not in present]
+
+        # 同一账号出现在多个文件中（例如某个分片重跑）时保留最后完成的结果
+        results = {}
+        for data in site_files:
+            for result in data['results']:
+                results[account_name(result)] = result
+        merged[site] = list(results.values())
+    return merged, missing
+
+
+def notify(merged, missing):
+    """发送每个网站的合并结果和一条签到总结"""
+    from telegram_notify import TelegramNotifier
+    notifier = TelegramNotifier(background=True)  # 多条报告合并发送，退出前自动等待发送完成
+    if not notifier.is_configured():
+        print("⚠️ Telegram 未配置，跳过通知")
+        return
+    for site, results in merged.items():
+        if results:
+            notifier.send_message(notifier.format_checkin_result(SITE_NAMES.get(site, site), results))
+    for site, shards in missing.items():
+        if shards:
+            notifier.send_error(f"{SITE_NAMES.get(site, site)}: 缺少分片 {', '.join(map(str, shards))} 的结果")
+    notifier.send_summary({SITE_NAMES.get(site, site): results for site, results in merged.items()})
+
+
+def main(directory, expect=None, send_notification=True, output=None):
+    """
+    合并结果目录中的分片结果并发送报告
+
+    Returns:
+        int: 进程退出码，有分片缺失时为 1
+    """
+    files = read_result_files(directory)
+    if not files:
+        print(f"❌ {directory} 中没有分片结果文件")
+        return 1
+
+    merged, missing = merge(files, expect)
+
+    print("=" * 70)
+    print(f"📊 合并 {len(files)} 个分片结果")
+    print("=" * 70)
+    for site, results in merged.items():
+        success = sum(1 for r in results if r.get('success'))
+        shards = f"，缺少分片: {', '.join(map(str, missing[site]))}" if missing[site] else ""
+        print(f"{SITE_NAMES.get(site, site)}: {success}/{len(results)}{shards}")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'results': merged, 'missing': missing}, f, ensure_ascii=False, indent=2, default=str)
+        print(f"📁 合并结果已保存: {output}")
+
+    if send_notification:
+        notify(merged, missing)
+
+    return 1 if any(missing.values()) else 0
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='合并分片结果文件并发送一次签到报告')
+    parser.add_argument('directory', help='分片结果目录（各分片的 --results-dir）')
+    parser.add_argument('--expect', type=int, help='每个网站应有的分片数，用于发现没有写出结果的分片')
+    parser.add_argument('--no-notification', action='store_true', help='不发送 Telegram 通知')
+    parser.add_argument('--output', help='把合并后的结果保存为 JSON 文件')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    sys.exit(main(args.directory, args.expect, not args.no_notification, args.output))
@@ -7,20 +7,188 @@ Telegram 电报通知模块
 
 import requests
 import os
+import time
+import queue
+import atexit
+import random
+import threading
 from datetime import datetime
+from html import escape
+from requests.adapters import HTTPAdapter
+
+# Bot API 地址（可通过环境变量指向本地模拟服务）
+API_URL = os.environ.get('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+# 失败重试：指数退避的基础间隔和上限（秒），429 时 retry_after 超过上限则放弃
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+# 后台发送：合并窗口内到达的消息合并为一条发送，退出时最多等待 FLUSH_TIMEOUT 秒
+COALESCE_WINDOW = float(os.environ.get('TELEGRAM_COALESCE_WINDOW', '2'))
+FLUSH_TIMEOUT = float(os.environ.get('TELEGRAM_FLUSH_TIMEOUT', '30'))
+
+# Telegram 单条消息的最大长度，合并后超过则分开发送
+MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = "\n\n"
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """进程内所有通知器共用的 Session，复用 TCP/TLS 连接"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+def is_rejected(status):
+    """Telegram 拒绝了消息本身（例如 HTML 解析失败），重试也不会成功；429 限流除外"""
+    return status is not None and 400 <= status < 500 and status != 429
+
+def retry_delay(attempt):
+    """第 attempt 次重试前的等待时间（带抖动的指数退避）"""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+class BackgroundSender:
+    def __init__(self, notifier, coalesce_window=COALESCE_WINDOW):
+        """
+        后台发送线程，调用方只把消息放入队列，不等待 Telegram 响应
+
+        Args:
+            notifier: 实际发送消息的通知器
+            coalesce_window: 收到消息后再等待的秒数，期间到达的消息合并为一条
+        """
+        self.notifier = notifier
+        self.coalesce_window = coalesce_window
+        self.queue = queue.Queue()
+        self.flushing = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='telegram-sender', daemon=True)
+        self.thread.start()
+
+    def put(self, message, parse_mode='HTML'):
+        """把消息放入发送队列"""
+        self.queue.put((message, parse_mode))
+
+    def _collect(self, first):
+        """
+        取出合并窗口内到达的、格式相同且合并后不超长的消息
+
+        Returns:
+            tuple: (本批消息, 不能合并而留到下一批的消息或 None)
+        """
+        batch = [first]
+        length = len(first[0])
+        deadline = time.monotonic() + self.coalesce_window
+        while True:
+            try:
+                if self.flushing.is_set():
+                    # 刷新时不再等待，只带走队列中已有的消息
+                    item = self.queue.get_nowait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = self.queue.get(timeout=min(remaining, 0.1))
+            except queue.Empty:
+                if self.flushing.is_set():
+                    break
+                continue
+            length += len(MESSAGE_SEPARATOR) + len(item[0])
+            if item[1] != first[1] or length > MAX_MESSAGE_LENGTH:
+                return batch, item
+            batch.append(item)
+        return batch, None
+
+    def _run(self):
+        carry = None
+        while True:
+            first = carry or self.queue.get()
+            batch, carry = self._collect(first)
+            try:
+                if len(batch) > 1:
+                    print(f"📨 合并 {len(batch)} 条通知为一条发送")
+                status = self.notifier.post_message(MESSAGE_SEPARATOR.join(m for m, _ in batch), first[1])
+                if len(batch) > 1 and is_rejected(status):
+                    # 一条消息有问题不应连累同一批的其他消息
+                    print(f"⚠️ 合并后的通知被拒绝，逐条重新发送 {len(batch)} 条")
+                    for message, parse_mode in batch:
+                        self.notifier.deliver(message, parse_mode)
+            except Exception as e:
+                print(f"❌ 后台发送 Telegram 通知时出错: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """
+        等待队列中的消息发送完成
+
+        Returns:
+            bool: 是否在超时前全部发送完成
+        """
+        self.flushing.set()
+        deadline = time.monotonic() + timeout
+        try:
+            with self.queue.all_tasks_done:
+                while self.queue.unfinished_tasks:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        print(f"⚠️ Telegram 通知未在 {timeout:.0f} 秒内发送完成，放弃剩余 {self.queue.unfinished_tasks} 条")
+                        return False
+                    self.queue.all_tasks_done.wait(remaining)
+            return True
+        finally:
+            self.flushing.clear()
+
+_senders = {}
+_senders_lock = threading.Lock()
+
+def get_sender(notifier):
+    """同一个 Bot 和 Chat 共用一个后台发送线程，不同网站的报告可以合并"""
+    key = (notifier.base_url, notifier.chat_id)
+    with _senders_lock:
+        if key not in _senders:
+            if not _senders:
+                atexit.register(flush_notifications)
+            _senders[key] = BackgroundSender(notifier)
+        return _senders[key]
+
+def flush_notifications(timeout=FLUSH_TIMEOUT):
+    """等待所有后台通知发送完成（进程退出时自动调用）"""
+    deadline = time.monotonic() + timeout
+    with _senders_lock:
+        senders = list(_senders.values())
+    done = True
+    for sender in senders:
+        done = sender.flush(max(0.0, deadline - time.monotonic())) and done
+    return done
 
 class TelegramNotifier:
-    def __init__(self, bot_token=None, chat_id=None):
+    def __init__(self, bot_token=None, chat_id=None, api_url=None, max_retries=3, timeout=10, background=False):
         """
         初始化 Telegram 通知器
         
         Args:
             bot_token: Telegram Bot Token (可从环境变量读取)
             chat_id: Telegram Chat ID (可从环境变量读取)
+            api_url: Bot API 地址 (默认读取环境变量 TELEGRAM_API_URL)，可指向本地模拟服务
+            max_retries: 网络错误、429 和 5xx 时的最大重试次数
+            timeout: 单次请求超时（秒）
+            background: 为 True 时 send_message 只把消息放入后台队列立即返回，
+                        合并窗口内的多条消息合并发送，进程退出前自动等待发送完成
         """
         self.bot_token = bot_token or os.environ.get('TELEGRAM_BOT_TOKEN')
         self.chat_id = chat_id or os.environ.get('TELEGRAM_CHAT_ID')
-        self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.api_url = (api_url or API_URL).rstrip('/')
+        self.base_url = f"{self.api_url}/bot{self.bot_token}"
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.background = background
         
     def is_configured(self):
         """检查是否配置了 Telegram"""
@@ -35,32 +203,92 @@ class TelegramNotifier:
             parse_mode: 消息格式 ('HTML' 或 'Markdown')
         
         Returns:
-            bool: 发送是否成功
+            bool: 发送是否成功（后台模式下为是否已放入队列）
         """
         if not self.is_configured():
             print("⚠️ Telegram 未配置，跳过通知")
             return False
         
-        try:
-            url = f"{self.base_url}/sendMessage"
-            data = {
-                'chat_id': self.chat_id,
-                'text': message,
-                'parse_mode': parse_mode
-            }
-            
-            response = requests.post(url, json=data, timeout=10)
-            
-            if response.status_code == 200:
-                print("✅ Telegram 通知发送成功")
-                return True
+        if self.background:
+            get_sender(self).put(message, parse_mode)
+            return True
+        return self.deliver(message, parse_mode)
+    
+    def deliver(self, message, parse_mode='HTML'):
+        """立即发送消息，失败时按规则重试，返回是否发送成功"""
+        return self.post_message(message, parse_mode) == 200
+    
+    def post_message(self, message, parse_mode='HTML'):
+        """
+        立即发送消息，失败时按规则重试
+        
+        Returns:
+            int: 最后一次响应的状态码，网络错误或异常时为 None
+        """
+        url = f"{self.base_url}/sendMessage"
+        data = {
+            'chat_id': self.chat_id,
+            'text': message,
+            'parse_mode': parse_mode
+        }
+        
+        status = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = get_session().post(url, json=data, timeout=self.timeout)
+            except requests.RequestException as e:
+                status = None
+                error = f"网络错误: {e}"
+                delay = retry_delay(attempt)
+            except Exception as e:
+                print(f"❌ 发送 Telegram 通知时出错: {e}")
+                return None
             else:
-                print(f"❌ Telegram 通知失败: {response.text}")
-                return False
+                status = response.status_code
+                if status == 200:
+                    print("✅ Telegram 通知发送成功")
+                    return status
                 
-        except Exception as e:
-            print(f"❌ 发送 Telegram 通知时出错: {e}")
-            return False
+                error = response.text
+                if response.status_code == 429:
+                    # 按 Telegram 返回的 retry_after 等待，再加一点抖动
+                    retry_after = self.retry_after(response)
+                    if retry_after > RETRY_MAX_DELAY:
+                        print(f"❌ Telegram 限流 {retry_after} 秒，放弃发送: {error}")
+                        return status
+                    delay = retry_after + random.uniform(0, 1)
+                elif response.status_code >= 500:
+                    delay = retry_delay(attempt)
+                else:
+                    # 400/401/403 等错误重试也不会成功
+                    print(f"❌ Telegram 通知失败: {error}")
+                    return status
+            
+            if attempt < self.max_retries:
+                print(f"⚠️ Telegram 通知失败（{error}），{delay:.1f} 秒后重试 ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+        
+        print(f"❌ Telegram 通知失败: {error}")
+        return status
+    
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """等待后台队列中的消息发送完成"""
+        if not self.background:
+            return True
+        return get_sender(self).flush(timeout)
+    
+    def retry_after(self, response):
+        """429 响应中要求等待的秒数"""
+        try:
+            value = response.json().get('parameters', {}).get('retry_after')
+        except ValueError:
+            value = None
+        if value is None:
+            value = response.headers.get('Retry-After')
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return RETRY_BASE_DELAY
     
     def format_checkin_result(self, site_name, results):
         """
@@ -81,7 +309,8 @@ class TelegramNotifier:
         failed = total - success
         
         # 构建消息
-        message = f"<b>🤖 {site_name} 自动签到报告</b>\n"
+        # 账号、状态和错误信息来自网站和异常，需要转义，否则一个 < 或 & 会让整条 HTML 消息被拒绝
+        message = f"<b>🤖 {escape(site_name)} 自动签到报告</b>\n"
         message += f"⏰ 时间: {time_str}\n"
         message += f"━━━━━━━━━━━━━━━━\n"
         message += f"📊 <b>统计信息</b>\n"
@@ -103,15 +332,15 @@ class TelegramNotifier:
             status_icon = "✅" if result.get('success', False) else "❌"
             
             # 构建每个账号的结果
-            message += f"\n{i}. {status_icon} <code>{account}</code>\n"
+            message += f"\n{i}. {status_icon} <code>{escape(str(account))}</code>\n"
             
             # 添加状态信息
             status = result.get('status', '未知')
-            message += f"   状态: {status}\n"
+            message += f"   状态: {escape(str(status))}\n"
             
             # 添加余额信息（如果有）
             if 'balance_info' in result and result['balance_info']:
-                message += f"   💰 {result['balance_info']}\n"
+                message += f"   💰 {escape(str(result['balance_info']))}\n"
             elif 'amount' in result and result['amount'] > 0:
                 message += f"   💰 获得: {result['amount']:.2f} 元\n"
 
@@ -121,7 +350,7 @@ class TelegramNotifier:
 
             # 添加消息（如果有）
             if 'message' in result and result['message']:
-                message += f"   📝 {result['message']}\n"
+                message += f"   📝 {escape(str(result['message']))}\n"
         
         message += f"\n━━━━━━━━━━━━━━━━"
         
@@ -161,7 +390,7 @@ class TelegramNotifier:
                 total_success += success
                 
                 icon = "✅" if success == count else "⚠️" if success > 0 else "❌"
-                message += f"{icon} <b>{site}</b>: {success}/{count}\n"
+                message += f"{icon} <b>{escape(str(site))}</b>: {success}/{count}\n"
         
         if total_accounts > 0:
             message += f"\n<b>📊 总计</b>\n"
@@ -176,7 +405,7 @@ class TelegramNotifier:
     def send_error(self, error_message):
         """发送错误通知"""
         message = f"<b>⚠️ 签到脚本错误</b>\n\n"
-        message += f"<code>{error_message}</code>\n"
+        message += f"<code>{escape(str(error_message))}</code>\n"
         message += f"\n时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         
         return self.send_message(message)
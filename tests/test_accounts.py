@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""账号加载与分片"""
+
+import argparse
+
+import pytest
+
+from accounts import iter_accounts, parse_shard, shard_of
+
+
+@pytest.mark.parametrize('text, expected', [('1/1', (1, 1)), ('2/4', (2, 4)), ('4/4', (4, 4))])
+def test_parse_shard(text, expected):
+    assert parse_shard(text) == expected
+
+
+@pytest.mark.parametrize('text', ['0/4', '5/4', '1/0', '1', 'a/b', '1/2/3'])
+def test_parse_shard_rejects_invalid(text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_shard(text)
+
+
+def test_shard_of_is_stable_and_normalized():
+    # 固定值：哈希与进程和 Python 版本无关，改变算法会让账号换到别的节点
+    assert [shard_of(f'user{i}@example.com', 3) for i in range(6)] == [3, 2, 1, 3, 1, 2]
+    assert shard_of('user@example.com', 4) == shard_of(' User@Example.com ', 4)
+    assert shard_of('anything', 1) == 1
+
+
+def test_shards_partition_accounts(tmp_path):
+    names = [f'user{i}@example.com' for i in range(40)]
+    path = tmp_path / 'accounts.txt'
+    path.write_text('# 注释\n\n' + '\n'.join(f'{n},pw' for n in names) + '\nbroken line\n', encoding='utf-8')
+
+    shards = [[a['email'] for a in iter_accounts(str(path), 'email', (i, 3), warn=lambda m: None)]
+              for i in (1, 2, 3)]
+    assert sorted(sum(shards, [])) == sorted(names)
+    assert all(shards)
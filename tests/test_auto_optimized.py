@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""AnyRouter 浏览器登录流程"""
+
+import asyncio
+
+import auto_optimized
+from retry_policy import UNKNOWN
+
+
+class FakePage:
+    def __init__(self, url):
+        self.url = url
+
+    def set_default_timeout(self, timeout):
+        pass
+
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePool:
+    """预热上下文池：直接返回停留在指定地址的页面"""
+
+    def __init__(self, url):
+        self.context = FakeContext()
+        self.page = FakePage(url)
+
+    async def acquire(self):
+        return self.context, self.page
+
+
+async def no_sleep(seconds):
+    pass
+
+
+def run_login_and_sign(monkeypatch, landing_url):
+    async def fake_login(page, account, popup_guard=None):
+        return True
+
+    monkeypatch.setattr(auto_optimized, 'login', fake_login)
+    monkeypatch.setattr(auto_optimized.asyncio, 'sleep', no_sleep)
+    pool = FakePool(landing_url)
+    result = asyncio.run(auto_optimized.login_and_sign(None, {'username': 'user', 'password': 'pw'},
+                                                       context_pool=pool))
+    assert pool.context.closed
+    return result
+
+
+def test_unconfirmed_console_is_not_success(monkeypatch):
+    # 登录后没有进入控制台：不能记为成功，否则运行历史会让当天之后的运行跳过这个账号
+    result = run_login_and_sign(monkeypatch, 'https://anyrouter.top/login?expired=true')
+    assert result['success'] is False
+    assert result['failure'] == UNKNOWN
+
+
+def test_console_reached_is_success(monkeypatch):
+    async def no_balance(page):
+        return None
+
+    async def no_button(page, selectors, timeout):
+        return None
+
+    monkeypatch.setattr(auto_optimized, 'extract_balance', no_balance)
+    monkeypatch.setattr(auto_optimized, 'probe_async', no_button)
+    result = run_login_and_sign(monkeypatch, 'https://anyrouter.top/console')
+    assert result['success'] is True
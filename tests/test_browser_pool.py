@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""浏览器上下文预热池"""
+
+import asyncio
+
+from browser_pool import ContextPool
+
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def new_page(self):
+        return object()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    async def new_context(self, **kwargs):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+
+class FakeWarmBrowser:
+    def __init__(self):
+        self.browser = FakeBrowser()
+
+    def start(self):
+        return self
+
+    async def get(self):
+        return self.browser
+
+
+def test_pool_stops_refilling_for_the_last_accounts():
+    warm = FakeWarmBrowser()
+    pages = []
+
+    async def on_page(page):
+        pages.append(page)
+
+    async def main():
+        pool = ContextPool(warm, size=2, on_page=on_page, accounts=3).start()
+        for _ in range(3):
+            pool.account_started()
+            await pool.acquire()
+        await pool.close()
+        return pool
+
+    pool = asyncio.run(main())
+    # 3 个账号只创建 3 个上下文，最后两个账号开始后不再补充
+    assert len(warm.browser.contexts) == 3
+    assert not any(context.closed for context in warm.browser.contexts)
+    assert len(pages) == 3
+    assert pool.hits == 3 and pool.misses == 0
+
+
+def test_pool_without_account_count_keeps_size_idle():
+    warm = FakeWarmBrowser()
+
+    async def main():
+        pool = ContextPool(warm, size=2).start()
+        await pool.acquire()
+        await pool.close()
+
+    asyncio.run(main())
+    assert len(warm.browser.contexts) == 3
+    assert sum(context.closed for context in warm.browser.contexts) == 2
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""检查点日志"""
+
+import json
+
+from checkpoint import Checkpoint, read_journal
+
+
+def test_read_journal_skips_torn_last_line(tmp_path):
+    path = tmp_path / 'leaflow.jsonl'
+    lines = [
+        json.dumps({'started': '2026-01-01 08:00:00', 'resume': False}),
+        json.dumps({'account': 'a', 'result': {'success': False}}),
+        json.dumps({'account': 'b', 'result': {'success': True}}),
+        json.dumps({'account': 'a', 'result': {'success': True}}),
+    ]
+    # 进程在写最后一行时退出
+    path.write_text('\n'.join(lines) + '\n{"account": "c", "res', encoding='utf-8')
+    assert read_journal(str(path)) == {'a': {'success': True}, 'b': {'success': True}}
+
+
+def test_read_journal_missing_file(tmp_path):
+    assert read_journal(str(tmp_path / 'missing.jsonl')) == {}
+
+
+def test_resume_continues_after_torn_line(tmp_path):
+    checkpoint = Checkpoint('leaflow', directory=str(tmp_path))
+    checkpoint.record('a', {'email': 'a', 'success': True})
+    checkpoint.close()
+    with open(checkpoint.path, 'a', encoding='utf-8') as f:
+        f.write('{"account": "b"')
+
+    checkpoint = Checkpoint('leaflow', resume=True, directory=str(tmp_path))
+    checkpoint.record('c', {'email': 'c', 'success': True})
+    checkpoint.close()
+    pending, finished = Checkpoint('leaflow', resume=True, directory=str(tmp_path)).split(
+        [{'email': name} for name in 'abc'], 'email')
+    assert pending == [{'email': 'b'}]
+    assert [r['email'] for r in finished] == ['a', 'c']
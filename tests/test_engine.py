@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""签到引擎"""
+
+import asyncio
+
+from engine import SiteAdapter, SiteEngine
+from checkpoint import Checkpoint
+from run_history import RunHistory
+
+
+class FakeAdapter(SiteAdapter):
+    site = 'test'
+    name = 'Test'
+    key = 'username'
+    eager_browser = False
+
+    def __init__(self, names):
+        self.names = names
+        self.processed = []
+
+    def log(self, message):
+        pass
+
+    def load_accounts(self, shard=None):
+        return [{'username': name} for name in self.names]
+
+    async def process(self, engine, account):
+        self.processed.append(account['username'])
+        return {'username': account['username'], 'success': True}
+
+    def skipped_result(self, account, record):
+        return {'username': account['username'], 'success': True, 'skipped': True}
+
+
+def test_results_follow_account_file_order(tmp_path):
+    names = ['a', 'b', 'c', 'd', 'e']
+    history = RunHistory(str(tmp_path / 'history.db'))
+    history.record('test', 'd', {'success': True})
+    checkpoint = Checkpoint('test', directory=str(tmp_path))
+    checkpoint.record('b', {'username': 'b', 'success': True, 'restored': True})
+    checkpoint.close()
+    checkpoint = Checkpoint('test', resume=True, directory=str(tmp_path))
+
+    adapter = FakeAdapter(names)
+    engine = SiteEngine(adapter, concurrency=2, history=history, checkpoint=checkpoint)
+    try:
+        results = asyncio.run(engine.run())
+    finally:
+        checkpoint.close()
+        history.close()
+
+    assert [r['username'] for r in results] == names
+    assert sorted(adapter.processed) == ['a', 'c', 'e']
+    assert results[1].get('restored') and results[3].get('skipped')
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""LeafFlow 页面流程"""
+
+import asyncio
+
+import leaflow_playwright
+from accounts import shard_of
+from leaflow_playwright import LeafFlowAutoCheckin, CHECKIN_URL, WORKSPACES_URL
+from readiness import ReadinessTracker
+
+
+class FakeLocator:
+    def __init__(self, count=0):
+        self._count = count
+
+    def or_(self, other):
+        return self
+
+    @property
+    def first(self):
+        return self
+
+    async def wait_for(self, timeout=None, state=None):
+        pass
+
+    async def count(self):
+        return self._count
+
+
+class FakePage:
+    """goto 需要一段时间才完成，记录每次加载的开始和结束"""
+
+    def __init__(self, log):
+        self.log = log
+        self.url = 'about:blank'
+
+    def set_default_timeout(self, timeout):
+        pass
+
+    async def goto(self, url, wait_until=None):
+        self.log.append(('start', url))
+        await asyncio.sleep(0.01)
+        self.url = url
+        self.log.append(('end', url))
+
+    def get_by_text(self, text):
+        return FakeLocator()
+
+    def locator(self, selector):
+        return FakeLocator()
+
+
+class FakeContext:
+    def __init__(self, log):
+        self.log = log
+        self.closed = False
+
+    async def new_page(self):
+        return FakePage(self.log)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self, log):
+        self.log = log
+
+    async def new_context(self, **options):
+        return FakeContext(self.log)
+
+
+class FakeSessionStore:
+    def __init__(self):
+        self.hits = []
+
+    def load(self, email):
+        return {'cookies': []}
+
+    def record(self, hit):
+        self.hits.append(hit)
+
+
+def loads_overlap(log):
+    """签到页面和余额页面都在任意一个加载完成之前开始"""
+    first_end = next(i for i, (event, _) in enumerate(log) if event == 'end')
+    started = {url for event, url in log[:first_end] if event == 'start'}
+    return {CHECKIN_URL, WORKSPACES_URL} <= started
+
+
+def make_checkin():
+    return LeafFlowAutoCheckin(use_session_cache=False, block_resources=False, block_popups=False,
+                               use_api=False)
+
+
+def test_checkin_and_balance_pages_load_together():
+    log = []
+    checkin = make_checkin()
+    context = FakeContext(log)
+
+    async def run():
+        page = await context.new_page()
+        return await checkin.open_checkin_and_balance(context, page, ReadinessTracker())
+
+    balance_page = asyncio.run(run())
+    assert balance_page.url == WORKSPACES_URL
+    assert loads_overlap(log)
+
+
+def test_restored_session_opens_balance_tab_with_checkin_page():
+    log = []
+    checkin = make_checkin()
+    checkin.session_store = FakeSessionStore()
+
+    context, page, balance_page = asyncio.run(checkin.restore_session(FakeBrowser(log), 'a@example.com'))
+    assert page.url == CHECKIN_URL
+    assert balance_page is not None and balance_page.url == WORKSPACES_URL
+    assert checkin.session_store.hits == [True]
+    assert loads_overlap(log)
+
+
+def test_load_accounts_honours_shard_argument(tmp_path, monkeypatch):
+    names = [f'user{i}@example.com' for i in range(12)]
+    path = tmp_path / 'accounts.txt'
+    path.write_text('\n'.join(f'{n},pw' for n in names), encoding='utf-8')
+    monkeypatch.setattr(leaflow_playwright, 'LEAFFLOW_ACCOUNTS_FILE', str(path))
+
+    checkin = make_checkin()
+    assert [a['email'] for a in checkin.load_accounts()] == names
+    shard = [a['email'] for a in checkin.load_accounts((2, 3))]
+    assert shard == [n for n in names if shard_of(n, 3) == 2]
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""弹窗拦截规则"""
+
+import asyncio
+
+from popup_guard import PopupGuard, PopupRules, SITE_RULES
+
+
+def test_anyrouter_rule_only_targets_announcements():
+    rules = SITE_RULES['anyrouter']
+    assert rules.as_js()['match'] == ['公告']
+    assert rules.handler_selector() == '.semi-modal:has-text("公告"), .semi-dialog:has-text("公告")'
+
+
+def test_rules_without_match_texts_keep_plain_selectors():
+    rules = PopupRules(remove_selectors=('.modal',), dismiss_texts=('稍后再说',))
+    assert rules.as_js()['match'] == []
+    assert rules.handler_selector() == '.modal, button:text-is("稍后再说")'
+
+
+class FakePage:
+    def __init__(self):
+        self.handlers = []
+
+    def locator(self, selector):
+        return selector
+
+    async def add_locator_handler(self, locator, handler, no_wait_after=False):
+        self.handlers.append(locator)
+
+
+class FakeContext:
+    def __init__(self):
+        self.scripts = []
+        self.events = []
+
+    async def add_init_script(self, script=None):
+        self.scripts.append(script)
+
+    def on(self, event, callback):
+        self.events.append(event)
+
+    async def new_page(self):
+        return FakePage()
+
+
+def test_new_page_registers_handler_before_returning():
+    guard = PopupGuard(SITE_RULES['anyrouter'])
+    context = FakeContext()
+
+    async def open_page():
+        await guard.install(context)
+        return await guard.new_page(context)
+
+    page = asyncio.run(open_page())
+    assert page.handlers == [SITE_RULES['anyrouter'].handler_selector()]
+    assert context.scripts and context.events == []
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""重试与熔断"""
+
+import asyncio
+
+from retry_policy import RetryPolicy, TIMEOUT, BAD_CREDENTIALS, SITE_UNREACHABLE, CIRCUIT_OPEN
+
+
+def make_policy(**kwargs):
+    options = dict(max_retries=2, base_delay=0, threshold=3, log=lambda message: None)
+    options.update(kwargs)
+    return RetryPolicy('Test', **options)
+
+
+def run_accounts(policy, outcomes):
+    """按顺序处理账号，outcomes 为 {账号: 每次尝试的失败类型（None 表示成功）}"""
+    attempts = {}
+    results = {}
+
+    async def main():
+        for name, sequence in outcomes.items():
+            async def attempt(name=name, sequence=sequence):
+                i = attempts.get(name, 0)
+                attempts[name] = i + 1
+                failure = sequence[min(i, len(sequence) - 1)]
+                return {'success': True} if failure is None else {'success': False, 'failure': failure}
+            results[name] = await policy.run_async(name, attempt, circuit_open)
+
+    asyncio.run(main())
+    return results, attempts
+
+
+def circuit_open():
+    return {'success': False, 'failure': CIRCUIT_OPEN}
+
+
+def test_retries_of_one_account_do_not_open_breaker():
+    policy = make_policy()
+    results, attempts = run_accounts(policy, {'a': [TIMEOUT], 'b': [None]})
+    assert attempts == {'a': 3, 'b': 1}
+    assert results['a']['failure'] == TIMEOUT
+    assert results['b']['success']
+    assert not policy.breaker.is_open
+    assert policy.retries == 2
+
+
+def test_breaker_opens_after_consecutive_failed_accounts():
+    policy = make_policy()
+    results, attempts = run_accounts(policy, {'a': [TIMEOUT], 'b': [TIMEOUT], 'c': [TIMEOUT], 'd': [None]})
+    assert policy.breaker.is_open
+    assert attempts == {'a': 3, 'b': 3, 'c': 3}
+    assert results['d']['failure'] == CIRCUIT_OPEN
+    assert policy.fail_fast == 1
+
+
+def test_success_and_account_errors_reset_breaker():
+    policy = make_policy(threshold=2)
+    run_accounts(policy, {'a': [TIMEOUT], 'b': [BAD_CREDENTIALS], 'c': [TIMEOUT], 'd': [None]})
+    assert not policy.breaker.is_open
+    assert policy.breaker.consecutive == 0
+
+
+def test_transient_failure_recovers_on_retry():
+    policy = make_policy()
+    results, attempts = run_accounts(policy, {'a': [TIMEOUT, None]})
+    assert results['a']['success']
+    assert attempts == {'a': 2}
+    assert policy.breaker.consecutive == 0
+
+
+def test_run_async_counts_accounts_not_attempts():
+    policy = make_policy()
+    calls = []
+
+    async def attempt():
+        calls.append(1)
+        return {'success': False, 'failure': TIMEOUT}
+
+    async def main():
+        result = await policy.run_async('a', attempt, circuit_open)
+        return result, await policy.run_async('b', lambda: asyncio.sleep(0, {'success': True}), circuit_open)
+
+    first, second = asyncio.run(main())
+    assert len(calls) == 3
+    assert first['failure'] == TIMEOUT
+    assert second['success']
+    assert policy.breaker.consecutive == 0
+
+
+def test_account_retrying_when_breaker_opens_keeps_its_own_failure():
+    # a 第一次失败后等待重试，期间 b、c 失败使网站熔断：a 返回自己的失败，d 尚未开始，直接跳过
+    policy = make_policy(max_retries=2, threshold=2)
+    calls = []
+
+    async def failing(name):
+        calls.append(name)
+        return {'success': False, 'failure': SITE_UNREACHABLE}
+
+    async def main():
+        policy.delay = lambda attempt: 0.05
+        slow = asyncio.ensure_future(policy.run_async('a', lambda: failing('a'), circuit_open))
+        await asyncio.sleep(0.01)
+        # a 已在等待重试，b、c 不重试
+        policy.max_retries = 0
+        others = [await policy.run_async(name, lambda name=name: failing(name), circuit_open) for name in 'bc']
+        late = await policy.run_async('d', lambda: failing('d'), circuit_open)
+        return await slow, others, late
+
+    first, others, late = asyncio.run(main())
+    assert policy.breaker.is_open
+    assert first['failure'] == SITE_UNREACHABLE
+    assert [r['failure'] for r in others] == [SITE_UNREACHABLE, SITE_UNREACHABLE]
+    assert late['failure'] == CIRCUIT_OPEN
+    assert calls == ['a', 'b', 'c']
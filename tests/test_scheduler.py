@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""账号调度"""
+
+import pytest
+
+from scheduler import makespan
+
+
+@pytest.mark.parametrize('durations, workers, expected', [
+    ([], 3, 0.0),
+    ([5.0, 1.0, 2.0], 1, 8.0),
+    ([5.0, 1.0, 2.0], 3, 5.0),
+    # 慢账号排在最后时拖长总耗时，最长优先时更短
+    ([1.0, 1.0, 1.0, 1.0, 4.0], 2, 6.0),
+    ([4.0, 1.0, 1.0, 1.0, 1.0], 2, 4.0),
+    ([3.0, 3.0], 0, 6.0),
+])
+def test_makespan(durations, workers, expected):
+    assert makespan(durations, workers) == pytest.approx(expected)
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""选择器缓存"""
+
+from selector_cache import SelectorCache
+
+
+def test_miss_does_not_overwrite_known_winner(tmp_path):
+    cache = SelectorCache('test', cache_dir=str(tmp_path))
+    cache.record('checkin_button', '.sign-button')
+    cache.record('checkin_button', None)
+    assert cache.ordered('checkin_button', ['.a', '.sign-button']) == ['.sign-button', '.a']
+    assert cache.probe_timeout('checkin_button', 1000) == 1000
+    assert cache.counts['checkin_button'] == {'hits': 0, 'misses': 1, 'not_found': 1}
+
+    # 重新读取缓存文件，仍然记得生效的选择器
+    assert SelectorCache('test', cache_dir=str(tmp_path)).learned == {'checkin_button': '.sign-button'}
+
+
+def test_never_found_button_skips_wait_until_found(tmp_path):
+    cache = SelectorCache('test', cache_dir=str(tmp_path))
+    cache.record('checkin_button', None)
+    assert cache.probe_timeout('checkin_button', 1000) == 0
+
+    cache.record('checkin_button', '.sign-button')
+    assert cache.probe_timeout('checkin_button', 1000) == 1000
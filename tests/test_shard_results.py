@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""分片结果合并"""
+
+from shard_results import merge, read_result_files, write_result_file
+
+
+def shard_file(site, index, count, results, finished='2026-01-01 08:00:00'):
+    return {'site': site, 'shard': [index, count], 'finished': finished, 'results': results}
+
+
+def test_merge_keeps_latest_result_per_account():
+    files = [
+        shard_file('leaflow', 1, 2, [{'email': 'a', 'success': True}, {'email': 'b', 'success': False}]),
+        shard_file('leaflow', 2, 2, [{'email': 'c', 'success': True}]),
+        # 分片 1 重跑后 b 成功
+        shard_file('leaflow', 1, 2, [{'email': 'b', 'success': True}], finished='2026-01-01 09:00:00'),
+    ]
+    merged, missing = merge(files)
+    assert {r['email']: r['success'] for r in merged['leaflow']} == {'a': True, 'b': True, 'c': True}
+    assert missing == {'leaflow': []}
+
+
+def test_merge_reports_missing_shards_per_site():
+    files = [
+        shard_file('anyrouter', 1, 3, [{'username': 'a', 'success': True}]),
+        shard_file('anyrouter', 3, 3, [{'username': 'c', 'success': True}]),
+        shard_file('leaflow', 1, 1, [{'email': 'x', 'success': True}]),
+    ]
+    merged, missing = merge(files)
+    assert missing == {'anyrouter': [2], 'leaflow': []}
+    assert len(merged['anyrouter']) == 2
+
+    # --expect 覆盖结果文件中记录的分片数（例如最后一个分片完全没有写出结果）
+    _, missing = merge(files, expect=4)
+    assert missing == {'anyrouter': [2, 4], 'leaflow': [2, 3, 4]}
+
+
+def test_result_files_round_trip(tmp_path):
+    write_result_file(str(tmp_path), 'leaflow', [{'email': 'a', 'success': True}], shard=(2, 2))
+    (tmp_path / 'anyrouter-shard1of2.json').write_text('{"site": "anyrouter", "res', encoding='utf-8')
+    files = read_result_files(str(tmp_path))
+    assert [(f['site'], f['shard']) for f in files] == [('leaflow', [2, 2])]
+    merged, missing = merge(files)
+    assert merged == {'leaflow': [{'email': 'a', 'success': True}]}
+    assert missing == {'leaflow': [1]}
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""Telegram 通知：重试、HTML 转义和合并发送"""
+
+import telegram_notify
+from telegram_notify import TelegramNotifier, BackgroundSender, MESSAGE_SEPARATOR
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+        self.headers = headers or {}
+        self.text = str(self.payload)
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """按顺序返回预设的响应（callable 时按请求内容决定），并记录每次请求的消息"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def post(self, url, json=None, timeout=None):
+        self.sent.append(json['text'])
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        return response(json['text']) if callable(response) else response
+
+
+def use_session(monkeypatch, responses):
+    session = FakeSession(responses)
+    monkeypatch.setattr(telegram_notify, 'get_session', lambda: session)
+    return session
+
+
+def make_notifier():
+    return TelegramNotifier(bot_token='token', chat_id='1', api_url='http://telegram.test', max_retries=2)
+
+
+def test_format_escapes_dynamic_fields():
+    notifier = make_notifier()
+    message = notifier.format_checkin_result('LeafFlow', [
+        {'email': 'a<b>@x.com', 'success': False, 'status': '处理失败', 'amount': 0,
+         'message': "Timeout 10000ms exceeded waiting for <button> & 'x'"}
+    ])
+    assert '<code>a&lt;b&gt;@x.com</code>' in message
+    assert '&lt;button&gt; &amp;' in message
+    assert '<button>' not in message
+
+
+def test_send_error_escapes_message(monkeypatch):
+    session = use_session(monkeypatch, [FakeResponse(200)])
+    assert make_notifier().send_error("list index < 0")
+    assert '<code>list index &lt; 0</code>' in session.sent[0]
+
+
+def test_rejected_batch_is_resent_one_by_one(monkeypatch):
+    # 合并后的消息被拒绝（400），逐条重发时只有有问题的那一条失败
+    session = use_session(monkeypatch, [
+        lambda text: FakeResponse(400) if 'bad' in text else FakeResponse(200)
+    ])
+    sender = BackgroundSender(make_notifier(), coalesce_window=0.5)
+    sender.put('good 1')
+    sender.put('bad')
+    sender.put('good 2')
+    assert sender.flush(5)
+    assert session.sent == [MESSAGE_SEPARATOR.join(['good 1', 'bad', 'good 2']), 'good 1', 'bad', 'good 2']
+
+
+def test_failed_batch_is_not_resent_on_server_error(monkeypatch):
+    monkeypatch.setattr(telegram_notify, 'retry_delay', lambda attempt: 0)
+    session = use_session(monkeypatch, [FakeResponse(502)])
+    sender = BackgroundSender(make_notifier(), coalesce_window=0.5)
+    sender.put('one')
+    sender.put('two')
+    assert sender.flush(5)
+    assert session.sent == [MESSAGE_SEPARATOR.join(['one', 'two'])] * 3
+
+
+def record_sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(telegram_notify.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def test_deliver_waits_retry_after_on_429(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    monkeypatch.setattr(telegram_notify.random, 'uniform', lambda a, b: 0.0)
+    session = use_session(monkeypatch, [
+        FakeResponse(429, {'ok': False, 'parameters': {'retry_after': 3}}),
+        FakeResponse(200)
+    ])
+    assert make_notifier().deliver('hello')
+    assert len(session.sent) == 2
+    assert sleeps == [3.0]
+
+
+def test_deliver_gives_up_when_retry_after_too_long(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    session = use_session(monkeypatch, [FakeResponse(429, {'parameters': {'retry_after': 600}})])
+    assert not make_notifier().deliver('hello')
+    assert len(session.sent) == 1
+    assert sleeps == []
+
+
+def test_deliver_backs_off_on_server_error(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    session = use_session(monkeypatch, [FakeResponse(502), FakeResponse(503), FakeResponse(200)])
+    assert make_notifier().deliver('hello')
+    assert len(session.sent) == 3
+    # 带抖动的指数退避：第 n 次重试前等待 [base*2^n/2, base*2^n]
+    assert 0.5 <= sleeps[0] <= 1.0 and 1.0 <= sleeps[1] <= 2.0
+
+
+def test_deliver_stops_after_max_retries(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    session = use_session(monkeypatch, [FakeResponse(500)])
+    assert not make_notifier().deliver('hello')
+    assert len(session.sent) == 3  # 首次 + max_retries=2
+    assert len(sleeps) == 2
+
+
+def test_deliver_does_not_retry_client_error(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    session = use_session(monkeypatch, [FakeResponse(400, {'description': "can't parse entities"})])
+    notifier = make_notifier()
+    assert not notifier.deliver('<b>')
+    assert notifier.post_message('<b>') == 400
+    assert len(session.sent) == 2
+    assert sleeps == []
+
+
+def test_deliver_retries_network_errors(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    responses = [telegram_notify.requests.ConnectionError('reset'), FakeResponse(200)]
+
+    def respond(text):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    session = use_session(monkeypatch, [respond])
+    assert make_notifier().deliver('hello')
+    assert len(session.sent) == 2
+    assert len(sleeps) == 1
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轻量级耗时追踪模块
+把每个阶段记录为一个 span，输出 Chrome trace-event 格式的 JSON
+（可在 chrome://tracing 或 https://ui.perfetto.dev 中打开），每个账号一行
+
+用法:
+    tracing.set_tracer(Tracer())
+    with tracing.account_scope(email):
+        with tracing.span('goto_login'):
+            page.goto(...)
+"""
+
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# 当前正在处理的账号（asyncio 任务和线程各自独立）
+_current_account = contextvars.ContextVar('trace_account', default=None)
+
+
+class Tracer:
+    def __init__(self, enabled=True):
+        """
+        初始化追踪器
+
+        Args:
+            enabled: 为 False 时所有 span 都不记录
+        """
+        self.enabled = enabled
+        self.events = []
+        self.lanes = {}
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+
+    def _lane(self, account):
+        """账号对应的行号（tid），0 为不属于任何账号的全局阶段"""
+        if account is None:
+            return 0
+        if account not in self.lanes:
+            self.lanes[account] = len(self.lanes) + 1
+        return self.lanes[account]
+
+    @contextmanager
+    def span(self, name, **args):
+        """记录一个阶段的开始时间和耗时"""
+        if not self.enabled:
+            yield
+            return
+
+        account = _current_account.get()
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            args['error'] = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                self.events.append({
+                    'name': name,
+                    'cat': 'account' if account else 'run',
+                    'ph': 'X',
+                    'ts': (start - self.origin) * 1e6,
+                    'dur': (end - start) * 1e6,
+                    'pid': self.pid,
+                    'tid': self._lane(account),
+                    'args': dict(args, account=account) if account else args
+                })
+
+    def to_chrome_trace(self):
+        """Chrome trace-event 格式的数据"""
+        with self.lock:
+            metadata = [{
+                'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': 0,
+                'args': {'name': 'run'}
+            }]
+            for account, tid in self.lanes.items():
+                metadata.append({
+                    'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                    'args': {'name': account}
+                })
+            return {'traceEvents': metadata + list(self.events), 'displayTimeUnit': 'ms'}
+
+    def save(self, path):
+        """保存为 JSON 文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+
+    def breakdown(self):
+        """
+        每个账号各阶段的总耗时
+
+        Returns:
+            dict: {账号: {阶段: 秒}}，全局阶段记在 None 下
+        """
+        result = {}
+        with self.lock:
+            for event in self.events:
+                account = event['args'].get('account')
+                steps = result.setdefault(account, {})
+                steps[event['name']] = steps.get(event['name'], 0.0) + event['dur'] / 1e6
+        return result
+
+    def summary(self, top=10):
+        """按阶段汇总的耗时分布"""
+        totals = {}
+        counts = {}
+        with self.lock:
+            for event in self.events:
+                totals[event['name']] = totals.get(event['name'], 0.0) + event['dur'] / 1e6
+                counts[event['name']] = counts.get(event['name'], 0) + 1
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+        return "📈 耗时分布: " + " | ".join(f"{name} {seconds:.1f}s ({counts[name]}次)" for name, seconds in ranked)
+
+
+# 默认不记录，调用 set_tracer 后才开始追踪
+_tracer = Tracer(enabled=False)
+
+
+def get_tracer():
+    """当前使用的追踪器"""
+    return _tracer
+
+
+def set_tracer(tracer):
+    """设置全局追踪器"""
+    global _tracer
+    _tracer = tracer
+    return tracer
+
+
+def span(name, **args):
+    """在当前追踪器上记录一个阶段"""
+    return _tracer.span(name, **args)
+
+
+@contextmanager
+def account_scope(account):
+    """在当前 asyncio 任务/线程中标记正在处理的账号，span 会归到该账号下"""
+    token = _current_account.set(account)
+    try:
+        yield
+    finally:
+        _current_account.reset(token)